@@ -1,9 +1,13 @@
 """FastAPI backend for the LLM Customer Support Agent"""
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+import asyncio
+import json
+import threading
+import anyio
 import logging
 import uvicorn
 from pathlib import Path
@@ -14,7 +18,10 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from src.config import settings
 from src.pipeline import MLOpsPipeline
-from src.guardrails import Guardrails
+from src.model_registry import model_registry, get_guardrails
+from src.concurrency import query_executor
+from src.vector_store import shutdown_lexical_executor
+from src.jobs import JobQueue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,7 +45,9 @@ app.add_middleware(
 
 # Initialize pipeline and guardrails
 pipeline = MLOpsPipeline()
-guardrails = Guardrails(settings.ENABLE_GUARDRAILS)
+guardrails = get_guardrails(settings.ENABLE_GUARDRAILS)
+# Ingestion runs here, one job at a time, building the new index alongside the live one
+ingestion_jobs = JobQueue(max_history=settings.JOB_HISTORY_SIZE, name="ingestion")
 
 # Request/Response models
 class QueryRequest(BaseModel):
@@ -50,6 +59,24 @@ class QueryResponse(BaseModel):
     sources: List[str]
     confidence: float
     error: Optional[str] = None
+    cached: bool = False
+
+class QueryBatchRequest(BaseModel):
+    questions: List[str]
+    log_to_mlflow: bool = False
+
+class QueryBatchResponse(BaseModel):
+    results: List[QueryResponse]
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -67,7 +94,8 @@ async def startup_event():
         embedding_dim = 384  # Default for all-MiniLM-L6-v2
         pipeline.vector_store = FAISSVectorStore(
             dimension=embedding_dim,
-            index_path=settings.FAISS_INDEX_PATH
+            index_path=settings.FAISS_INDEX_PATH,
+            mmap=settings.FAISS_MMAP
         )
         
         if pipeline.vector_store.index.ntotal > 0:
@@ -78,6 +106,32 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Could not initialize pipeline on startup: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Wait for in-flight queries and ingestion jobs before exiting"""
+    query_executor.shutdown()
+    ingestion_jobs.shutdown()
+    if pipeline.rag_agent and pipeline.rag_agent.openai_client:
+        pipeline.rag_agent.openai_client.close()
+    if pipeline.rag_agent and pipeline.rag_agent.reranker:
+        pipeline.rag_agent.reranker.close()
+    shutdown_lexical_executor()
+
+def ingest_and_refresh() -> dict:
+    """Run ingestion, which swaps the new store in, and set up the RAG agent on first use (blocking)"""
+    result = pipeline.ingest_documents()
+    if result["status"] == "success":
+        pipeline.initialize_rag_agent()
+    return result
+
+async def run_ingestion_job() -> dict:
+    """Queue an ingestion job and wait for its result"""
+    job = ingestion_jobs.submit("ingest", ingest_and_refresh)
+    await asyncio.wrap_future(job.future)
+    if job.error:
+        raise RuntimeError(job.error)
+    return job.result
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -104,7 +158,7 @@ async def query_endpoint(request: QueryRequest):
     """Query the RAG agent"""
     try:
         # Guardrails check
-        validation = guardrails.validate_query(request.question)
+        validation = await query_executor.run(guardrails.validate_query, request.question)
         if not validation["is_valid"] or not validation["is_safe"]:
             raise HTTPException(
                 status_code=400,
@@ -112,7 +166,7 @@ async def query_endpoint(request: QueryRequest):
             )
         
         # Process query
-        result = pipeline.query(request.question, log_to_mlflow=request.log_to_mlflow)
+        result = await query_executor.run(pipeline.query, request.question, log_to_mlflow=request.log_to_mlflow)
         
         if result.get("error"):
             raise HTTPException(status_code=500, detail=result["error"])
@@ -121,7 +175,8 @@ async def query_endpoint(request: QueryRequest):
             answer=result["answer"],
             sources=result.get("sources", []),
             confidence=result.get("confidence", 0.0),
-            error=result.get("error")
+            error=result.get("error"),
+            cached=result.get("cached", False)
         )
     except HTTPException:
         raise
@@ -129,14 +184,89 @@ async def query_endpoint(request: QueryRequest):
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: dict) -> str:
+    """Encode an answer event as a server-sent event"""
+    payload = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+
+@app.post("/query/stream")
+async def query_stream_endpoint(request: QueryRequest):
+    """Query the RAG agent, streaming the answer as server-sent events.
+
+    Emits a ``sources`` event once retrieval finishes, ``token`` events as the answer
+    is generated, and a final ``done`` event with the full answer (or ``error``).
+    """
+    validation = await query_executor.run(guardrails.validate_query, request.question)
+    if not validation["is_valid"] or not validation["is_safe"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Query validation failed: {validation.get('error', 'Unsafe query detected')}"
+        )
+    
+    cancelled = threading.Event()
+    events = pipeline.query_stream(request.question, log_to_mlflow=request.log_to_mlflow, cancelled=cancelled)
+    
+    async def event_source():
+        # Each step of the generator blocks on retrieval or generation, so it runs on the query pool
+        step = None
+        try:
+            while True:
+                step = asyncio.ensure_future(query_executor.run(next, events, None))
+                event = await asyncio.shield(step)
+                if event is None:
+                    break
+                yield format_sse(event)
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield format_sse({"event": "error", "error": str(e)})
+        finally:
+            # A client disconnect cancels the await above, but not the worker thread still
+            # inside next(events). Stop generation, let that step return, then close the
+            # generator; closing it while it runs would fail and leave it decoding.
+            cancelled.set()
+            with anyio.CancelScope(shield=True):
+                if step is not None:
+                    await asyncio.wait([step])
+                await query_executor.run(events.close)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/query/batch", response_model=QueryBatchResponse)
+async def query_batch_endpoint(request: QueryBatchRequest):
+    """Query the RAG agent with many questions using one embedding pass and one index search"""
+    if len(request.questions) > settings.MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds maximum of {settings.MAX_BATCH_QUERIES} questions"
+        )
+    
+    try:
+        # Guardrails are applied per question by the agent; refused items carry an error
+        results = await query_executor.run(pipeline.query_batch, request.questions, log_to_mlflow=request.log_to_mlflow)
+        
+        return QueryBatchResponse(results=[
+            QueryResponse(
+                answer=result["answer"],
+                sources=result.get("sources", []),
+                confidence=result.get("confidence", 0.0),
+                error=result.get("error"),
+                cached=result.get("cached", False)
+            )
+            for result in results
+        ])
+    except Exception as e:
+        logger.error(f"Error processing batch query: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/ingest")
 async def ingest_documents():
     """Trigger document ingestion"""
     try:
-        result = pipeline.ingest_documents()
-        if result["status"] == "success":
-            pipeline.initialize_rag_agent()
-        return result
+        return await run_ingestion_job()
     except Exception as e:
         logger.error(f"Error ingesting documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -157,9 +287,7 @@ async def upload_document(file: UploadFile = File(...)):
         logger.info(f"Uploaded document: {file.filename}")
         
         # Re-ingest documents
-        result = pipeline.ingest_documents()
-        if result["status"] == "success":
-            pipeline.initialize_rag_agent()
+        result = await run_ingestion_job()
         
         return {
             "status": "success",
@@ -170,6 +298,29 @@ async def upload_document(file: UploadFile = File(...)):
         logger.error(f"Error uploading document: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job():
+    """Queue a background ingestion job.
+
+    The index is rebuilt alongside the live one and swapped in when the job succeeds,
+    so queries are served from the current index throughout. Poll ``GET /jobs/{id}``.
+    """
+    job = ingestion_jobs.submit("ingest", ingest_and_refresh)
+    return JobResponse(**job.to_dict())
+
+@app.get("/jobs", response_model=List[JobResponse])
+async def list_jobs():
+    """List recent background jobs, oldest first"""
+    return [JobResponse(**job.to_dict()) for job in ingestion_jobs.list()]
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status and result of a background job"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobResponse(**job.to_dict())
+
 @app.get("/stats")
 async def get_stats():
     """Get pipeline statistics"""
@@ -177,6 +328,25 @@ async def get_stats():
         stats = {}
         if pipeline.vector_store:
             stats["vector_store"] = pipeline.vector_store.get_stats()
+        stats["loaded_models"] = [str(key) for key in model_registry.loaded()]
+        stats["concurrency"] = query_executor.stats()
+        if pipeline.embedding_generator.cache:
+            stats["embedding_cache"] = pipeline.embedding_generator.cache.stats()
+        if pipeline.embedding_generator.batcher:
+            stats["embedding_batcher"] = pipeline.embedding_generator.batcher.stats()
+        if pipeline.rag_agent and pipeline.rag_agent.answer_cache:
+            stats["answer_cache"] = pipeline.rag_agent.answer_cache.stats()
+        if pipeline.rag_agent and pipeline.rag_agent.semantic_cache:
+            stats["semantic_cache"] = pipeline.rag_agent.semantic_cache.stats()
+        if pipeline.rag_agent and pipeline.rag_agent.generation_scheduler:
+            stats["generation"] = pipeline.rag_agent.generation_scheduler.stats()
+        if pipeline.rag_agent and pipeline.rag_agent.prefix_cache:
+            stats["prefix_cache"] = pipeline.rag_agent.prefix_cache.stats()
+        if pipeline.rag_agent and pipeline.rag_agent.openai_client:
+            stats["openai_client"] = pipeline.rag_agent.openai_client.stats()
+        if pipeline.rag_agent and pipeline.rag_agent.reranker:
+            stats["reranker"] = pipeline.rag_agent.reranker.stats()
+        stats["jobs"] = ingestion_jobs.stats()
         return stats
     except Exception as e:
         logger.error(f"Error getting stats: {str(e)}")
@@ -0,0 +1,137 @@
+"""Script to report memory, latency and recall of vector compression modes against uncompressed vectors"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import faiss
+from src.config import settings
+from src.vector_store import create_index, set_search_params
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_vectors(args) -> np.ndarray:
+    """Load vectors from the existing flat index, or generate synthetic ones"""
+    index_file = Path(settings.FAISS_INDEX_PATH) / "index.faiss"
+    if not args.synthetic and index_file.exists():
+        index = faiss.read_index(str(index_file))
+        if isinstance(index, faiss.IndexFlat) and index.ntotal > 0:
+            logger.info(f"Using {index.ntotal} vectors from {index_file}")
+            return index.reconstruct_n(0, index.ntotal)
+        logger.info("Existing index is empty or not flat; falling back to synthetic vectors")
+
+    logger.info(f"Generating {args.num_vectors} synthetic {args.dimension}-dim vectors")
+    rng = np.random.default_rng(args.seed)
+    # Embeddings occupy a low-dimensional subspace, which is what PCA exploits
+    basis = rng.standard_normal((args.dimension // 4, args.dimension)).astype('float32')
+    centers = rng.standard_normal((max(1, args.num_vectors // 100), args.dimension // 4)).astype('float32') @ basis
+    assignments = rng.integers(0, len(centers), args.num_vectors)
+    noise = 0.3 * rng.standard_normal((args.num_vectors, args.dimension)).astype('float32')
+    return centers[assignments] + noise
+
+
+def time_queries(index: faiss.Index, queries: np.ndarray, k: int):
+    """Run queries one at a time, returning result ids and per-query latencies in ms"""
+    ids = np.empty((len(queries), k), dtype='int64')
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i:i + 1] = index.search(query.reshape(1, -1), k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return ids, latencies
+
+
+def recall_at_k(ids: np.ndarray, ground_truth: np.ndarray) -> float:
+    """Fraction of true top-k neighbours found, averaged over queries"""
+    k = ground_truth.shape[1]
+    hits = sum(len(set(found) & set(truth)) for found, truth in zip(ids, ground_truth))
+    return hits / (len(ground_truth) * k)
+
+
+def main():
+    """Main function to benchmark compression modes"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", action="store_true", help="Ignore the existing index and use synthetic vectors")
+    parser.add_argument("--num-vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=settings.TOP_K_RETRIEVAL)
+    parser.add_argument("--index-type", default="flat", choices=["flat", "hnsw", "ivf_flat"])
+    parser.add_argument("--pca-dim", type=int, default=None, help="Defaults to half the dimension")
+    parser.add_argument("--train-size", type=int, default=settings.INGEST_TRAIN_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = np.ascontiguousarray(load_vectors(args), dtype='float32')
+    dimension = vectors.shape[1]
+    pca_dim = args.pca_dim or dimension // 2
+    rng = np.random.default_rng(args.seed)
+    query_ids = rng.choice(len(vectors), size=min(args.num_queries, len(vectors)), replace=False)
+    queries = vectors[query_ids] + 0.05 * rng.standard_normal((len(query_ids), dimension)).astype('float32')
+    k = min(args.k, len(vectors))
+    # Train on a sample, as ingestion does, rather than on every vector
+    train = vectors[rng.choice(len(vectors), size=min(args.train_size, len(vectors)), replace=False)]
+
+    baseline = create_index("flat", dimension)
+    baseline.add(vectors)
+    ground_truth, _ = time_queries(baseline, queries, k)
+
+    # (compression, pca_dim, exact_rescore)
+    modes = [
+        ("none", 0, False),
+        ("fp16", 0, False),
+        ("sq8", 0, False),
+        ("pq", 0, False),
+        ("none", pca_dim, False),
+        ("sq8", pca_dim, False),
+        ("sq8", 0, True),
+        ("pq", 0, True),
+    ]
+    if args.index_type == "ivf_flat":
+        modes = [mode for mode in modes if mode[0] != "pq"]
+
+    rows = []
+    for compression, mode_pca_dim, exact_rescore in modes:
+        name = "+".join(filter(None, [
+            compression,
+            f"pca{mode_pca_dim}" if mode_pca_dim else "",
+            "rescore" if exact_rescore else ""
+        ]))
+        try:
+            index = create_index(
+                args.index_type, dimension, num_train=len(train), compression=compression,
+                pca_dim=mode_pca_dim, exact_rescore=exact_rescore
+            )
+        except ValueError as e:
+            logger.warning(f"Skipping {name}: {str(e)}")
+            continue
+        start = time.perf_counter()
+        if not index.is_trained:
+            index.train(train)
+        index.add(vectors)
+        logger.info(f"Built {args.index_type} {name} in {time.perf_counter() - start:.1f}s")
+        set_search_params(index)
+
+        # The serialized size is what a worker loads into RAM (or maps)
+        megabytes = len(faiss.serialize_index(index)) / 2 ** 20
+        ids, latencies = time_queries(index, queries, k)
+        rows.append((name, megabytes, recall_at_k(ids, ground_truth), latencies))
+
+    print(f"\n{len(vectors)} {dimension}-dim vectors, {args.index_type} index, recall@{k} vs exact search\n")
+    print(f"{'mode':<18} {'MiB':>9} {'recall':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, megabytes, recall, latencies in rows:
+        print(
+            f"{name:<18} {megabytes:>9.1f} {recall:>8.3f} "
+            f"{np.percentile(latencies, 50):>9.3f} {np.percentile(latencies, 99):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Script to compare query embedding latency and agreement of the PyTorch and ONNX backends"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from src.config import settings
+from src.onnx_backend import cosine_agreement, load_onnx_encoder
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERIES = [
+    "How do I reset my password?",
+    "What is the return window for opened items?",
+    "My order shows delivered but I never received it",
+    "Can I change the shipping address after checkout?",
+    "What does error ERR-4012 mean when paying?",
+    "Is the SKU-1042-B charger compatible with my laptop?",
+    "How long do refunds take to reach my bank account?",
+    "Do you offer discounts for bulk purchases?",
+]
+
+
+def time_encode(model, texts, batch_size: int, repeats: int) -> np.ndarray:
+    """Per-call latencies in ms of encoding ``texts`` in batches of ``batch_size``"""
+    latencies = []
+    for _ in range(repeats):
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            began = time.perf_counter()
+            model.encode(batch, batch_size=batch_size)
+            latencies.append((time.perf_counter() - began) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    """Main function to benchmark embedding backends"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--onnx-dir", default=settings.EMBEDDING_ONNX_DIR)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_ONNX_THREADS)
+    args = parser.parse_args()
+
+    reference = SentenceTransformer(args.model, device="cpu")
+    backends = [("torch", reference)]
+    for quantize in (False, True):
+        encoder = load_onnx_encoder(
+            args.model, args.onnx_dir, quantize=quantize, min_cosine=0.0, num_threads=args.threads,
+            reference_model=reference
+        )
+        backends.append(("onnx-int8" if quantize else "onnx", encoder))
+
+    texts = QUERIES * 4
+    expected = reference.encode(texts, convert_to_numpy=True)
+    for _, model in backends:
+        model.encode(texts[:2])  # Warm up
+
+    print(f"\n{args.model} on CPU, {args.repeats} repeats\n")
+    print(f"{'backend':<10} {'batch':>6} {'p50 ms':>9} {'p99 ms':>9} {'speedup':>8} {'min cos':>8}")
+    for batch_size in args.batch_sizes:
+        baseline = None
+        for name, model in backends:
+            latencies = time_encode(model, texts, batch_size, args.repeats)
+            p50 = np.percentile(latencies, 50)
+            baseline = baseline or p50
+            agreement = cosine_agreement(expected, model.encode(texts)).min()
+            print(
+                f"{name:<10} {batch_size:>6} {p50:>9.3f} {np.percentile(latencies, 99):>9.3f} "
+                f"{baseline / p50:>7.1f}x {agreement:>8.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
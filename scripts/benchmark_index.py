@@ -0,0 +1,112 @@
+"""Script to report recall vs latency of ANN index types against the flat baseline"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import faiss
+from src.config import settings
+from src.vector_store import create_index, set_search_params
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_vectors(args) -> np.ndarray:
+    """Load vectors from the existing flat index, or generate synthetic ones"""
+    index_file = Path(settings.FAISS_INDEX_PATH) / "index.faiss"
+    if not args.synthetic and index_file.exists():
+        index = faiss.read_index(str(index_file))
+        if isinstance(index, faiss.IndexFlat) and index.ntotal > 0:
+            logger.info(f"Using {index.ntotal} vectors from {index_file}")
+            return index.reconstruct_n(0, index.ntotal)
+        logger.info("Existing index is empty or not flat; falling back to synthetic vectors")
+
+    logger.info(f"Generating {args.num_vectors} synthetic {args.dimension}-dim vectors")
+    rng = np.random.default_rng(args.seed)
+    # Clustered data is closer to real embeddings than uniform noise
+    centers = rng.standard_normal((max(1, args.num_vectors // 100), args.dimension)).astype('float32')
+    assignments = rng.integers(0, len(centers), args.num_vectors)
+    noise = 0.3 * rng.standard_normal((args.num_vectors, args.dimension)).astype('float32')
+    return centers[assignments] + noise
+
+
+def time_queries(index: faiss.Index, queries: np.ndarray, k: int):
+    """Run queries one at a time, returning result ids and per-query latencies in ms"""
+    ids = np.empty((len(queries), k), dtype='int64')
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i:i + 1] = index.search(query.reshape(1, -1), k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return ids, latencies
+
+
+def recall_at_k(ids: np.ndarray, ground_truth: np.ndarray) -> float:
+    """Fraction of true top-k neighbours found, averaged over queries"""
+    k = ground_truth.shape[1]
+    hits = sum(len(set(found) & set(truth)) for found, truth in zip(ids, ground_truth))
+    return hits / (len(ground_truth) * k)
+
+
+def main():
+    """Main function to benchmark index types"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", action="store_true", help="Ignore the existing index and use synthetic vectors")
+    parser.add_argument("--num-vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=settings.TOP_K_RETRIEVAL)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = np.ascontiguousarray(load_vectors(args), dtype='float32')
+    dimension = vectors.shape[1]
+    rng = np.random.default_rng(args.seed)
+    query_ids = rng.choice(len(vectors), size=min(args.num_queries, len(vectors)), replace=False)
+    queries = vectors[query_ids] + 0.05 * rng.standard_normal((len(query_ids), dimension)).astype('float32')
+    k = min(args.k, len(vectors))
+
+    baseline = create_index("flat", dimension)
+    baseline.add(vectors)
+    ground_truth, flat_latencies = time_queries(baseline, queries, k)
+
+    rows = [("flat", "-", 1.0, flat_latencies)]
+
+    for index_type in ("ivf_flat", "ivf_pq", "hnsw"):
+        index = create_index(index_type, dimension, num_train=len(vectors))
+        start = time.perf_counter()
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        logger.info(f"Built {index_type} in {time.perf_counter() - start:.1f}s")
+
+        sweep = args.ef_search if index_type == "hnsw" else args.nprobe
+        for value in sweep:
+            if index_type == "hnsw":
+                set_search_params(index, ef_search=value)
+                param = f"efSearch={value}"
+            else:
+                set_search_params(index, nprobe=value)
+                param = f"nprobe={index.nprobe}"
+            ids, latencies = time_queries(index, queries, k)
+            rows.append((index_type, param, recall_at_k(ids, ground_truth), latencies))
+
+    print(f"\n{len(vectors)} vectors, {len(queries)} queries, recall@{k} vs flat baseline\n")
+    print(f"{'index':<10} {'param':<14} {'recall':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for index_type, param, recall, latencies in rows:
+        print(
+            f"{index_type:<10} {param:<14} {recall:>8.3f} "
+            f"{np.percentile(latencies, 50):>9.3f} {np.percentile(latencies, 99):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Script to report BM25 build time and query latency on the saved index or a synthetic corpus"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from src.config import settings
+from src.lexical_index import BM25Index
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_corpus(args, rng):
+    """Chunks of Zipf-distributed words, a fraction of them carrying a product code"""
+    vocabulary = np.array([f"w{i}" for i in range(args.vocabulary)])
+    for start in range(0, args.num_chunks, args.batch_size):
+        count = min(args.batch_size, args.num_chunks - start)
+        words = vocabulary[(rng.zipf(1.2, (count, args.chunk_words)) - 1) % args.vocabulary]
+        texts = [" ".join(row) for row in words]
+        for i in range(0, count, 20):
+            texts[i] += f" SKU-{start + i}-B"
+        yield texts
+
+
+def time_queries(index: BM25Index, queries, k: int) -> np.ndarray:
+    """Per-query latencies in ms"""
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        index.search(query, k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return latencies
+
+
+def main():
+    """Main function to benchmark the lexical index"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", action="store_true", help="Ignore the saved index and build a synthetic one")
+    parser.add_argument("--num-chunks", type=int, default=1000000)
+    parser.add_argument("--chunk-words", type=int, default=150)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=settings.HYBRID_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    index_path = Path(settings.FAISS_INDEX_PATH)
+    if not args.synthetic and BM25Index.exists(index_path):
+        index = BM25Index.load(index_path, mmap=settings.FAISS_MMAP, k1=settings.BM25_K1, b=settings.BM25_B)
+        logger.info(f"Using {len(index)} chunks from {index_path}")
+        # Sample query terms from the vocabulary the saved chunks actually use
+        terms = np.array(index.terms)
+        code_queries = [str(term) for term in rng.choice(terms, args.num_queries)]
+        word_queries = [" ".join(rng.choice(terms, 4)) for _ in range(args.num_queries)]
+    else:
+        index = BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+        start = time.perf_counter()
+        for texts in synthetic_corpus(args, rng):
+            index.add(texts)
+        index.search("w0", 1)  # Merge buffered postings so the build is fully timed
+        logger.info(f"Built BM25 over {len(index)} chunks in {time.perf_counter() - start:.1f}s")
+        code_queries = [f"SKU-{20 * i}-B" for i in rng.integers(0, max(1, args.num_chunks // 20), args.num_queries)]
+        ranks = (rng.zipf(1.2, (args.num_queries, 4)) - 1) % args.vocabulary
+        word_queries = [" ".join(f"w{i}" for i in row) for row in ranks]
+
+    # Word queries draw from the same Zipf head as the text, so many include terms present
+    # in most chunks: the worst case for BM25. Mixed queries add a code to them.
+    rows = [
+        ("codes", time_queries(index, code_queries, args.k)),
+        ("words", time_queries(index, word_queries, args.k)),
+        ("mixed", time_queries(index, [f"{c} {w}" for c, w in zip(code_queries, word_queries)], args.k)),
+    ]
+
+    print(f"\n{len(index)} chunks, {len(index.terms)} terms, {index.nbytes / 2 ** 20:.0f} MiB, top-{args.k}\n")
+    print(f"{'queries':<10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, latencies in rows:
+        print(
+            f"{name:<10} {np.percentile(latencies, 50):>9.3f} "
+            f"{np.percentile(latencies, 99):>9.3f} {latencies.max():>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
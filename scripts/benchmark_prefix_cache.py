@@ -0,0 +1,103 @@
+"""Script to compare time-to-first-token of local generation with and without the prompt prefix KV cache"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+from src.config import settings
+from src.prefix_cache import DynamicCache, PrefixKVCache
+from src.rag_agent import PROMPT_PREFIX
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORDS = "order refund shipping account password warranty invoice delivery return policy card payment".split()
+
+
+def make_prompts(args, rng):
+    """RAG prompts with random contexts of roughly ``context_words`` words"""
+    prompts = []
+    for i in range(args.num_prompts):
+        context = " ".join(rng.choice(WORDS, args.context_words))
+        prompts.append(f"{PROMPT_PREFIX}{context}\n\nQuestion: What is the {WORDS[i % len(WORDS)]} policy?\n\nAnswer:")
+    return prompts
+
+
+def first_token(model, input_ids, position_ids, attention_mask, past=None):
+    """Prefill and pick the first token greedily, returning the elapsed ms"""
+    if past is not None and DynamicCache is not None:
+        past = DynamicCache.from_legacy_cache(past)
+    start = time.perf_counter()
+    with torch.no_grad():
+        logits = model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=past,
+            use_cache=True
+        ).logits
+        int(logits[0, -1].argmax())
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    """Main function to benchmark the prefix cache"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=settings.LLM_MODEL)
+    parser.add_argument("--num-prompts", type=int, default=20)
+    parser.add_argument("--context-words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(
+        args.model, torch_dtype=torch.float16 if device == "cuda" else torch.float32
+    ).to(device).eval()
+
+    start = time.perf_counter()
+    prefix_cache = PrefixKVCache(model, tokenizer, PROMPT_PREFIX)
+    logger.info(f"Built prefix cache in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    prompts = make_prompts(args, np.random.default_rng(args.seed))
+    plain, cached, reused = [], [], []
+    for prompt in prompts:
+        ids = tokenizer(prompt, add_special_tokens=True)["input_ids"]
+        mask = torch.ones((1, len(ids)), dtype=torch.long, device=device)
+
+        plain.append(first_token(
+            model, torch.tensor([ids], device=device), torch.arange(len(ids), device=device).unsqueeze(0), mask
+        ))
+
+        # Matching and copying the cache count towards the cached time
+        start = time.perf_counter()
+        length = prefix_cache.match(ids)
+        past = prefix_cache.past(length) if length else None
+        setup = (time.perf_counter() - start) * 1000
+        cached.append(setup + first_token(
+            model,
+            torch.tensor([ids[length:]], device=device),
+            torch.arange(length, len(ids), device=device).unsqueeze(0),
+            mask,
+            past
+        ))
+        reused.append(length / len(ids))
+
+    plain, cached = np.array(plain), np.array(cached)
+    print(f"\n{args.model} on {device}, {len(prefix_cache)}-token prefix, "
+          f"{np.mean(reused):.0%} of prompt tokens reused on average\n")
+    print(f"{'prefill':<10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, latencies in (("full", plain), ("cached", cached)):
+        print(f"{name:<10} {np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 99):>9.2f}")
+    print(f"\nTime-to-first-token speedup (p50): {np.percentile(plain, 50) / np.percentile(cached, 50):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Script to compare tokens/s of plain and speculative (draft-assisted) local decoding"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+from src.config import settings
+from src.rag_agent import PROMPT_PREFIX
+from src.speculative import load_draft_model
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTEXT = (
+    "Orders can be returned within 30 days of delivery for a full refund. Items must be unused "
+    "and in their original packaging. Refunds are issued to the original payment method within "
+    "5 to 7 business days after the return is received. Shipping costs are not refunded unless "
+    "the item arrived damaged or the wrong item was sent."
+)
+QUESTIONS = [
+    "How long do I have to return an order?",
+    "When will I get my refund?",
+    "Are shipping costs refunded?",
+    "Can I return an item I have already used?",
+]
+
+
+class ForwardCounter:
+    """Counts forward passes of each model through forward hooks"""
+
+    def __init__(self, **models):
+        self.calls = {name: 0 for name in models}
+        self._handles = [model.register_forward_hook(self._hook(name)) for name, model in models.items()]
+
+    def _hook(self, name: str):
+        def count(module, inputs, outputs):
+            self.calls[name] += 1
+        return count
+
+    def reset(self):
+        """Zero the counts"""
+        self.calls = {name: 0 for name in self.calls}
+
+
+def acceptance_rate(new_tokens: int, main_forwards: int, draft_forwards: int) -> float:
+    """Fraction of proposed draft tokens the main model accepted.
+
+    Each main-model forward verifies one round of proposals and contributes the
+    accepted tokens plus one of its own, and each draft forward proposes one token, so
+    accepted = new tokens - main forwards and proposed = draft forwards.
+    """
+    if draft_forwards == 0:
+        return 0.0
+    return max(0, new_tokens - main_forwards) / draft_forwards
+
+
+def run(model, tokenizer, prompts, args, assistant=None):
+    """Generate for each prompt, returning (new tokens, seconds) per prompt"""
+    results = []
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        kwargs = {"assistant_model": assistant} if assistant is not None else {}
+        torch.manual_seed(args.seed)
+        start = time.perf_counter()
+        with torch.no_grad():
+            output_ids = model.generate(
+                **inputs,
+                max_new_tokens=args.max_new_tokens,
+                do_sample=args.temperature > 0,
+                temperature=args.temperature if args.temperature > 0 else None,
+                **kwargs
+            )
+        results.append((output_ids.shape[1] - inputs["input_ids"].shape[1], time.perf_counter() - start))
+    return results
+
+
+def main():
+    """Main function to benchmark speculative decoding"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=settings.LLM_MODEL)
+    parser.add_argument("--draft-model", default=settings.DRAFT_MODEL, required=not settings.DRAFT_MODEL)
+    parser.add_argument("--num-tokens", type=int, nargs="+", default=[settings.SPECULATIVE_NUM_TOKENS])
+    parser.add_argument("--schedule", default=settings.SPECULATIVE_SCHEDULE)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--temperature", type=float, default=0.0, help="0 decodes greedily")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.float16 if device == "cuda" else torch.float32
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=dtype).to(device).eval()
+    draft = load_draft_model(args.draft_model, tokenizer, device, dtype, schedule=args.schedule)
+
+    prompts = [f"{PROMPT_PREFIX}{CONTEXT}\n\nQuestion: {question}\n\nAnswer:" for question in QUESTIONS]
+    run(model, tokenizer, prompts[:1], args)  # Warm up
+
+    counter = ForwardCounter(main=model, draft=draft)
+    plain = run(model, tokenizer, prompts, args)
+    plain_rate = sum(tokens for tokens, _ in plain) / sum(seconds for _, seconds in plain)
+
+    rows = [("plain", "-", plain_rate, None)]
+    for num_tokens in args.num_tokens:
+        draft.generation_config.num_assistant_tokens = num_tokens
+        counter.reset()
+        assisted = run(model, tokenizer, prompts, args, assistant=draft)
+        new_tokens = sum(tokens for tokens, _ in assisted)
+        rate = new_tokens / sum(seconds for _, seconds in assisted)
+        accepted = acceptance_rate(new_tokens, counter.calls["main"], counter.calls["draft"])
+        rows.append(("assisted", str(num_tokens), rate, accepted))
+
+    print(f"\n{args.model} with draft {args.draft_model} on {device}, {len(prompts)} prompts, "
+          f"{args.max_new_tokens} new tokens max, {args.schedule} schedule\n")
+    print(f"{'decoding':<10} {'lookahead':>9} {'tok/s':>9} {'speedup':>8} {'accepted':>9}")
+    for name, lookahead, rate, accepted in rows:
+        accepted_text = f"{accepted:.1%}" if accepted is not None else "-"
+        print(f"{name:<10} {lookahead:>9} {rate:>9.2f} {rate / plain_rate:>7.2f}x {accepted_text:>9}")
+
+
+if __name__ == "__main__":
+    main()
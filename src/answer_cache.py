@@ -0,0 +1,84 @@
+"""TTL + LRU cache of RAG answers, invalidated when the vector index changes"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact-match caching: case-folded, whitespace collapsed"""
+    return " ".join(question.casefold().split())
+
+
+class AnswerCache:
+    """Bounded answer cache keyed on the normalized question and retrieval settings.
+
+    Every lookup and insert carries the vector store's ``version``; when it differs from
+    the version the cached answers were produced against, the whole cache is flushed.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self._index_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _sync_version(self, index_version: int):
+        """Flush the cache if the index has changed since answers were cached"""
+        if index_version != self._index_version:
+            if self._entries:
+                logger.info(f"Vector index changed; flushing {len(self._entries)} cached answers")
+                self.invalidations += 1
+            self._entries.clear()
+            self._index_version = index_version
+
+    def get(self, question: str, settings_key: Hashable, index_version: int) -> Optional[Dict]:
+        """Return a cached response, or None on a miss"""
+        key = (normalize_question(question), settings_key)
+        with self._lock:
+            self._sync_version(index_version)
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, question: str, settings_key: Hashable, index_version: int, response: Dict):
+        """Cache a response, evicting the least recently used entries beyond the bound"""
+        if self.max_entries <= 0:
+            return
+        key = (normalize_question(question), settings_key)
+        with self._lock:
+            self._sync_version(index_version)
+            self._entries[key] = (time.monotonic(), dict(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached answers"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,98 @@
+"""Request coalescing for model calls that are cheaper on batches"""
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Collects items from concurrent callers and processes them with one batched call.
+
+    A background thread takes the first pending item, then keeps collecting until either
+    ``max_batch_size`` items are queued or ``max_wait_ms`` has passed, and hands the batch
+    to ``batch_fn``. Each caller gets its own result back through a future.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0, name: str = "micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item; the future resolves to its entry in the batch result"""
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        """Queue an item and block until its result is ready"""
+        return self.submit(item).result()
+
+    def _collect(self) -> List:
+        """Block for one item, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is _STOP:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                # Finish this batch, then let the loop see the stop marker
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            # Skip callers that gave up before the batch ran
+            live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            try:
+                results = self.batch_fn([item for item, _ in live])
+                for (_, future), result in zip(live, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched call failed for {len(live)} items: {str(e)}")
+                for _, future in live:
+                    future.set_exception(e)
+            self.batches += 1
+            self.items += len(live)
+
+    def close(self):
+        """Process what is queued, then stop the worker"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        """Batch counters"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize()
+        }
@@ -0,0 +1,272 @@
+"""Chunking strategies that split document text into pieces for embedding"""
+import re
+import abc
+import logging
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+CHUNK_STRATEGIES = ("character", "token", "sentence", "recursive")
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(tokenizer, texts: List[str]) -> List[int]:
+    """Token count of each text, without special tokens, in one batched tokenizer call"""
+    if not texts:
+        return []
+    encoded = tokenizer(texts, add_special_tokens=False, verbose=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+class Chunker(abc.ABC):
+    """Splits text into chunks"""
+
+    def chunk(self, text: str) -> List[str]:
+        """Split one text"""
+        return self.chunk_many([text])[0]
+
+    @abc.abstractmethod
+    def chunk_many(self, texts: List[str]) -> List[List[str]]:
+        """Split several texts, sharing tokenizer calls between them"""
+
+    @abc.abstractmethod
+    def config(self) -> Dict:
+        """Settings that determine the chunks produced, for detecting changes"""
+
+
+class CharacterChunker(Chunker):
+    """Fixed-size character windows with overlap (the original strategy)"""
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def chunk_many(self, texts: List[str]) -> List[List[str]]:
+        results = []
+        for text in texts:
+            chunks = []
+            start = 0
+            while start < len(text):
+                end = start + self.chunk_size
+                chunks.append(text[start:end])
+                start = end - self.chunk_overlap
+            results.append(chunks)
+        return results
+
+    def config(self) -> Dict:
+        return {"strategy": "character", "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap}
+
+
+class TokenChunker(Chunker):
+    """Windows of at most ``max_tokens`` tokens, measured with the embedding tokenizer.
+
+    Chunk boundaries fall on token boundaries and chunks are sliced from the original
+    text using the tokenizer's character offsets, so nothing is lost to truncation.
+    Consecutive windows share ``overlap_tokens`` tokens.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 0):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _offsets(self, texts: List[str]) -> List[List[Sequence[int]]]:
+        """Character span of every token in each text, from one batched tokenizer call"""
+        encoded = self.tokenizer(
+            texts, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )
+        return encoded["offset_mapping"]
+
+    def chunk_many(self, texts: List[str]) -> List[List[str]]:
+        if not texts:
+            return []
+        step = self.max_tokens - self.overlap_tokens
+        results = []
+        for text, offsets in zip(texts, self._offsets(texts)):
+            chunks = []
+            for start in range(0, len(offsets), step):
+                window = offsets[start:start + self.max_tokens]
+                chunks.append(text[window[0][0]:window[-1][1]])
+                if start + self.max_tokens >= len(offsets):
+                    break
+            results.append(chunks)
+        return results
+
+    def config(self) -> Dict:
+        return {"strategy": "token", "max_tokens": self.max_tokens, "overlap_tokens": self.overlap_tokens}
+
+
+class SentenceChunker(Chunker):
+    """Packs whole paragraphs, or failing that whole sentences, into token-budgeted chunks.
+
+    A paragraph that fits within ``max_tokens`` is never split; larger ones are split
+    at sentence ends, and a single sentence over the budget falls back to token windows.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self._fallback = TokenChunker(tokenizer, max_tokens)
+
+    def _chunk_text(self, text: str) -> List[str]:
+        paragraphs = [[s.strip() for s in _SENTENCE_END.split(p) if s.strip()] for p in _PARAGRAPH_BREAK.split(text)]
+        paragraphs = [sentences for sentences in paragraphs if sentences]
+        sentences = [sentence for paragraph in paragraphs for sentence in paragraph]
+        counts = iter(count_tokens(self.tokenizer, sentences))
+
+        chunks: List[str] = []
+        current: List[str] = []  # Paragraph texts in the chunk being built
+        current_tokens = 0
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+
+        for paragraph in paragraphs:
+            sentence_counts = [next(counts) for _ in paragraph]
+            paragraph_tokens = sum(sentence_counts)
+            if paragraph_tokens <= self.max_tokens:
+                if current_tokens + paragraph_tokens > self.max_tokens:
+                    flush()
+                current.append(" ".join(paragraph))
+                current_tokens += paragraph_tokens
+                continue
+
+            # Paragraph over budget: pack its sentences on their own
+            flush()
+            packed: List[str] = []
+            packed_tokens = 0
+            for sentence, tokens in zip(paragraph, sentence_counts):
+                if packed and packed_tokens + tokens > self.max_tokens:
+                    chunks.append(" ".join(packed))
+                    packed, packed_tokens = [], 0
+                if tokens > self.max_tokens:
+                    chunks.extend(self._fallback.chunk(sentence))
+                    continue
+                packed.append(sentence)
+                packed_tokens += tokens
+            if packed:
+                chunks.append(" ".join(packed))
+        flush()
+        return chunks
+
+    def chunk_many(self, texts: List[str]) -> List[List[str]]:
+        return [self._chunk_text(text) for text in texts]
+
+    def config(self) -> Dict:
+        return {"strategy": "sentence", "max_tokens": self.max_tokens}
+
+
+class RecursiveChunker(Chunker):
+    """Splits on the coarsest separator that yields pieces within ``max_tokens``.
+
+    Text is split on the first separator (paragraphs), adjacent pieces are merged while
+    they fit the budget, and any piece still over budget is split again with the next
+    separator (lines, sentences, words), ending with token windows. Token counts for all
+    pieces at one level are measured in a single tokenizer call.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, separators: Sequence[str] = ("\n\n", "\n", ". ", " ")):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.separators = tuple(separators)
+        self._fallback = TokenChunker(tokenizer, max_tokens)
+
+    def _split(self, text: str, level: int) -> List[str]:
+        """Chunks for a text known to exceed the budget"""
+        if level >= len(self.separators):
+            return self._fallback.chunk(text)
+
+        separator = self.separators[level]
+        parts = text.split(separator)
+        # Keep each separator attached to the piece before it
+        pieces = [part + separator for part in parts[:-1]] + [parts[-1]]
+        pieces = [piece for piece in pieces if piece.strip()]
+        counts = count_tokens(self.tokenizer, pieces)
+
+        chunks: List[str] = []
+        current = ""
+        current_tokens = 0
+        for piece, tokens in zip(pieces, counts):
+            if current and current_tokens + tokens > self.max_tokens:
+                chunks.append(current.strip())
+                current, current_tokens = "", 0
+            if tokens > self.max_tokens:
+                chunks.extend(self._split(piece, level + 1))
+                continue
+            current += piece
+            current_tokens += tokens
+        if current.strip():
+            chunks.append(current.strip())
+        return chunks
+
+    def chunk_many(self, texts: List[str]) -> List[List[str]]:
+        results = []
+        for text, tokens in zip(texts, count_tokens(self.tokenizer, texts)):
+            if not text.strip():
+                results.append([])
+            elif tokens <= self.max_tokens:
+                results.append([text.strip()])
+            else:
+                results.append(self._split(text, 0))
+        return results
+
+    def config(self) -> Dict:
+        return {"strategy": "recursive", "max_tokens": self.max_tokens, "separators": list(self.separators)}
+
+
+def create_chunker(strategy: str, tokenizer=None, max_tokens: int = 256, overlap_tokens: int = 0,
+                   chunk_size: int = 1000, chunk_overlap: int = 200) -> Chunker:
+    """Build the chunker for a strategy name"""
+    if strategy == "character":
+        return CharacterChunker(chunk_size, chunk_overlap)
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunk strategy: {strategy}. Options: {', '.join(CHUNK_STRATEGIES)}")
+    if tokenizer is None:
+        raise ValueError(f"The {strategy} chunk strategy needs a tokenizer")
+    if strategy == "token":
+        return TokenChunker(tokenizer, max_tokens, overlap_tokens)
+    if strategy == "sentence":
+        return SentenceChunker(tokenizer, max_tokens)
+    return RecursiveChunker(tokenizer, max_tokens)
+
+
+class ChunkStats:
+    """Running chunk-length statistics, including chunks the embedding model would truncate"""
+
+    def __init__(self, token_limit: int):
+        self.token_limit = token_limit
+        self.chunks = 0
+        self.tokens = 0
+        self.max_chunk_tokens = 0
+        self.truncated_chunks = 0
+        self.truncated_tokens = 0
+
+    def record(self, token_counts: List[int]):
+        """Add the token counts of a batch of chunks"""
+        for tokens in token_counts:
+            self.chunks += 1
+            self.tokens += tokens
+            self.max_chunk_tokens = max(self.max_chunk_tokens, tokens)
+            if tokens > self.token_limit:
+                self.truncated_chunks += 1
+                self.truncated_tokens += tokens - self.token_limit
+
+    def as_metrics(self) -> Dict[str, float]:
+        """Statistics as MLflow metrics"""
+        return {
+            "chunk_count": self.chunks,
+            "mean_chunk_tokens": self.tokens / self.chunks if self.chunks else 0.0,
+            "max_chunk_tokens": self.max_chunk_tokens,
+            "truncated_chunks": self.truncated_chunks,
+            "truncated_fraction": self.truncated_chunks / self.chunks if self.chunks else 0.0,
+            "truncated_tokens": self.truncated_tokens
+        }
@@ -0,0 +1,101 @@
+"""Bounded execution of blocking query work off the event loop"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StageLimiter:
+    """Caps how many threads run one pipeline stage at once and counts those waiting.
+
+    Used as a context manager around a stage (guardrails, embedding, search, generation);
+    threads beyond ``max_concurrency`` block until a slot frees up.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.waiting += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+        self._semaphore.release()
+        return False
+
+    def stats(self) -> Dict:
+        """Current queue depth and throughput counters"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed
+        }
+
+
+_stages: Dict[str, StageLimiter] = {
+    "guardrails": StageLimiter("guardrails", settings.GUARDRAILS_CONCURRENCY),
+    "embedding": StageLimiter("embedding", settings.EMBEDDING_CONCURRENCY),
+    "search": StageLimiter("search", settings.SEARCH_CONCURRENCY),
+    "generation": StageLimiter("generation", settings.GENERATION_CONCURRENCY),
+}
+
+
+def stage(name: str) -> StageLimiter:
+    """Limiter for a named pipeline stage"""
+    return _stages[name]
+
+
+class QueryExecutor:
+    """Thread pool that runs blocking query work for async endpoints"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn`` on the pool without blocking the event loop"""
+        with self._lock:
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> Dict:
+        """Executor size, requests in flight, and per-stage queue depth"""
+        return {
+            "max_workers": self.max_workers,
+            "pending": self.pending,
+            "stages": {name: limiter.stats() for name, limiter in _stages.items()}
+        }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running tasks"""
+        self._executor.shutdown(wait=True)
+
+
+query_executor = QueryExecutor(settings.QUERY_WORKERS)
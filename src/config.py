@@ -17,11 +17,68 @@ class Settings(BaseSettings):
     USE_OPENAI: bool = False
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_BASE_URL: Optional[str] = None  # Any OpenAI-compatible endpoint
+    
+    # OpenAI Client
+    OPENAI_MAX_CONNECTIONS: int = 100  # Pooled HTTP connections kept by the shared client
+    OPENAI_MAX_IN_FLIGHT: int = 16  # Concurrent requests; further calls wait for a slot
+    OPENAI_MAX_RETRIES: int = 3  # Retries on 429, 5xx, timeouts and connection errors
+    OPENAI_RETRY_BACKOFF_SECONDS: float = 0.5  # Base of the jittered exponential backoff
+    OPENAI_RETRY_BACKOFF_MAX_SECONDS: float = 8.0
+    OPENAI_TIMEOUT_SECONDS: float = 30.0  # Per attempt
+    
+    # Embedding Backend
+    EMBEDDING_BACKEND: str = "torch"  # Options: torch, onnx (CPU, exported once and cached)
+    EMBEDDING_ONNX_DIR: str = "./data/onnx_models"
+    EMBEDDING_ONNX_QUANTIZE: bool = True  # Dynamic int8 quantization of the exported model
+    EMBEDDING_ONNX_MIN_COSINE: float = 0.99  # Minimum agreement with PyTorch for an export to be used
+    EMBEDDING_ONNX_THREADS: int = 0  # ONNX Runtime intra-op threads; 0 uses its default
+    
+    # Embedding Cache
+    EMBEDDING_CACHE_SIZE: int = 10000  # In-memory LRU entries; 0 disables the memory tier
+    EMBEDDING_CACHE_DIR: Optional[str] = None  # Enables the on-disk tier when set
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 1000000
+    
+    # Query Embedding Micro-batching
+    EMBEDDING_BATCHING: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
     
     # Vector DB Configuration
     VECTOR_DB_TYPE: str = "faiss"  # Options: faiss, pinecone, weaviate
     VECTOR_DB_PATH: str = "./data/vector_db"
     FAISS_INDEX_PATH: str = "./data/faiss_index"
+    FAISS_INDEX_TYPE: str = "flat"  # Options: flat, ivf_flat, ivf_pq, hnsw
+    FAISS_NLIST: int = 1024  # IVF coarse clusters (clamped to the training set size; retrained as the corpus grows)
+    FAISS_NPROBE: int = 16  # IVF clusters visited per query
+    FAISS_PQ_M: int = 48  # PQ sub-quantizers; must divide the embedding dimension
+    FAISS_PQ_NBITS: int = 8
+    FAISS_HNSW_M: int = 32
+    FAISS_HNSW_EF_CONSTRUCTION: int = 200
+    FAISS_HNSW_EF_SEARCH: int = 64
+    FAISS_COMPRESSION: str = "none"  # Vector codes: none, sq8, fp16, pq (flat, hnsw; ivf_flat takes sq8/fp16)
+    FAISS_PCA_DIM: int = 0  # Project vectors to this many dimensions with PCA trained at ingest (needs as many chunks); 0 disables
+    FAISS_EXACT_RESCORE: bool = False  # Keep full vectors too and re-rank the compressed shortlist exactly
+    FAISS_RESCORE_K_FACTOR: float = 4.0  # Shortlist size for exact rescoring, as a multiple of k
+    FAISS_MMAP: bool = False  # Serve the index memory-mapped read-only, also after each ingestion (flat codes need faiss-cpu>=1.11)
+    METADATA_COMPRESSION: bool = False  # zlib-compress chunk text in the metadata store
+    
+    # Hybrid Retrieval
+    HYBRID_SEARCH: bool = False  # Keep a BM25 index next to the vectors and fuse both result lists (changes retrieval, so opt-in)
+    HYBRID_CANDIDATES: int = 50  # Hits taken from each of the BM25 and vector legs before fusion
+    RRF_K: int = 60  # Reciprocal-rank fusion constant; larger values flatten the rank weighting
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    
+    # Reranking
+    RERANK: bool = False  # Rescore retrieved candidates with a cross-encoder before prompting
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 50  # Chunks retrieved for reranking
+    RERANK_TOP_N: int = 3  # Chunks kept after reranking, in place of TOP_K_RETRIEVAL
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_BUDGET_MS: float = 150.0  # Past this the request keeps vector order
+    RERANK_MAX_LENGTH: int = 512  # Query + chunk tokens seen by the cross-encoder
+    RERANK_WORKERS: int = 2  # Threads running the cross-encoder
     
     # Pinecone Configuration (if using)
     PINECONE_API_KEY: Optional[str] = None
@@ -30,22 +87,57 @@ class Settings(BaseSettings):
     
     # Document Processing
     DOCUMENTS_PATH: str = "./data/documents"
-    CHUNK_SIZE: int = 1000
+    CHUNK_STRATEGY: str = "recursive"  # Options: character, token, sentence, recursive
+    CHUNK_MAX_TOKENS: Optional[int] = None  # Token budget per chunk; defaults to the embedding model's limit
+    CHUNK_OVERLAP_TOKENS: int = 0  # Token overlap between windows of the token strategy
+    CHUNK_SIZE: int = 1000  # Characters, for the character strategy
     CHUNK_OVERLAP: int = 200
+    PDF_WORKERS: int = 0  # Extraction processes; 0 uses every core, 1 extracts in-process
+    PDF_PAGES_PER_TASK: int = 16  # Pages extracted per pool task
+    PDF_TIMEOUT_SECONDS: float = 300.0  # A file taking longer than this is skipped
+    INGEST_BATCH_SIZE: int = 256  # Chunks embedded and added per batch
+    INGEST_QUEUE_SIZE: int = 4  # Items buffered between streaming ingestion stages
+    INGEST_TRAIN_SIZE: int = 50000  # Vectors collected to train IVF indexes before adding
     
     # RAG Configuration
     TOP_K_RETRIEVAL: int = 5
     TEMPERATURE: float = 0.7
     MAX_TOKENS: int = 2000  # Increased for more complete answers
+    CONTEXT_MAX_TOKENS: int = 2048  # Retrieved context packed into the prompt, in generation-model tokens
+    
+    # Local Generation Scheduling
+    CONTINUOUS_BATCHING: bool = True  # Batch concurrent local generations in one decode loop
+    GENERATION_TOKEN_BUDGET: int = 16384  # Max prompt + new tokens across the active batch
+    GENERATION_MAX_BATCH_SIZE: int = 8
+    PREFIX_KV_CACHE: bool = True  # Reuse the prompt preamble's attention cache instead of recomputing it
+    
+    # Speculative Decoding
+    SPECULATIVE_DECODING: bool = False  # The local LLM verifies tokens proposed by DRAFT_MODEL; replaces continuous batching
+    DRAFT_MODEL: Optional[str] = None  # Small model sharing LLM_MODEL's tokenizer
+    SPECULATIVE_NUM_TOKENS: int = 5  # Draft tokens proposed per verification step
+    SPECULATIVE_SCHEDULE: str = "constant"  # constant, or heuristic to adapt the lookahead to acceptance
+    
+    # Answer Cache
+    ANSWER_CACHE_SIZE: int = 1000  # 0 disables the cache
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_SIZE: int = 1000  # Near-duplicate question cache; 0 disables it
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a semantic hit
     
     # Guardrails
     ENABLE_GUARDRAILS: bool = True
     REBUFF_API_KEY: Optional[str] = None
     MAX_QUERY_LENGTH: int = 500
+    MAX_BATCH_QUERIES: int = 5000  # Upper bound on questions per /query/batch call
     
     # API Configuration
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    QUERY_WORKERS: int = 16  # Threads running blocking query work off the event loop
+    GUARDRAILS_CONCURRENCY: int = 8
+    EMBEDDING_CONCURRENCY: int = 4
+    SEARCH_CONCURRENCY: int = 8
+    GENERATION_CONCURRENCY: int = 2  # Local LLMs rarely benefit from more; OpenAI uses OPENAI_MAX_IN_FLIGHT
+    JOB_HISTORY_SIZE: int = 100  # Finished background jobs kept for status lookups
     
     # Model Optimization
     USE_QUANTIZATION: bool = True
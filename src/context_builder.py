@@ -0,0 +1,117 @@
+"""Prompt context assembly from retrieved chunks under a token budget"""
+import logging
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+# Shorter matches between neighbouring chunks are more likely coincidence than overlap
+MIN_OVERLAP_CHARS = 16
+
+
+def merge_overlapping(first: str, second: str) -> str:
+    """Join two consecutive chunks, writing text they share at the seam only once"""
+    for size in range(min(len(first), len(second)), MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return f"{first}\n{second}"
+
+
+class _Block:
+    """A run of consecutive chunks from one source"""
+
+    def __init__(self, source: str, chunk_index: int, text: str, rank: int):
+        self.source = source
+        self.last_index = chunk_index
+        self.text = text
+        self.rank = rank  # Best retrieval rank among its chunks
+
+
+class ContextBuilder:
+    """Builds LLM context from search results without repeated text, within a token budget.
+
+    Chunks from the same source whose indices are adjacent are merged into one block,
+    with the overlap between neighbours written once. Chunks whose text already appears
+    in a kept block are dropped. Blocks are then packed in order of their best retrieval
+    rank until ``max_tokens`` (measured with ``count_tokens`` for the target model) is
+    used; the block that crosses the budget is cut to fit.
+    """
+
+    def __init__(self, count_tokens: TokenCounter, max_tokens: int, separator: str = "\n\n"):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.separator = separator
+
+    def _blocks(self, results: List[Tuple[Dict, float]]) -> List[_Block]:
+        """Merge retrieved chunks into blocks, in rank order"""
+        chunks = []
+        for rank, item in enumerate(results):
+            try:
+                doc = item[0]
+                if isinstance(doc, dict) and doc.get("content"):
+                    chunks.append((doc.get("source", ""), int(doc.get("chunk_index", 0)), doc["content"], rank))
+            except (IndexError, TypeError, ValueError) as e:
+                logger.warning(f"Error extracting context from result: {str(e)}")
+
+        # Walk each source's chunks in document order so neighbours meet
+        blocks: List[_Block] = []
+        current = None
+        for source, chunk_index, text, rank in sorted(chunks, key=lambda chunk: (chunk[0], chunk[1])):
+            if current is not None and current.source == source and chunk_index == current.last_index:
+                current.rank = min(current.rank, rank)  # Same chunk retrieved twice
+            elif current is not None and current.source == source and chunk_index == current.last_index + 1:
+                current.text = merge_overlapping(current.text, text)
+                current.last_index = chunk_index
+                current.rank = min(current.rank, rank)
+            else:
+                current = _Block(source, chunk_index, text, rank)
+                blocks.append(current)
+
+        # Drop blocks whose text is contained in a higher-ranked one (e.g. duplicate files)
+        kept: List[_Block] = []
+        for block in sorted(blocks, key=lambda block: block.rank):
+            if not any(block.text in other.text for other in kept):
+                kept.append(block)
+        return kept
+
+    def _truncate(self, text: str, tokens: int, budget: int) -> str:
+        """Cut text to roughly ``budget`` tokens, ending on a word boundary"""
+        while tokens > budget and text:
+            text = text[:max(0, int(len(text) * budget / tokens) - 1)]
+            cut = text.rfind(" ")
+            if cut > 0:
+                text = text[:cut]
+            tokens = self.count_tokens([text])[0] if text else 0
+        return text
+
+    def build(self, results: List[Tuple[Dict, float]]) -> str:
+        """Context text for the given search results (empty if they carry none)"""
+        blocks = self._blocks(results)
+        if not blocks:
+            return ""
+
+        texts = [block.text for block in blocks]
+        counts = self.count_tokens(texts)
+        separator_tokens = self.count_tokens([self.separator])[0]
+
+        parts = []
+        used = 0
+        for text, tokens in zip(texts, counts):
+            cost = tokens + (separator_tokens if parts else 0)
+            if used + cost > self.max_tokens:
+                remaining = self.max_tokens - used - (separator_tokens if parts else 0)
+                if remaining > 0:
+                    text = self._truncate(text, tokens, remaining)
+                    if text:
+                        parts.append(text)
+                        used = self.max_tokens
+                break
+            parts.append(text)
+            used += cost
+
+        logger.debug(
+            f"Context: {len(results)} chunks merged into {len(blocks)} blocks, {len(parts)} used; "
+            f"{used} of {sum(counts)} tokens"
+        )
+        return self.separator.join(parts)
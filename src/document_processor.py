@@ -1,65 +1,200 @@
 """Document processing module for PDF ingestion"""
 import os
+import time
+import multiprocessing
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict
+from typing import Deque, List, Dict, Iterator, Optional
 from pypdf import PdfReader
 import logging
+from src.config import settings
+from src.chunking import Chunker, CharacterChunker
 
 logger = logging.getLogger(__name__)
 
 
+def _count_pages(file_path: str) -> int:
+    """Number of pages in a PDF (runs in a worker process)"""
+    return len(PdfReader(file_path).pages)
+
+
+def _extract_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Text of pages ``start`` to ``stop`` of a PDF (runs in a worker process)"""
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+class _Extraction:
+    """A file being extracted by the pool"""
+    
+    def __init__(self, pdf_file: Path, count):
+        self.pdf_file = pdf_file
+        self.count = count  # AsyncResult for the page count
+        self.ranges = None  # AsyncResults for page ranges, once the count is known
+
+
+def _join_pages(pages: List[str]) -> str:
+    """Concatenate page texts, one newline after each page"""
+    return "".join(f"{page}\n" for page in pages)
+
+
 class DocumentProcessor:
     """Process PDF documents and extract text"""
     
-    def __init__(self, documents_path: str):
+    def __init__(self, documents_path: str, workers: Optional[int] = None,
+                 pages_per_task: Optional[int] = None, timeout: Optional[float] = None,
+                 chunker: Optional[Chunker] = None):
         self.documents_path = Path(documents_path)
         self.documents_path.mkdir(parents=True, exist_ok=True)
+        self.chunker = chunker or CharacterChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+        workers = settings.PDF_WORKERS if workers is None else workers
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.pages_per_task = pages_per_task or settings.PDF_PAGES_PER_TASK
+        self.timeout = settings.PDF_TIMEOUT_SECONDS if timeout is None else timeout
     
     def load_pdf(self, file_path: str) -> str:
         """Extract text from a PDF file"""
         try:
             reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            text = _join_pages([page.extract_text() or "" for page in reader.pages])
             logger.info(f"Successfully loaded PDF: {file_path}")
             return text
         except Exception as e:
             logger.error(f"Error loading PDF {file_path}: {str(e)}")
             raise
     
+    def list_documents(self) -> List[Path]:
+        """List PDF files in the documents directory, sorted by name"""
+        if not self.documents_path.exists():
+            logger.warning(f"Documents directory does not exist: {self.documents_path}")
+            return []
+        return sorted(self.documents_path.glob("*.pdf"))
+    
     def load_all_documents(self) -> List[Dict[str, str]]:
         """Load all PDF documents from the documents directory"""
-        documents = []
+        return self.load_documents(self.list_documents())
+    
+    def load_documents(self, pdf_files: List[Path]) -> List[Dict[str, str]]:
+        """Load the given PDF files in order, skipping any that fail to parse"""
+        return list(self.iter_documents(pdf_files))
+    
+    def iter_documents(self, pdf_files: List[Path]) -> Iterator[Dict[str, str]]:
+        """Yield the given PDF files as documents in order, skipping any that fail to parse.
+
+        Only a bounded window of files is extracted ahead of the consumer, so memory does
+        not grow with the number of files.
+        """
+        if self.workers > 1 and pdf_files:
+            texts = self._iter_parallel(pdf_files)
+        else:
+            texts = (self._load_or_skip(pdf_file) for pdf_file in pdf_files)
         
-        if not self.documents_path.exists():
-            logger.warning(f"Documents directory does not exist: {self.documents_path}")
-            return documents
+        for pdf_file, text in zip(pdf_files, texts):
+            if text is None:
+                continue
+            logger.info(f"Loaded document: {pdf_file.name}")
+            yield {
+                "content": text,
+                "source": pdf_file.name,
+                "path": str(pdf_file)
+            }
+    
+    def _load_or_skip(self, pdf_file: Path) -> Optional[str]:
+        """Extract a file in-process, returning None if it fails"""
+        try:
+            return self.load_pdf(str(pdf_file))
+        except Exception as e:
+            logger.error(f"Failed to load {pdf_file.name}: {str(e)}")
+            return None
+    
+    def _iter_parallel(self, pdf_files: List[Path]) -> Iterator[Optional[str]]:
+        """Extract text across a process pool in page-range tasks, yielding one text per file.
+
+        Up to ``2 * workers`` files are in flight at once. Their page counts are read
+        concurrently, and each file's pages are queued as ranges of ``pages_per_task`` as
+        soon as its count is known. Texts are reassembled and yielded in file and page
+        order. A file whose count or pages are not ready within ``timeout`` seconds of
+        the consumer reaching it is skipped (None). Its tasks would keep occupying
+        workers, so the pool is then terminated and recreated, and the other files in
+        flight are queued again on the new pool.
+
+        Workers are spawned rather than forked, since the parent already runs model and
+        client threads whose locks a forked child could inherit mid-use.
+        """
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(processes=self.workers)
+        window = 2 * self.workers
+        files = iter(pdf_files)
+        in_flight: Deque[_Extraction] = deque()
+        timed_out = False
         
-        for pdf_file in self.documents_path.glob("*.pdf"):
+        def wait(result, deadline, pdf_file):
+            nonlocal timed_out
             try:
-                text = self.load_pdf(str(pdf_file))
-                documents.append({
-                    "content": text,
-                    "source": pdf_file.name,
-                    "path": str(pdf_file)
-                })
-                logger.info(f"Loaded document: {pdf_file.name}")
+                return result.get(timeout=max(0.0, deadline - time.monotonic()))
+            except multiprocessing.TimeoutError:
+                logger.error(f"Timed out after {self.timeout}s extracting {pdf_file.name}; skipping it")
+                timed_out = True
             except Exception as e:
                 logger.error(f"Failed to load {pdf_file.name}: {str(e)}")
+            return None
+        
+        def queue_pages(extraction, num_pages):
+            extraction.ranges = [
+                pool.apply_async(_extract_pages, (str(extraction.pdf_file), start, min(start + self.pages_per_task, num_pages)))
+                for start in range(0, num_pages, self.pages_per_task)
+            ]
         
-        return documents
+        try:
+            while True:
+                # Keep the window full, and queue pages for every file whose count is in
+                for pdf_file in islice(files, window - len(in_flight)):
+                    in_flight.append(_Extraction(pdf_file, pool.apply_async(_count_pages, (str(pdf_file),))))
+                if not in_flight:
+                    return
+                for extraction in in_flight:
+                    if extraction.ranges is None and extraction.count.ready() and extraction.count.successful():
+                        queue_pages(extraction, extraction.count.get())
+                
+                extraction = in_flight.popleft()
+                deadline = time.monotonic() + self.timeout
+                if extraction.ranges is None:
+                    num_pages = wait(extraction.count, deadline, extraction.pdf_file)
+                    if num_pages is not None:
+                        queue_pages(extraction, num_pages)
+                
+                pages = None
+                if extraction.ranges is not None:
+                    pages = []
+                    for page_range in extraction.ranges:
+                        result = wait(page_range, deadline, extraction.pdf_file)
+                        if result is None:
+                            pages = None
+                            break
+                        pages.extend(result)
+                
+                if timed_out:
+                    # Free the workers stuck on this file and start the others over
+                    pool.terminate()
+                    pool.join()
+                    pool = context.Pool(processes=self.workers)
+                    for pending in in_flight:
+                        pending.count = pool.apply_async(_count_pages, (str(pending.pdf_file),))
+                        pending.ranges = None
+                    timed_out = False
+                yield None if pages is None else _join_pages(pages)
+        finally:
+            if timed_out or in_flight:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+    
+    def chunk(self, text: str) -> List[str]:
+        """Split text into chunks with the configured chunker"""
+        return self.chunker.chunk(text)
     
     def chunk_text(self, text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
-        """Split text into overlapping chunks"""
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start = end - chunk_overlap
-        
-        return chunks
-
+        """Split text into overlapping fixed-size character chunks"""
+        return CharacterChunker(chunk_size, chunk_overlap).chunk(text)
@@ -0,0 +1,150 @@
+"""Two-tier (memory + disk) cache for text embeddings"""
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """LRU cache of embeddings keyed by model name and text hash.
+
+    The memory tier is an ``OrderedDict`` bounded by entry count. The optional disk tier
+    is a SQLite table in ``disk_path`` that survives restarts; it is bounded the same way
+    and evicts the least recently accessed rows. Memory misses that hit disk are promoted.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 10000,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 1000000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if disk_path:
+            db_file = Path(disk_path) / "embeddings.sqlite"
+            db_file.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_file), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, accessed REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON embeddings (accessed)")
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logger.info(f"Opened embedding disk cache at {db_file} with {self._disk_count} entries")
+
+    def key(self, text: str) -> str:
+        """Cache key for a text under this cache's model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Look up texts, returning cached vectors by position; missing positions are absent"""
+        found: Dict[int, np.ndarray] = {}
+        keys = [self.key(text) for text in texts]
+
+        with self._lock:
+            disk_lookups: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key) if self.max_entries > 0 else None
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            if disk_lookups and self._db is not None:
+                for key, vector in self._disk_get(list(disk_lookups)).items():
+                    for i in disk_lookups.pop(key):
+                        found[i] = vector
+                        self.disk_hits += 1
+                    self._memory_put(key, vector)
+
+            self.misses += sum(len(positions) for positions in disk_lookups.values())
+        return found
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store vectors for texts in both tiers"""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._memory_put(key, vector)
+            if self._db is not None:
+                self._disk_put(keys, vectors)
+
+    def _memory_put(self, key: str, vector: np.ndarray):
+        """Insert into the memory tier, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Fetch vectors from the disk tier and refresh their access time"""
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype='float32')
+        if found:
+            now = time.time()
+            self._db.executemany("UPDATE embeddings SET accessed = ? WHERE key = ?", [(now, key) for key in found])
+            self._db.commit()
+        return found
+
+    def _disk_put(self, keys: List[str], vectors: np.ndarray):
+        """Write vectors to the disk tier, evicting the least recently accessed rows"""
+        now = time.time()
+        before = self._db.total_changes
+        self._db.executemany(
+            "INSERT OR IGNORE INTO embeddings (key, vector, accessed) VALUES (?, ?, ?)",
+            [(key, np.asarray(vector, dtype='float32').tobytes(), now) for key, vector in zip(keys, vectors)]
+        )
+        self._disk_count += self._db.total_changes - before
+
+        excess = self._disk_count - self.disk_max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed, rowid LIMIT ?)",
+                (excess,)
+            )
+            self._disk_count -= excess
+        self._db.commit()
+
+    def clear(self):
+        """Drop all cached vectors from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._disk_count = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and tier sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_count if self._db is not None else None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
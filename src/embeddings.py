@@ -1,9 +1,14 @@
 """Embedding generation using HuggingFace models"""
 import logging
 from typing import List
+import numpy as np
 from sentence_transformers import SentenceTransformer
 import torch
 from src.config import settings
+from src.embedding_cache import EmbeddingCache
+from src.batching import MicroBatcher
+from src.chunking import count_tokens
+from src.onnx_backend import load_encoder_or_none
 
 logger = logging.getLogger(__name__)
 
@@ -14,25 +19,108 @@ class EmbeddingGenerator:
     def __init__(self, model_name: str = None):
         self.model_name = model_name or settings.EMBEDDING_MODEL
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Loading embedding model: {self.model_name} on {self.device}")
-        self.model = SentenceTransformer(self.model_name, device=self.device)
-        logger.info("Embedding model loaded successfully")
+        self.backend = "torch"
+        self.model = None
+        if settings.EMBEDDING_BACKEND == "onnx":
+            self.model = load_encoder_or_none(
+                self.model_name,
+                settings.EMBEDDING_ONNX_DIR,
+                quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+                min_cosine=settings.EMBEDDING_ONNX_MIN_COSINE,
+                num_threads=settings.EMBEDDING_ONNX_THREADS
+            )
+            if self.model is not None:
+                self.backend = "onnx-int8" if settings.EMBEDDING_ONNX_QUANTIZE else "onnx"
+                self.device = "cpu"
+        elif settings.EMBEDDING_BACKEND != "torch":
+            raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}. Options: torch, onnx")
+        if self.model is None:
+            logger.info(f"Loading embedding model: {self.model_name} on {self.device}")
+            self.model = SentenceTransformer(self.model_name, device=self.device)
+        logger.info(f"Embedding model loaded successfully ({self.backend})")
+        
+        self.cache = None
+        if settings.EMBEDDING_CACHE_SIZE > 0 or settings.EMBEDDING_CACHE_DIR:
+            # ONNX vectors differ slightly from PyTorch ones, so they are cached separately
+            cache_name = self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}"
+            self.cache = EmbeddingCache(
+                cache_name,
+                max_entries=settings.EMBEDDING_CACHE_SIZE,
+                disk_path=settings.EMBEDDING_CACHE_DIR,
+                disk_max_entries=settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES
+            )
+        
+        # Concurrent single-text requests are coalesced into one model call
+        self.batcher = None
+        if settings.EMBEDDING_BATCHING:
+            self.batcher = MicroBatcher(
+                self.encode,
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+                name="embedding-batcher"
+            )
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts"""
+    @property
+    def dimension(self) -> int:
+        """Dimension of the vectors produced by the model"""
+        return self.model.get_sentence_embedding_dimension()
+    
+    @property
+    def tokenizer(self):
+        """The model's tokenizer"""
+        return self.model.tokenizer
+    
+    @property
+    def max_tokens(self) -> int:
+        """Tokens of text the model embeds before truncating, excluding special tokens"""
+        special_tokens = len(self.tokenizer("", add_special_tokens=True)["input_ids"])
+        return self.model.max_seq_length - special_tokens
+    
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Token count of each text, in one batched tokenizer call"""
+        return count_tokens(self.tokenizer, texts)
+    
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Generate embeddings for a list of texts as a float32 matrix, reusing cached vectors"""
+        if self.cache is None:
+            return self._encode(texts, show_progress_bar)
+        
+        if not texts:
+            return np.empty((0, self.dimension), dtype='float32')
+        
+        cached = self.cache.get_many(texts)
+        if len(cached) == len(texts):
+            return np.stack([cached[i] for i in range(len(texts))])
+        
+        # Encode each distinct missing text once
+        missing_texts = list(dict.fromkeys(text for i, text in enumerate(texts) if i not in cached))
+        computed = self._encode(missing_texts, show_progress_bar)
+        self.cache.put_many(missing_texts, computed)
+        
+        computed_by_text = dict(zip(missing_texts, computed))
+        return np.stack([cached[i] if i in cached else computed_by_text[text] for i, text in enumerate(texts)])
+    
+    def _encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Run the model over a list of texts"""
         try:
             embeddings = self.model.encode(
                 texts,
                 convert_to_numpy=True,
-                show_progress_bar=True
+                show_progress_bar=show_progress_bar
             )
             logger.info(f"Generated embeddings for {len(texts)} texts")
-            return embeddings.tolist()
+            return embeddings.astype('float32')
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
     
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts"""
+        return self.encode(texts, show_progress_bar=True).tolist()
+    
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text"""
-        return self.generate_embeddings([text])[0]
+        if self.batcher is not None:
+            return self.batcher(text).tolist()
+        return self.encode([text])[0].tolist()
 
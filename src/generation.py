@@ -0,0 +1,333 @@
+"""Continuous batching scheduler for local HuggingFace causal LMs"""
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Deque, Dict, Iterator, List, Optional
+import torch
+
+logger = logging.getLogger(__name__)
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # Older transformers only understand legacy tuple caches
+    DynamicCache = None
+
+
+class _Sequence:
+    """One prompt being generated"""
+
+    def __init__(self, prompt_ids: List[int], max_new_tokens: int, future: Future,
+                 deltas: Optional["queue.Queue"] = None, cancelled: Optional[threading.Event] = None):
+        self.prompt_ids = prompt_ids
+        self.max_new_tokens = max_new_tokens
+        self.future = future
+        self.deltas = deltas  # Receives text increments as tokens are decoded, when streaming
+        self.cancelled = cancelled  # Set by the caller to stop generating
+        self.generated: List[int] = []
+        # Streaming decodes only generated[prefix_offset:]; tokens before read_offset are already sent
+        self.prefix_offset = 0
+        self.read_offset = 0
+
+    def is_cancelled(self) -> bool:
+        """Whether the caller cancelled the future or set the cancel flag"""
+        if self.cancelled is not None and self.cancelled.is_set():
+            self.future.cancel()
+        return self.future.cancelled()
+
+    @property
+    def token_cost(self) -> int:
+        """Tokens this sequence may occupy in the KV cache at its longest"""
+        return len(self.prompt_ids) + self.max_new_tokens
+
+
+class GenerationScheduler:
+    """Decodes many prompts together, admitting new ones as others finish.
+
+    Active sequences share one batched KV cache, left-padded to a common length and
+    masked with an attention mask. Every step decodes one token for every active
+    sequence. Between steps, finished sequences leave the batch and pending prompts
+    are prefilled and join it, as long as the summed ``prompt + max_new_tokens`` of
+    the batch stays within ``token_budget``. A prompt larger than the budget still
+    runs, alone. With a ``prefix_cache``, prefill starts from a copy of the cached
+    keys/values of the shared prompt prefix and only runs over the remaining tokens.
+    Cancelling a future, setting the ``cancelled`` event passed with a prompt, or
+    closing a stream before it ends frees its row before the next step.
+    """
+
+    def __init__(self, model, tokenizer, token_budget: int = 16384, max_batch_size: int = 8,
+                 temperature: float = 0.7, prefix_cache=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.temperature = temperature
+        self.device = next(model.parameters()).device
+        self.eos_token_id = tokenizer.eos_token_id
+        self.prefix_cache = prefix_cache
+
+        self._pending: Deque[_Sequence] = deque()
+        self._active: List[_Sequence] = []
+        self._past = None  # Per-layer (key, value) tensors shaped [batch, heads, length, head_dim]
+        self._attention_mask: Optional[torch.Tensor] = None
+        self._condition = threading.Condition()
+        self._stopped = False
+
+        self.generated_tokens = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.busy_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="generation-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt: str, max_new_tokens: int, deltas: Optional["queue.Queue"] = None,
+               cancelled: Optional[threading.Event] = None) -> Future:
+        """Queue a prompt; the future resolves to the generated text (without the prompt)"""
+        future: Future = Future()
+        prompt_ids = self.tokenizer(prompt, add_special_tokens=True)["input_ids"]
+        with self._condition:
+            self._pending.append(_Sequence(prompt_ids, max_new_tokens, future, deltas, cancelled))
+            self._condition.notify()
+        return future
+
+    def stream(self, prompt: str, max_new_tokens: int,
+               cancelled: Optional[threading.Event] = None) -> Iterator[str]:
+        """Queue a prompt and yield its text in increments as tokens are decoded.
+
+        Setting ``cancelled`` ends the stream early, after the text sent so far.
+        """
+        deltas: "queue.Queue" = queue.Queue()
+        future = self.submit(prompt, max_new_tokens, deltas, cancelled)
+        try:
+            while True:
+                delta = deltas.get()
+                if delta is None:
+                    break
+                yield delta
+            # Surface generation errors to the consumer
+            if not future.cancelled():
+                future.result()
+        finally:
+            # A consumer that stops reading early gives up its batch slot
+            future.cancel()
+
+    def generate(self, prompt: str, max_new_tokens: int) -> str:
+        """Queue a prompt and block until its text is ready"""
+        return self.submit(prompt, max_new_tokens).result()
+
+    def _forward(self, input_ids, attention_mask, position_ids, past=None):
+        """Run the model one step, returning last-position logits and the legacy-format cache"""
+        if past is not None and DynamicCache is not None and getattr(self.model, "_supports_cache_class", False):
+            past = DynamicCache.from_legacy_cache(past)
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=past,
+                use_cache=True
+            )
+        past = outputs.past_key_values
+        if hasattr(past, "to_legacy_cache"):
+            past = past.to_legacy_cache()
+        return outputs.logits[:, -1, :], past
+
+    def _sample(self, logits: torch.Tensor) -> torch.Tensor:
+        """Pick the next token for each row"""
+        if self.temperature <= 0:
+            return logits.argmax(dim=-1)
+        probs = torch.softmax(logits.float() / self.temperature, dim=-1)
+        return torch.multinomial(probs, num_samples=1).squeeze(-1)
+
+    def _admit(self):
+        """Prefill pending prompts that fit in the budget and merge them into the batch"""
+        while self._pending and len(self._active) < self.max_batch_size:
+            used = sum(seq.token_cost for seq in self._active)
+            candidate = self._pending[0]
+            if self._active and used + candidate.token_cost > self.token_budget:
+                return
+            with self._condition:
+                seq = self._pending.popleft()
+            # Futures stay pending while they run, so callers can still cancel them
+            if seq.is_cancelled():
+                self._resolve(seq)
+                self.cancelled += 1
+                continue
+
+            try:
+                reused = self.prefix_cache.match(seq.prompt_ids) if self.prefix_cache is not None else 0
+                prefix_past = self.prefix_cache.past(reused) if reused else None
+                input_ids = torch.tensor([seq.prompt_ids[reused:]], device=self.device)
+                mask = torch.ones((1, len(seq.prompt_ids)), dtype=torch.long, device=self.device)
+                position_ids = torch.arange(reused, len(seq.prompt_ids), device=self.device).unsqueeze(0)
+                logits, past = self._forward(input_ids, mask, position_ids, prefix_past)
+                seq.generated.append(int(self._sample(logits)[0]))
+                self._merge(seq, past, mask)
+                self._emit(seq)
+            except Exception as e:
+                logger.error(f"Prefill failed for a {len(seq.prompt_ids)}-token prompt: {str(e)}")
+                self._fail(seq, e)
+
+    def _merge(self, seq: _Sequence, past, mask: torch.Tensor):
+        """Left-pad the batch cache and a new sequence's cache to one length and stack them"""
+        if not self._active:
+            self._active = [seq]
+            self._past = past
+            self._attention_mask = mask
+            return
+
+        batch_len = self._attention_mask.shape[1]
+        seq_len = mask.shape[1]
+        target = max(batch_len, seq_len)
+
+        def pad(tensor, length, dim):
+            if length == 0:
+                return tensor
+            shape = list(tensor.shape)
+            shape[dim] = length
+            return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+        self._past = tuple(
+            (
+                torch.cat([pad(batch_k, target - batch_len, 2), pad(seq_k, target - seq_len, 2)], dim=0),
+                torch.cat([pad(batch_v, target - batch_len, 2), pad(seq_v, target - seq_len, 2)], dim=0)
+            )
+            for (batch_k, batch_v), (seq_k, seq_v) in zip(self._past, past)
+        )
+        self._attention_mask = torch.cat(
+            [pad(self._attention_mask, target - batch_len, 1), pad(mask, target - seq_len, 1)], dim=0
+        )
+        self._active.append(seq)
+
+    def _emit(self, seq: _Sequence):
+        """Send a streaming sequence the text its newest tokens added.
+
+        Only the tokens since the last sent increment are decoded, together with the
+        increment before them so that tokenizers which drop a leading space from the
+        first decoded token still produce the right text. This keeps each step's work
+        independent of how long the answer already is.
+        """
+        if seq.deltas is None:
+            return
+        sent = self.tokenizer.decode(seq.generated[seq.prefix_offset:seq.read_offset], skip_special_tokens=True)
+        text = self.tokenizer.decode(seq.generated[seq.prefix_offset:], skip_special_tokens=True)
+        # Wait for multi-token characters to complete
+        if len(text) <= len(sent) or text.endswith("\ufffd"):
+            return
+        seq.deltas.put(text[len(sent):])
+        seq.prefix_offset = seq.read_offset
+        seq.read_offset = len(seq.generated)
+
+    def _resolve(self, seq: _Sequence, result=None, error: Optional[Exception] = None):
+        """Set a sequence's outcome, unblocking any stream consumer"""
+        if seq.deltas is not None:
+            seq.deltas.put(None)
+        try:
+            if error is not None:
+                seq.future.set_exception(error)
+            else:
+                seq.future.set_result(result)
+        except InvalidStateError:
+            pass  # Cancelled by the caller in the meantime
+
+    def _fail(self, seq: _Sequence, error: Exception):
+        """Resolve a sequence with an error"""
+        self._resolve(seq, error=error)
+
+    def _is_finished(self, seq: _Sequence) -> bool:
+        """Whether a sequence hit EOS or its token limit"""
+        return (
+            len(seq.generated) >= seq.max_new_tokens
+            or (self.eos_token_id is not None and seq.generated[-1] == self.eos_token_id)
+        )
+
+    def _retire(self):
+        """Resolve finished sequences, drop cancelled ones, and remove their rows from the batch"""
+        keep = []
+        for row, seq in enumerate(self._active):
+            if seq.is_cancelled():
+                self._resolve(seq)
+                self.cancelled += 1
+            elif self._is_finished(seq):
+                text = self.tokenizer.decode(seq.generated, skip_special_tokens=True)
+                self._resolve(seq, text.strip())
+                self.completed += 1
+            else:
+                keep.append(row)
+
+        if len(keep) == len(self._active):
+            return
+        if not keep:
+            self._active, self._past, self._attention_mask = [], None, None
+            return
+
+        rows = torch.tensor(keep, device=self.device)
+        mask = self._attention_mask.index_select(0, rows)
+        # Trim columns that are padding for every remaining row
+        first = int((mask.sum(dim=0) > 0).nonzero()[0])
+        self._attention_mask = mask[:, first:]
+        self._past = tuple(
+            (k.index_select(0, rows)[:, :, first:], v.index_select(0, rows)[:, :, first:]) for k, v in self._past
+        )
+        self._active = [self._active[row] for row in keep]
+
+    def _step(self):
+        """Decode one token for every active sequence"""
+        input_ids = torch.tensor([[seq.generated[-1]] for seq in self._active], device=self.device)
+        mask = torch.cat([self._attention_mask, self._attention_mask.new_ones((len(self._active), 1))], dim=1)
+        position_ids = (mask.sum(dim=1, keepdim=True) - 1).to(self.device)
+        logits, self._past = self._forward(input_ids, mask, position_ids, self._past)
+        self._attention_mask = mask
+        for seq, token in zip(self._active, self._sample(logits).tolist()):
+            seq.generated.append(int(token))
+            self._emit(seq)
+        self.generated_tokens += len(self._active)
+
+    def _fail_active(self, error: Exception):
+        """Fail every active sequence and reset the batch"""
+        logger.error(f"Generation step failed for {len(self._active)} sequences: {str(error)}")
+        for seq in self._active:
+            self._fail(seq, error)
+        self._active, self._past, self._attention_mask = [], None, None
+
+    def _run(self):
+        """Scheduler loop"""
+        while True:
+            with self._condition:
+                while not self._pending and not self._active and not self._stopped:
+                    self._condition.wait()
+                if self._stopped and not self._pending and not self._active:
+                    return
+
+            start = time.perf_counter()
+            try:
+                self._admit()
+                self._retire()
+                if self._active:
+                    self._step()
+                    self._retire()
+            except Exception as e:
+                self._fail_active(e)
+            self.busy_seconds += time.perf_counter() - start
+
+    def close(self):
+        """Finish queued work, then stop the scheduler thread"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        """Queue sizes and throughput"""
+        return {
+            "pending": len(self._pending),
+            "active": len(self._active),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "generated_tokens": self.generated_tokens,
+            "tokens_per_second": self.generated_tokens / self.busy_seconds if self.busy_seconds else 0.0,
+            "token_budget": self.token_budget
+        }
@@ -0,0 +1,80 @@
+"""Streaming helpers for bounded-memory ingestion"""
+import queue
+import logging
+import threading
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries a producer exception across the queue"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of ``size`` items (the last may be shorter)"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def prefetch(items: Iterable[T], maxsize: int, name: str = "prefetch") -> Iterator[T]:
+    """Advance ``items`` on a background thread, buffering at most ``maxsize`` results.
+
+    Lets consecutive pipeline stages overlap while the bounded queue applies
+    backpressure: the producer blocks once the consumer falls ``maxsize`` items behind.
+    Producer exceptions are re-raised in the consumer. Closing the returned generator
+    early stops the producer at its next item.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        """Queue an item unless the consumer has gone away"""
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Release the upstream stage's resources on this thread, where it ran
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
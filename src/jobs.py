@@ -0,0 +1,108 @@
+"""Background job queue for long-running work such as ingestion"""
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """One unit of background work and its outcome"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable view of the job"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class JobQueue:
+    """Runs submitted jobs one at a time on a background thread.
+
+    Jobs are kept in submission order for status lookups; once more than
+    ``max_history`` jobs exist, the oldest finished ones are forgotten.
+    """
+
+    def __init__(self, max_history: int = 100, name: str = "jobs"):
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> Job:
+        """Queue ``fn(*args, **kwargs)``; its return value becomes the job result"""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        """Worker body for one job"""
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.error(f"{job.kind} job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+        return job
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit; the caller holds the lock"""
+        excess = len(self._jobs) - self.max_history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at is not None][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by id"""
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """Known jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stats(self) -> Dict:
+        """Job counts by status"""
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self.list():
+            counts[job.status] += 1
+        return counts
+
+    def shutdown(self):
+        """Finish queued jobs, then stop the worker"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,290 @@
+"""BM25 inverted index over chunk text, for lexical retrieval alongside the vector index"""
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TERMS_FILE = "bm25_terms.json"
+INDPTR_FILE = "bm25_indptr.npy"
+DOC_IDS_FILE = "bm25_doc_ids.npy"
+TERM_FREQS_FILE = "bm25_term_freqs.npy"
+DOC_LENGTHS_FILE = "bm25_doc_lengths.npy"
+_ARRAY_FILES = (INDPTR_FILE, DOC_IDS_FILE, TERM_FREQS_FILE, DOC_LENGTHS_FILE)
+
+# Identifiers such as SKU-1042-B, ERR_404 or v2.3.1 stay whole; their parts are indexed too
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./:#][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+# Words frequent enough that their postings would dominate query time for no ranking benefit
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or "
+    "that the their then there these they this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of a text, keeping compound identifiers alongside their parts"""
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.append(token)
+        terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[int]:
+    """Merge ranked id lists, scoring each id by the sum of ``1 / (k + rank)`` over the lists"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    # Ties keep first-seen order, which favours the first ranking
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _merge_sorted(docs: np.ndarray, scores: np.ndarray, other_docs: np.ndarray,
+                  other_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Union of two id-sorted score lists, summing the scores of shared ids"""
+    merged = np.concatenate([docs, other_docs])
+    # A stable sort of two sorted runs is a linear-time merge
+    order = np.argsort(merged, kind="stable")
+    merged = merged[order]
+    starts = np.flatnonzero(np.concatenate([[True], merged[1:] != merged[:-1]]))
+    return merged[starts], np.add.reduceat(np.concatenate([scores, other_scores])[order], starts)
+
+
+class BM25Index:
+    """Okapi BM25 over documents addressed by position, matching the vector index ids.
+
+    Postings are held in CSR form: for term ``t``, ``doc_ids[indptr[t]:indptr[t + 1]]``
+    lists the documents containing it, in id order, with their term frequencies. A query
+    touches only the postings of its own terms and scores them with vectorized numpy, so
+    rare terms such as product codes cost microseconds regardless of corpus size.
+
+    Added documents are buffered and merged into the postings on the next search, save
+    or removal, so batched ingestion does not rewrite the arrays once per batch.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.terms: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype='int64')
+        self.doc_ids = np.empty(0, dtype='int32')
+        self.term_freqs = np.empty(0, dtype='uint16')
+        self.doc_lengths = np.empty(0, dtype='int32')
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._num_docs = 0
+        self._length_norm = np.empty(0, dtype='float32')
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._num_docs
+
+    def _term_id(self, term: str) -> int:
+        """Return the id for a term, adding it to the vocabulary if new"""
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self._term_ids[term] = term_id
+        return term_id
+
+    def add(self, texts: List[str]):
+        """Index texts as the next documents, in order"""
+        term_ids, doc_ids, term_freqs = [], [], []
+        lengths = np.empty(len(texts), dtype='int32')
+        for i, text in enumerate(texts):
+            terms = tokenize(text)
+            lengths[i] = len(terms)
+            for term, freq in Counter(terms).items():
+                term_ids.append(self._term_id(term))
+                doc_ids.append(self._num_docs + i)
+                term_freqs.append(min(freq, 65535))
+        self._pending.append((
+            np.array(term_ids, dtype='int32'),
+            np.array(doc_ids, dtype='int32'),
+            np.array(term_freqs, dtype='uint16'),
+            lengths
+        ))
+        self._num_docs += len(texts)
+
+    def _posting_terms(self) -> np.ndarray:
+        """Term id of every posting in the CSR arrays"""
+        return np.repeat(np.arange(len(self.indptr) - 1, dtype='int32'), np.diff(self.indptr))
+
+    def _set_postings(self, term_ids: np.ndarray, doc_ids: np.ndarray, term_freqs: np.ndarray,
+                      doc_lengths: np.ndarray):
+        """Rebuild the CSR arrays from postings that are in doc order within each term"""
+        order = np.argsort(term_ids, kind="stable")
+        counts = np.bincount(term_ids, minlength=len(self.terms))
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype('int64')
+        self.doc_ids = doc_ids[order]
+        self.term_freqs = term_freqs[order]
+        self.doc_lengths = doc_lengths
+        self._update_length_norm()
+
+    def _update_length_norm(self):
+        """Precompute the per-document length term of the BM25 denominator"""
+        avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        relative = self.doc_lengths / avg_length if avg_length > 0 else np.ones(len(self.doc_lengths))
+        self._length_norm = (self.k1 * (1 - self.b + self.b * relative)).astype('float32')
+
+    def _flush(self):
+        """Merge buffered documents into the postings"""
+        with self._lock:
+            if not self._pending:
+                return
+            self._set_postings(
+                np.concatenate([self._posting_terms()] + [p[0] for p in self._pending]),
+                np.concatenate([self.doc_ids] + [p[1] for p in self._pending]),
+                np.concatenate([self.term_freqs] + [p[2] for p in self._pending]),
+                np.concatenate([self.doc_lengths] + [p[3] for p in self._pending])
+            )
+            self._pending = []
+
+    def _term_scores(self, docs: np.ndarray, freqs: np.ndarray, idf: float) -> np.ndarray:
+        """BM25 contribution of one term to each of the given documents"""
+        freqs = freqs.astype('float32')
+        return idf * freqs * (self.k1 + 1) / (freqs + self._length_norm[docs])
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and BM25 scores of the ``k`` best-matching documents, best first.
+
+        Terms are scored rarest first. Once the ``k``-th best score so far exceeds what
+        the remaining terms could add up to (each adds at most ``idf * (k1 + 1)``), no
+        unseen document can reach the top ``k`` and the remaining, more common terms are
+        only looked up for the current candidates (MaxScore pruning). Their long postings
+        are then binary-searched instead of scanned.
+        """
+        self._flush()
+        num_docs = len(self.doc_lengths)
+        empty = (np.empty(0, dtype='int64'), np.empty(0, dtype='float32'))
+        term_ids = {self._term_ids[term] for term in tokenize(query) if term in self._term_ids}
+        terms = sorted((int(self.indptr[t + 1] - self.indptr[t]), t) for t in term_ids)
+        terms = [(frequency, term_id) for frequency, term_id in terms if frequency > 0]
+        if num_docs == 0 or not terms or k <= 0:
+            return empty
+
+        idfs = [math.log(1 + (num_docs - frequency + 0.5) / (frequency + 0.5)) for frequency, _ in terms]
+        # Upper bound on what terms[j:] can add to any one document
+        remaining = np.cumsum([idf * (self.k1 + 1) for idf in idfs][::-1])[::-1].tolist()
+
+        docs = np.empty(0, dtype='int32')
+        scores = np.empty(0, dtype='float32')
+        for j, ((_, term_id), idf) in enumerate(zip(terms, idfs)):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            posting_docs = self.doc_ids[start:end]
+            freqs = self.term_freqs[start:end]
+
+            if len(scores) >= k:
+                threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+                if remaining[j] <= threshold:
+                    keep = scores + remaining[j] >= threshold
+                    docs, scores = docs[keep], scores[keep]
+                    positions = np.minimum(np.searchsorted(posting_docs, docs), len(posting_docs) - 1)
+                    hit = posting_docs[positions] == docs
+                    scores[hit] += self._term_scores(docs[hit], freqs[positions[hit]], idf)
+                    continue
+
+            term_scores = self._term_scores(posting_docs, freqs, idf)
+            if len(docs) == 0:
+                docs, scores = np.asarray(posting_docs), term_scores
+            elif len(docs) + len(posting_docs) > num_docs // 8:
+                # Long postings: accumulating into a dense array is cheaper than sorting them
+                dense = np.zeros(num_docs, dtype='float32')
+                dense[docs] = scores
+                dense[posting_docs] += term_scores
+                docs = np.flatnonzero(dense)
+                scores = dense[docs]
+            else:
+                docs, scores = _merge_sorted(docs, scores, posting_docs, term_scores)
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            docs, scores = docs[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return docs[order].astype('int64'), scores[order]
+
+    def remove(self, ids: Sequence[int]):
+        """Remove documents by position; later positions shift down to stay contiguous"""
+        self._flush()
+        keep = np.ones(len(self.doc_lengths), dtype=bool)
+        keep[np.asarray(list(ids), dtype='int64')] = False
+        new_ids = (np.cumsum(keep) - 1).astype('int32')
+        kept_postings = keep[self.doc_ids]
+        self._set_postings(
+            self._posting_terms()[kept_postings],
+            new_ids[self.doc_ids[kept_postings]],
+            self.term_freqs[kept_postings],
+            self.doc_lengths[keep]
+        )
+        self._num_docs = len(self.doc_lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate in-memory size of the postings and vocabulary"""
+        self._flush()
+        return (
+            self.indptr.nbytes + self.doc_ids.nbytes + self.term_freqs.nbytes
+            + self.doc_lengths.nbytes + self._length_norm.nbytes + sum(len(term) for term in self.terms)
+        )
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        """Whether a saved index is present in a directory"""
+        return (Path(directory) / TERMS_FILE).exists()
+
+    @staticmethod
+    def delete(directory: Path):
+        """Remove a saved index from a directory"""
+        for filename in (TERMS_FILE,) + _ARRAY_FILES:
+            (Path(directory) / filename).unlink(missing_ok=True)
+
+    def save(self, directory: Path):
+        """Save the index to a directory"""
+        self._flush()
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so processes that have the old files mapped keep a valid view
+        for filename, array in zip(_ARRAY_FILES, (self.indptr, self.doc_ids, self.term_freqs, self.doc_lengths)):
+            with open(directory / f"{filename}.tmp", "wb") as f:
+                np.save(f, array)
+        with open(directory / f"{TERMS_FILE}.tmp", "w") as f:
+            json.dump({"terms": self.terms}, f)
+        for filename in _ARRAY_FILES + (TERMS_FILE,):
+            (directory / f"{filename}.tmp").replace(directory / filename)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = False, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """Load an index from a directory, optionally memory-mapping the postings read-only.
+
+        Raw term frequencies are stored, so ``k1`` and ``b`` can differ from the ones in
+        use when the index was built.
+        """
+        directory = Path(directory)
+        with open(directory / TERMS_FILE, "r") as f:
+            data = json.load(f)
+
+        index = cls(k1=k1, b=b)
+        index.terms = data["terms"]
+        index._term_ids = {term: i for i, term in enumerate(index.terms)}
+
+        mmap_mode = "r" if mmap else None
+        index.indptr = np.load(directory / INDPTR_FILE)
+        index.doc_ids = np.load(directory / DOC_IDS_FILE, mmap_mode=mmap_mode)
+        index.term_freqs = np.load(directory / TERM_FREQS_FILE, mmap_mode=mmap_mode)
+        index.doc_lengths = np.load(directory / DOC_LENGTHS_FILE)
+        index._num_docs = len(index.doc_lengths)
+        index._update_length_norm()
+        return index
@@ -0,0 +1,221 @@
+"""Shared async OpenAI client with pooled connections, bounded concurrency and retries"""
+import queue
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class OpenAIClient:
+    """Long-lived ``AsyncOpenAI`` client shared by every request thread.
+
+    The client and its HTTP connection pool live on a private event loop running in a
+    background thread, so connections and TLS sessions are reused across calls while
+    callers on the query pool stay synchronous. At most ``max_in_flight`` requests are
+    sent at once; the rest wait for a slot. Rate limits (429), server errors (5xx),
+    timeouts and connection errors are retried up to ``max_retries`` times with full
+    jitter exponential backoff, honouring ``Retry-After`` when the server sends one.
+    Each attempt is bounded by ``timeout`` seconds.
+    """
+
+    def __init__(self, api_key: Optional[str], model: str, base_url: Optional[str] = None,
+                 max_connections: int = 100, max_in_flight: int = 16, max_retries: int = 3,
+                 backoff_seconds: float = 0.5, backoff_max_seconds: float = 8.0, timeout: float = 30.0):
+        import openai
+
+        self._openai = openai
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.timeout = timeout
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.waiting = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="openai-client", daemon=True)
+        self._thread.start()
+
+        # Build the pool limits with the HTTP library openai itself was built against
+        limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,  # Retries are handled here so they respect the in-flight cap
+            timeout=timeout,
+            http_client=openai.DefaultAsyncHttpxClient(limits=limits)
+        )
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether a failed attempt is worth repeating"""
+        if isinstance(error, (self._openai.APIConnectionError, asyncio.TimeoutError)):
+            return True  # Includes APITimeoutError
+        if isinstance(error, self._openai.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retry number ``attempt`` (starting at 0)"""
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt))
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass  # HTTP-date form; fall back to the jittered delay
+        return min(delay, self.backoff_max_seconds)
+
+    async def _acquire(self):
+        """Wait for an in-flight slot"""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self):
+        """Free an in-flight slot"""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _with_retries(self, attempt_fn, keep_slot: bool = False):
+        """Run ``attempt_fn`` under an in-flight slot, retrying transient failures.
+
+        With ``keep_slot`` the slot stays held after success and the caller releases it.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._acquire()
+            self.requests += 1
+            try:
+                result = await asyncio.wait_for(attempt_fn(), self.timeout)
+            except asyncio.CancelledError:
+                self._release()
+                raise
+            except Exception as e:
+                self._release()
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    self.failures += 1
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"OpenAI request failed ({e.__class__.__name__}); retry {attempt + 1} in {delay:.2f}s")
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            if not keep_slot:
+                self._release()
+            return result
+
+    async def _complete(self, messages: List[Dict], **params) -> str:
+        async def attempt():
+            response = await self._client.chat.completions.create(
+                model=self.model, messages=messages, timeout=self.timeout, **params
+            )
+            return response.choices[0].message.content or ""
+
+        return await self._with_retries(attempt)
+
+    async def _stream(self, messages: List[Dict], **params) -> AsyncIterator[str]:
+        """Yield text increments; only failures before the first increment are retried"""
+        async def attempt():
+            stream = await self._client.chat.completions.create(
+                model=self.model, messages=messages, timeout=self.timeout, stream=True, **params
+            )
+            iterator = stream.__aiter__()
+            try:
+                # Read up to the first text under the retry policy, so a stream that fails to start is retried
+                async for chunk in iterator:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        return stream, iterator, chunk.choices[0].delta.content
+            except BaseException:
+                await stream.close()
+                raise
+            return stream, iterator, None
+
+        # The slot is held until the stream is fully read
+        stream, iterator, first = await self._with_retries(attempt, keep_slot=True)
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in iterator:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            self._release()
+            await stream.close()
+
+    def submit(self, messages: List[Dict], **params) -> Future:
+        """Start a chat completion without waiting; the future resolves to its text"""
+        return asyncio.run_coroutine_threadsafe(self._complete(messages, **params), self._loop)
+
+    def complete(self, messages: List[Dict], **params) -> str:
+        """Create a chat completion, blocking the calling thread until it is ready"""
+        return self.submit(messages, **params).result()
+
+    async def acomplete(self, messages: List[Dict], **params) -> str:
+        """Create a chat completion from any event loop"""
+        future = asyncio.run_coroutine_threadsafe(self._complete(messages, **params), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def stream(self, messages: List[Dict], **params) -> Iterator[str]:
+        """Stream a chat completion to the calling thread as text increments"""
+        deltas: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for delta in self._stream(messages, **params):
+                    deltas.put(delta)
+            except Exception as e:
+                deltas.put(e)
+            finally:
+                deltas.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item = deltas.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop generating if the consumer went away early
+            future.cancel()
+
+    def close(self):
+        """Close pooled connections and stop the event loop thread"""
+        async def shutdown():
+            await self._client.close()
+            await self._loop.shutdown_asyncgens()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        """Request, retry and concurrency counters"""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures
+        }
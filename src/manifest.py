@@ -0,0 +1,95 @@
+"""Ingestion manifest tracking per-file content hashes and chunk-id ranges"""
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """Persisted record of which files are in the vector index and where their chunks live.
+
+    Each entry maps a source file name to its content hash and the contiguous
+    range of chunk ids ``[start, start + count)`` it occupies in the index. The
+    chunker settings the chunks were produced with are recorded alongside.
+    """
+
+    def __init__(self, index_path: str):
+        self.manifest_file = Path(index_path) / MANIFEST_FILENAME
+        self.files: Dict[str, Dict] = {}
+        self.chunking: Optional[Dict] = None
+        self._load()
+
+    def _load(self):
+        """Load an existing manifest if available"""
+        if not self.manifest_file.exists():
+            return
+        try:
+            with open(self.manifest_file, "r") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.chunking = data.get("chunking")
+            logger.info(f"Loaded ingestion manifest with {len(self.files)} files")
+        except Exception as e:
+            logger.warning(f"Could not load ingestion manifest: {str(e)}")
+            self.files = {}
+            self.chunking = None
+
+    @property
+    def total_chunks(self) -> int:
+        """Total number of chunks recorded across all files"""
+        return sum(entry["count"] for entry in self.files.values())
+
+    def get_hash(self, source: str) -> Optional[str]:
+        """Return the recorded content hash for a file, if any"""
+        entry = self.files.get(source)
+        return entry["sha256"] if entry else None
+
+    def chunk_ids(self, source: str) -> List[int]:
+        """Return the chunk ids occupied by a file"""
+        entry = self.files.get(source)
+        if entry is None:
+            return []
+        return list(range(entry["start"], entry["start"] + entry["count"]))
+
+    def add(self, source: str, sha256: str, start: int, count: int):
+        """Record a file and its chunk-id range"""
+        self.files[source] = {"sha256": sha256, "start": start, "count": count}
+
+    def remove(self, source: str):
+        """Forget a file"""
+        self.files.pop(source, None)
+
+    def compact(self):
+        """Re-number chunk ranges after removals so they stay contiguous from zero"""
+        next_start = 0
+        for source, entry in sorted(self.files.items(), key=lambda item: item[1]["start"]):
+            entry["start"] = next_start
+            next_start += entry["count"]
+
+    def reset(self):
+        """Drop all entries"""
+        self.files = {}
+        self.chunking = None
+
+    def save(self):
+        """Save manifest to disk"""
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"chunking": self.chunking, "files": self.files}, f, indent=2)
+        tmp_file.replace(self.manifest_file)
+        logger.info(f"Saved ingestion manifest with {len(self.files)} files")
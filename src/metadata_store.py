@@ -0,0 +1,214 @@
+"""Compact columnar storage for per-chunk metadata"""
+import json
+import zlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TABLES_FILE = "metadata_tables.json"
+SOURCE_IDS_FILE = "metadata_source_ids.npy"
+CHUNK_INDICES_FILE = "metadata_chunk_indices.npy"
+TEXT_OFFSETS_FILE = "metadata_text_offsets.npy"
+TEXT_FILE = "metadata_text.bin"
+
+
+def _append(array: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Append to a 1-D array, returning a view over storage that grows geometrically.
+
+    Repeated small appends (one per ingestion batch) then cost amortized O(len(values))
+    instead of copying the whole column every time.
+    """
+    size = len(array)
+    storage = array.base
+    if (
+        not isinstance(storage, np.ndarray)
+        or storage.base is not None
+        or storage.ndim != 1
+        or storage.dtype != array.dtype
+        or storage.ctypes.data != array.ctypes.data
+        or len(storage) < size + len(values)
+    ):
+        storage = np.empty(max(2 * size, size + len(values), 16), dtype=array.dtype)
+        storage[:size] = array
+    storage[size:size + len(values)] = values
+    return storage[:size + len(values)]
+
+
+class ColumnarMetadataStore:
+    """Metadata for indexed chunks, stored column-wise instead of as one dict per chunk.
+
+    Source names and paths are interned into small tables, chunk indices and source ids
+    live in integer arrays, and all chunk text sits in one contiguous UTF-8 blob addressed
+    by offsets (each chunk optionally zlib-compressed). Entries are materialized as dicts
+    only when indexed, so a search pays for the top-k hits and nothing else.
+    """
+
+    def __init__(self, compress: bool = False):
+        self.compress = compress
+        self.sources: List[str] = []
+        self.paths: List[str] = []
+        self._source_lookup: Dict[str, int] = {}
+        self.source_ids = np.empty(0, dtype='int32')
+        self.chunk_indices = np.empty(0, dtype='int32')
+        self.text_offsets = np.zeros(1, dtype='int64')
+        self._text = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.source_ids)
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Metadata index {i} out of range")
+        source_id = int(self.source_ids[i])
+        return {
+            "content": self.get_content(i),
+            "source": self.sources[source_id],
+            "chunk_index": int(self.chunk_indices[i]),
+            "path": self.paths[source_id]
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def get_content(self, i: int) -> str:
+        """Decode the text of a single chunk"""
+        raw = bytes(self._text[self.text_offsets[i]:self.text_offsets[i + 1]])
+        if self.compress:
+            raw = zlib.decompress(raw)
+        return raw.decode("utf-8")
+
+    def _intern_source(self, source: str, path: str) -> int:
+        """Return the id for a source, adding it to the tables if new"""
+        source_id = self._source_lookup.get(source)
+        if source_id is None:
+            source_id = len(self.sources)
+            self.sources.append(source)
+            self.paths.append(path)
+            self._source_lookup[source] = source_id
+        return source_id
+
+    def extend(self, metadatas: List[Dict]):
+        """Append metadata dicts with ``content``, ``source``, ``chunk_index`` and ``path`` keys"""
+        if self.is_mapped:
+            raise ValueError("Memory-mapped metadata is read-only")
+
+        source_ids = np.empty(len(metadatas), dtype='int32')
+        chunk_indices = np.empty(len(metadatas), dtype='int32')
+        lengths = np.empty(len(metadatas), dtype='int64')
+
+        for i, meta in enumerate(metadatas):
+            source_ids[i] = self._intern_source(meta.get("source", ""), meta.get("path", ""))
+            chunk_indices[i] = meta.get("chunk_index", 0)
+            raw = meta.get("content", "").encode("utf-8")
+            if self.compress:
+                raw = zlib.compress(raw)
+            self._text.extend(raw)
+            lengths[i] = len(raw)
+
+        self.source_ids = _append(self.source_ids, source_ids)
+        self.chunk_indices = _append(self.chunk_indices, chunk_indices)
+        self.text_offsets = _append(self.text_offsets, self.text_offsets[-1] + np.cumsum(lengths))
+
+    def remove(self, ids: List[int]):
+        """Remove entries by position, keeping the remaining ones in order"""
+        if self.is_mapped:
+            raise ValueError("Memory-mapped metadata is read-only")
+
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(list(ids), dtype='int64')] = False
+
+        text = bytearray()
+        lengths = np.empty(int(keep.sum()), dtype='int64')
+        for j, i in enumerate(np.flatnonzero(keep)):
+            segment = self._text[self.text_offsets[i]:self.text_offsets[i + 1]]
+            text.extend(segment)
+            lengths[j] = len(segment)
+
+        # Drop sources that no longer have any chunks
+        source_ids = self.source_ids[keep]
+        used, remapped = np.unique(source_ids, return_inverse=True)
+        self.sources = [self.sources[s] for s in used]
+        self.paths = [self.paths[s] for s in used]
+        self._source_lookup = {source: i for i, source in enumerate(self.sources)}
+
+        self.source_ids = remapped.astype('int32')
+        self.chunk_indices = self.chunk_indices[keep]
+        self.text_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype('int64')
+        self._text = text
+
+    @property
+    def is_mapped(self) -> bool:
+        """Whether the columns are memory-mapped from disk"""
+        return not isinstance(self._text, bytearray)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate in-memory size of the columns and text blob"""
+        return (
+            self.source_ids.nbytes + self.chunk_indices.nbytes + self.text_offsets.nbytes + len(self._text)
+            + sum(len(s) + len(p) for s, p in zip(self.sources, self.paths))
+        )
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        """Whether a saved store is present in a directory"""
+        return (Path(directory) / TABLES_FILE).exists()
+
+    def save(self, directory: Path):
+        """Save columns to a directory"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so processes that have the old files mapped keep a valid view
+        for filename, array in (
+            (SOURCE_IDS_FILE, self.source_ids),
+            (CHUNK_INDICES_FILE, self.chunk_indices),
+            (TEXT_OFFSETS_FILE, self.text_offsets),
+        ):
+            with open(directory / f"{filename}.tmp", "wb") as f:
+                np.save(f, array)
+        with open(directory / f"{TEXT_FILE}.tmp", "wb") as f:
+            f.write(self._text)
+        with open(directory / f"{TABLES_FILE}.tmp", "w") as f:
+            json.dump({"compress": self.compress, "sources": self.sources, "paths": self.paths}, f)
+        for filename in (SOURCE_IDS_FILE, CHUNK_INDICES_FILE, TEXT_OFFSETS_FILE, TEXT_FILE, TABLES_FILE):
+            (directory / f"{filename}.tmp").replace(directory / filename)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = False) -> "ColumnarMetadataStore":
+        """Load columns from a directory, optionally memory-mapping them read-only"""
+        directory = Path(directory)
+        with open(directory / TABLES_FILE, "r") as f:
+            tables = json.load(f)
+
+        store = cls(compress=tables["compress"])
+        store.sources = tables["sources"]
+        store.paths = tables["paths"]
+        store._source_lookup = {source: i for i, source in enumerate(store.sources)}
+
+        mmap_mode = "r" if mmap else None
+        store.source_ids = np.load(directory / SOURCE_IDS_FILE, mmap_mode=mmap_mode)
+        store.chunk_indices = np.load(directory / CHUNK_INDICES_FILE, mmap_mode=mmap_mode)
+        store.text_offsets = np.load(directory / TEXT_OFFSETS_FILE, mmap_mode=mmap_mode)
+
+        text_file = directory / TEXT_FILE
+        if mmap and text_file.stat().st_size > 0:
+            store._text = np.memmap(text_file, dtype='uint8', mode='r')
+        elif mmap:
+            # Zero-length files can't be mapped; an empty read-only buffer behaves the same
+            store._text = np.empty(0, dtype='uint8')
+        else:
+            store._text = bytearray(text_file.read_bytes())
+        return store
+
+    @classmethod
+    def from_dicts(cls, metadatas: List[Dict], compress: bool = False) -> "ColumnarMetadataStore":
+        """Build a store from a list of metadata dicts"""
+        store = cls(compress=compress)
+        store.extend(metadatas)
+        return store
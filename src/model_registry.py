@@ -0,0 +1,97 @@
+"""Process-wide registry so each model is loaded once and shared"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Thread-safe cache of loaded models keyed by what they were loaded with.
+
+    Loading happens under a per-key lock, so concurrent callers asking for the same
+    model wait for one load instead of each starting their own.
+    """
+
+    def __init__(self):
+        self._models: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the model registered under ``key``, calling ``loader`` on first use"""
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            model = self._models.get(key)
+            if model is None:
+                logger.info(f"Loading model into registry: {key}")
+                model = loader()
+                self._models[key] = model
+            return model
+
+    def loaded(self) -> List[Hashable]:
+        """Keys of the models currently loaded"""
+        return list(self._models)
+
+    def clear(self):
+        """Forget all loaded models"""
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def get_embedding_generator(model_name: str = None):
+    """Shared EmbeddingGenerator for a model"""
+    from src.embeddings import EmbeddingGenerator
+
+    model_name = model_name or settings.EMBEDDING_MODEL
+    return model_registry.get_or_load(("embedding", model_name), lambda: EmbeddingGenerator(model_name))
+
+
+def get_guardrails(enable_guardrails: bool = None):
+    """Shared Guardrails instance"""
+    from src.guardrails import Guardrails
+
+    if enable_guardrails is None:
+        enable_guardrails = settings.ENABLE_GUARDRAILS
+    return model_registry.get_or_load(("guardrails", enable_guardrails), lambda: Guardrails(enable_guardrails))
+
+
+def get_reranker(model_name: str = None):
+    """Shared cross-encoder Reranker for a model"""
+    from src.reranker import Reranker, load_cross_encoder
+
+    model_name = model_name or settings.RERANK_MODEL
+    return model_registry.get_or_load(("reranker", model_name), lambda: Reranker(
+        load_cross_encoder(model_name, max_length=settings.RERANK_MAX_LENGTH),
+        batch_size=settings.RERANK_BATCH_SIZE,
+        budget_ms=settings.RERANK_BUDGET_MS,
+        max_workers=settings.RERANK_WORKERS
+    ))
+
+
+def get_openai_client():
+    """Shared pooled OpenAI client"""
+    from src.llm_client import OpenAIClient
+
+    key = ("openai_client", settings.OPENAI_BASE_URL, settings.OPENAI_MODEL)
+    return model_registry.get_or_load(key, lambda: OpenAIClient(
+        api_key=settings.OPENAI_API_KEY,
+        model=settings.OPENAI_MODEL,
+        base_url=settings.OPENAI_BASE_URL,
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_in_flight=settings.OPENAI_MAX_IN_FLIGHT,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+        backoff_seconds=settings.OPENAI_RETRY_BACKOFF_SECONDS,
+        backoff_max_seconds=settings.OPENAI_RETRY_BACKOFF_MAX_SECONDS,
+        timeout=settings.OPENAI_TIMEOUT_SECONDS
+    ))
@@ -0,0 +1,228 @@
+"""ONNX Runtime backend for sentence-transformers embedding models"""
+import os
+import json
+import shutil
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "embedding_config.json"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+POOLING_MODES = ("mean", "cls", "max")
+
+# Compared between the PyTorch and ONNX backends after export; mixes short and long inputs
+VALIDATION_TEXTS = [
+    "How do I reset my password?",
+    "What is your refund policy for damaged items?",
+    "Error ERR-4012 appears when I try to pay with my card.",
+    "Shipping",
+    "The SKU-1042-B charger ships with a USB-C cable and a two-year warranty. " * 8,
+]
+
+
+def pool(token_embeddings: np.ndarray, attention_mask: np.ndarray, mode: str = "mean",
+         normalize: bool = True) -> np.ndarray:
+    """Sentence vectors from per-token outputs, as the sentence-transformers Pooling module computes them"""
+    mask = attention_mask[..., None].astype('float32')
+    if mode == "cls":
+        vectors = token_embeddings[:, 0]
+    elif mode == "max":
+        vectors = np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+    else:
+        vectors = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    if normalize:
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors.astype('float32')
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Cosine similarity between corresponding rows of two embedding matrices"""
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    return (reference * candidate).sum(axis=1)
+
+
+def artifact_dir(root: str, model_name: str, quantize: bool) -> Path:
+    """Directory holding the exported artifact for a model"""
+    name = model_name.replace("/", "--") + ("-int8" if quantize else "")
+    return Path(root) / name
+
+
+class ONNXSentenceEncoder:
+    """Runs an exported transformer with ONNX Runtime and pools its outputs into sentence vectors.
+
+    Exposes the parts of the ``SentenceTransformer`` interface that ``EmbeddingGenerator``
+    uses, so either backend can sit behind it. Texts are sorted by length before batching
+    to keep padding, and therefore wasted compute, low.
+    """
+
+    def __init__(self, directory: Path, num_threads: int = 0):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        directory = Path(directory)
+        with open(directory / CONFIG_FILE, "r") as f:
+            self.config = json.load(f)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(directory / self.config["model_file"]), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(directory))
+        self.max_seq_length = self.config["max_seq_length"]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """Dimension of the vectors produced"""
+        return self.config["dimension"]
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """Embed texts as a float32 matrix"""
+        embeddings = np.empty((len(texts), self.config["dimension"]), dtype='float32')
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in rows],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feed = {name: array.astype('int64') for name, array in encoded.items() if name in self._input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            embeddings[rows] = pool(
+                token_embeddings, encoded["attention_mask"], self.config["pooling"], self.config["normalize"]
+            )
+        return embeddings
+
+
+def _pooling_config(model) -> Dict:
+    """Pooling mode and normalization of a loaded SentenceTransformer"""
+    from sentence_transformers.models import Normalize, Pooling
+
+    pooling = next((module for module in model if isinstance(module, Pooling)), None)
+    if pooling is None:
+        raise ValueError("Model has no Pooling module to reproduce")
+    if pooling.pooling_mode_cls_token:
+        mode = "cls"
+    elif pooling.pooling_mode_max_tokens:
+        mode = "max"
+    elif pooling.pooling_mode_mean_tokens:
+        mode = "mean"
+    else:
+        raise ValueError(f"Unsupported pooling: {pooling.get_pooling_mode_str()}")
+    # Modules beyond Transformer, Pooling and Normalize (e.g. Dense) would be skipped
+    if any(not isinstance(module, (Pooling, Normalize)) for module in list(model)[1:]):
+        raise ValueError("Model has modules after pooling that the ONNX backend does not run")
+    return {"pooling": mode, "normalize": any(isinstance(module, Normalize) for module in model)}
+
+
+def export_model(model, model_name: str, directory: Path, quantize: bool = True, opset: int = 14):
+    """Export a SentenceTransformer's transformer to ONNX in ``directory``, optionally int8-quantized"""
+    import torch
+
+    directory.mkdir(parents=True, exist_ok=True)
+    transformer = model[0].auto_model.eval()
+    sample = model.tokenizer(VALIDATION_TEXTS[:2], padding=True, return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (dict(sample),),
+            str(directory / MODEL_FILE),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+
+    model_file = MODEL_FILE
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Dynamic quantization stores int8 weights and quantizes activations per batch
+        quantize_dynamic(str(directory / MODEL_FILE), str(directory / QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+        (directory / MODEL_FILE).unlink()
+        model_file = QUANTIZED_MODEL_FILE
+
+    model.tokenizer.save_pretrained(str(directory))
+    with open(directory / CONFIG_FILE, "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "model_file": model_file,
+            "quantized": quantize,
+            "dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            **_pooling_config(model)
+        }, f)
+
+
+def load_onnx_encoder(model_name: str, root: str, quantize: bool = True, min_cosine: float = 0.99,
+                      num_threads: int = 0, reference_model=None) -> ONNXSentenceEncoder:
+    """Load the cached ONNX export of a model, exporting and validating it first if needed.
+
+    A fresh export is compared with the PyTorch model on ``VALIDATION_TEXTS`` and only
+    kept when every embedding has at least ``min_cosine`` cosine similarity with the
+    PyTorch one; otherwise ``ValueError`` is raised. Exports are written to a temporary
+    directory and renamed into place, so a half-written artifact is never loaded.
+    """
+    directory = artifact_dir(root, model_name, quantize)
+    if (directory / CONFIG_FILE).exists():
+        logger.info(f"Loading ONNX embedding model from {directory}")
+        return ONNXSentenceEncoder(directory, num_threads=num_threads)
+
+    if reference_model is None:
+        from sentence_transformers import SentenceTransformer
+        reference_model = SentenceTransformer(model_name, device="cpu")
+
+    staging = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        logger.info(f"Exporting {model_name} to ONNX (int8={quantize})")
+        export_model(reference_model, model_name, staging, quantize=quantize)
+        encoder = ONNXSentenceEncoder(staging, num_threads=num_threads)
+
+        agreement = cosine_agreement(
+            reference_model.encode(VALIDATION_TEXTS, convert_to_numpy=True),
+            encoder.encode(VALIDATION_TEXTS)
+        )
+        logger.info(f"ONNX export agrees with PyTorch: min cosine {agreement.min():.5f}, mean {agreement.mean():.5f}")
+        if agreement.min() < min_cosine:
+            raise ValueError(f"ONNX embeddings diverge from PyTorch (min cosine {agreement.min():.5f} < {min_cosine})")
+
+        config = dict(encoder.config, min_cosine=float(agreement.min()))
+        with open(staging / CONFIG_FILE, "w") as f:
+            json.dump(config, f)
+        try:
+            staging.rename(directory)
+        except OSError:
+            # Another process finished the same export first; use its artifact
+            shutil.rmtree(staging, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return ONNXSentenceEncoder(directory, num_threads=num_threads)
+
+
+def load_encoder_or_none(model_name: str, root: str, quantize: bool, min_cosine: float,
+                         num_threads: int = 0) -> Optional[ONNXSentenceEncoder]:
+    """ONNX encoder for a model, or None (with a warning) if it can't be exported or validated"""
+    try:
+        return load_onnx_encoder(model_name, root, quantize=quantize, min_cosine=min_cosine, num_threads=num_threads)
+    except ImportError as e:
+        logger.warning(f"ONNX backend unavailable ({str(e)}); install onnxruntime. Using PyTorch")
+    except Exception as e:
+        logger.warning(f"Could not use ONNX backend for {model_name}: {str(e)}. Using PyTorch")
+    return None
@@ -1,12 +1,17 @@
 """Main pipeline for document ingestion and RAG setup"""
 import logging
+import threading
 import mlflow
+import numpy as np
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
 from src.config import settings
 from src.document_processor import DocumentProcessor
-from src.embeddings import EmbeddingGenerator
+from src.model_registry import get_embedding_generator
 from src.vector_store import FAISSVectorStore
+from src.manifest import IngestionManifest, hash_file
+from src.ingestion import batched, prefetch
+from src.chunking import ChunkStats, create_chunker
 from src.rag_agent import RAGAgent
 
 logger = logging.getLogger(__name__)
@@ -16,92 +21,286 @@ class MLOpsPipeline:
     """Main MLOps pipeline for document ingestion and RAG setup"""
     
     def __init__(self):
-        self.document_processor = DocumentProcessor(settings.DOCUMENTS_PATH)
-        self.embedding_generator = EmbeddingGenerator()
+        self.embedding_generator = get_embedding_generator()
+        self.chunker = create_chunker(
+            settings.CHUNK_STRATEGY,
+            tokenizer=self.embedding_generator.tokenizer,
+            max_tokens=settings.CHUNK_MAX_TOKENS or self.embedding_generator.max_tokens,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP
+        )
+        self.document_processor = DocumentProcessor(settings.DOCUMENTS_PATH, chunker=self.chunker)
         self.vector_store = None
         self.rag_agent = None
+        self._ingest_lock = threading.Lock()
         
         # Initialize MLflow
         mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
         mlflow.set_experiment(settings.MLFLOW_EXPERIMENT_NAME)
     
     def ingest_documents(self) -> Dict:
-        """Ingest documents, create embeddings, and build vector store"""
-        with mlflow.start_run(run_name="document_ingestion"):
+        """Incrementally ingest documents, embedding only new or changed files.
+
+        The index is built off to the side and swapped in as the live store once saved.
+        Concurrent calls run one at a time.
+        """
+        with self._ingest_lock, mlflow.start_run(run_name="document_ingestion"):
             logger.info("Starting document ingestion pipeline")
             
-            # Load documents
-            documents = self.document_processor.load_all_documents()
+            # Build into a separate store; queries keep using the live one until the swap
+            store = FAISSVectorStore(
+                dimension=self.embedding_generator.dimension,
+                index_path=settings.FAISS_INDEX_PATH
+            )
+            manifest = IngestionManifest(settings.FAISS_INDEX_PATH)
+            
+            # An index without a matching manifest (e.g. built before manifests existed)
+            # can't be diffed safely, so rebuild it from scratch instead of appending duplicates.
+            # The same applies when the configured index type or compression has changed, or
+            # when the index was trained on too few vectors for the size it has grown to.
+            if store.index.ntotal != manifest.total_chunks:
+                logger.info("Vector index does not match ingestion manifest; rebuilding from scratch")
+                store.reset()
+                manifest.reset()
+            elif store.layout_changed:
+                logger.info(f"Index layout changed from {store.loaded_layout} to {store.layout}; rebuilding from scratch")
+                store.reset()
+                manifest.reset()
+            elif store.needs_retraining:
+                logger.info(f"Index has grown to {store.index.ntotal} vectors; rebuilding to retrain it")
+                store.reset()
+                manifest.reset()
+            elif manifest.files and manifest.chunking != self.chunker.config():
+                logger.info("Chunking settings changed; rebuilding from scratch")
+                store.reset()
+                manifest.reset()
+            manifest.chunking = self.chunker.config()
+            
+            # Indexes saved before hybrid search (or with it disabled) get their BM25 index
+            # built from the stored chunk text instead of re-embedding everything
+            if store.lexical and not store.has_lexical_index:
+                store.rebuild_lexical_index()
             
-            if not documents:
+            # Diff the documents directory against the manifest
+            pdf_files = self.document_processor.list_documents()
+            current_hashes = {pdf_file.name: hash_file(str(pdf_file)) for pdf_file in pdf_files}
+            
+            removed_sources = [source for source in manifest.files if source not in current_hashes]
+            changed_sources = [
+                source for source, sha256 in current_hashes.items()
+                if source in manifest.files and manifest.get_hash(source) != sha256
+            ]
+            new_sources = [source for source in current_hashes if source not in manifest.files]
+            unchanged_count = len(current_hashes) - len(changed_sources) - len(new_sources)
+            
+            # Drop stale vectors for removed and changed files. ANN indexes can't remove
+            # vectors while keeping positions contiguous, so they are rebuilt instead.
+            if (removed_sources or changed_sources) and not store.supports_removal:
+                logger.info(f"{store.loaded_index_type} index does not support removal; rebuilding from scratch")
+                store.reset()
+                manifest.reset()
+                changed_sources = []
+                new_sources = list(current_hashes)
+                unchanged_count = 0
+            else:
+                stale_ids = []
+                for source in removed_sources + changed_sources:
+                    stale_ids.extend(manifest.chunk_ids(source))
+                    manifest.remove(source)
+                store.remove_ids(stale_ids)
+                manifest.compact()
+            
+            if not pdf_files:
+                store.save()
+                manifest.save()
+                self.swap_vector_store(self._open_saved_store(store))
                 logger.warning("No documents found to ingest")
                 return {
                     "status": "warning",
                     "message": "No documents found",
-                    "documents_processed": 0
+                    "documents_processed": 0,
+                    "documents_removed": len(removed_sources)
                 }
             
-            # Chunk documents
-            all_chunks = []
-            all_metadatas = []
+            to_ingest = set(changed_sources + new_sources)
+            num_chunks, num_batches, document_chunk_counts, chunk_stats = self._ingest_files(
+                store, manifest, [pdf_file for pdf_file in pdf_files if pdf_file.name in to_ingest], current_hashes
+            )
             
-            for doc in documents:
-                chunks = self.document_processor.chunk_text(
-                    doc["content"],
-                    chunk_size=settings.CHUNK_SIZE,
-                    chunk_overlap=settings.CHUNK_OVERLAP
+            # An index trained while the corpus was small (e.g. IVF with a handful of
+            # clusters) stops scaling once additions outgrow it; retrain it on everything
+            # now rather than serving full scans until the next ingestion
+            if store.needs_retraining:
+                logger.info(f"Index has grown to {store.index.ntotal} vectors; rebuilding to retrain it")
+                store.reset()
+                manifest.reset()
+                manifest.chunking = self.chunker.config()
+                num_chunks, num_batches, document_chunk_counts, chunk_stats = self._ingest_files(
+                    store, manifest, pdf_files, current_hashes
                 )
-                
-                for i, chunk in enumerate(chunks):
-                    all_chunks.append(chunk)
-                    all_metadatas.append({
-                        "content": chunk,
-                        "source": doc["source"],
-                        "chunk_index": i,
-                        "path": doc["path"]
-                    })
-            
-            logger.info(f"Created {len(all_chunks)} chunks from {len(documents)} documents")
+                unchanged_count = 0
             
-            # Generate embeddings
-            logger.info("Generating embeddings...")
-            embeddings = self.embedding_generator.generate_embeddings(all_chunks)
-            
-            # Create vector store
-            import numpy as np
-            embedding_dim = len(embeddings[0])
-            self.vector_store = FAISSVectorStore(
-                dimension=embedding_dim,
-                index_path=settings.FAISS_INDEX_PATH
+            logger.info(
+                f"Created {num_chunks} chunks from {len(document_chunk_counts)} new or changed documents "
+                f"({unchanged_count} unchanged, {len(removed_sources)} removed); "
+                f"{chunk_stats.truncated_chunks} exceed the embedding model's {chunk_stats.token_limit}-token limit"
             )
             
-            # Add to vector store
-            embeddings_array = np.array(embeddings).astype('float32')
-            self.vector_store.add_documents(embeddings_array, all_metadatas)
-            self.vector_store.save()
+            store.save()
+            manifest.save()
+            self.swap_vector_store(self._open_saved_store(store))
             
             # Log to MLflow
-            mlflow.log_param("num_documents", len(documents))
-            mlflow.log_param("num_chunks", len(all_chunks))
-            mlflow.log_param("chunk_size", settings.CHUNK_SIZE)
-            mlflow.log_param("chunk_overlap", settings.CHUNK_OVERLAP)
+            mlflow.log_param("num_documents", len(pdf_files))
+            mlflow.log_param("num_chunks", num_chunks)
+            mlflow.log_param("ingest_batch_size", settings.INGEST_BATCH_SIZE)
+            mlflow.log_params({f"chunking_{key}": value for key, value in self.chunker.config().items()})
             mlflow.log_param("embedding_model", settings.EMBEDDING_MODEL)
-            mlflow.log_metric("total_vectors", self.vector_store.index.ntotal)
+            mlflow.log_params(store.loaded_layout)
+            mlflow.log_param("hybrid_search", store.lexical)
+            mlflow.log_metric("documents_processed", len(document_chunk_counts))
+            mlflow.log_metric("embedding_batches", num_batches)
+            mlflow.log_metrics(chunk_stats.as_metrics())
+            mlflow.log_metric("documents_unchanged", unchanged_count)
+            mlflow.log_metric("documents_removed", len(removed_sources))
+            mlflow.log_metric("total_vectors", store.index.ntotal)
             
             logger.info("Document ingestion completed successfully")
             
             return {
                 "status": "success",
-                "documents_processed": len(documents),
-                "chunks_created": len(all_chunks),
-                "vectors_stored": self.vector_store.index.ntotal
+                "documents_processed": len(document_chunk_counts),
+                "documents_unchanged": unchanged_count,
+                "documents_removed": len(removed_sources),
+                "chunks_created": num_chunks,
+                "vectors_stored": store.index.ntotal
             }
     
+    def _ingest_files(self, store: FAISSVectorStore, manifest: IngestionManifest, pdf_files: List[Path],
+                      current_hashes: Dict[str, str]) -> Tuple[int, int, List[Tuple[str, int]], ChunkStats]:
+        """Load, chunk, embed and add files, recording them in the manifest.
+
+        Documents stream through load -> chunk -> embed -> add in fixed-size batches;
+        bounded queues between the stages keep memory flat. Returns the chunks and
+        batches added, each file's chunk count and the chunk token statistics.
+        """
+        documents = prefetch(
+            self.document_processor.iter_documents(pdf_files),
+            settings.INGEST_QUEUE_SIZE,
+            name="ingest-load"
+        )
+        document_chunk_counts = []
+        chunk_stats = ChunkStats(self.embedding_generator.max_tokens)
+        batches = batched(self._iter_chunks(documents, document_chunk_counts), settings.INGEST_BATCH_SIZE)
+        embedded = prefetch(self._iter_embedded(batches, chunk_stats), settings.INGEST_QUEUE_SIZE, name="ingest-embed")
+        
+        # Record each file's chunk-id range; chunks are added in document order
+        start = store.index.ntotal
+        try:
+            num_chunks, num_batches = self._add_batches(store, embedded)
+        finally:
+            # Stop the stage threads promptly if adding failed
+            embedded.close()
+            documents.close()
+        for source, count in document_chunk_counts:
+            manifest.add(source, current_hashes[source], start, count)
+            start += count
+        return num_chunks, num_batches, document_chunk_counts, chunk_stats
+    
+    def _iter_chunks(self, documents: Iterator[Dict], document_chunk_counts: List[Tuple[str, int]]) -> Iterator[Dict]:
+        """Chunk documents lazily, yielding one metadata dict per chunk and recording per-document counts"""
+        for doc in documents:
+            chunks = self.document_processor.chunk(doc["content"])
+            document_chunk_counts.append((doc["source"], len(chunks)))
+            
+            for i, chunk in enumerate(chunks):
+                yield {
+                    "content": chunk,
+                    "source": doc["source"],
+                    "chunk_index": i,
+                    "path": doc["path"]
+                }
+    
+    def _iter_embedded(self, batches: Iterator[List[Dict]], chunk_stats: ChunkStats) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+        """Embed batches of chunk metadata, recording chunk token counts"""
+        for metadatas in batches:
+            texts = [meta["content"] for meta in metadatas]
+            chunk_stats.record(self.embedding_generator.count_tokens(texts))
+            yield self.embedding_generator.encode(texts), metadatas
+    
+    def _add_batches(self, store: FAISSVectorStore, embedded: Iterator[Tuple[np.ndarray, List[Dict]]]) -> Tuple[int, int]:
+        """Add embedded batches to the store, returning (chunks, batches) added.
+
+        An untrained (IVF) index first collects up to INGEST_TRAIN_SIZE vectors, trains
+        on them, then receives them and every later batch directly.
+        """
+        pending = []
+        pending_count = 0
+        num_chunks = 0
+        num_batches = 0
+        
+        for embeddings, metadatas in embedded:
+            num_chunks += len(metadatas)
+            num_batches += 1
+            if store.is_trained:
+                store.add_documents(embeddings, metadatas)
+                continue
+            pending.append((embeddings, metadatas))
+            pending_count += len(metadatas)
+            if pending_count >= settings.INGEST_TRAIN_SIZE:
+                self._train_and_add(store, pending)
+                pending = []
+        
+        if pending:
+            self._train_and_add(store, pending)
+        return num_chunks, num_batches
+    
+    def _train_and_add(self, store: FAISSVectorStore, pending: List[Tuple[np.ndarray, List[Dict]]]):
+        """Train the store on held-back batches, then add them"""
+        store.train(np.concatenate([embeddings for embeddings, _ in pending]))
+        for embeddings, metadatas in pending:
+            store.add_documents(embeddings, metadatas)
+    
+    def _open_saved_store(self, store: FAISSVectorStore) -> FAISSVectorStore:
+        """Reopen a saved store the way the API serves it, memory-mapped when FAISS_MMAP is set.
+
+        Without this the writable in-RAM copy built during ingestion would be served
+        until the next restart. Falls back to that copy if the saved files can't be read.
+        """
+        if not settings.FAISS_MMAP:
+            return store
+        mapped = FAISSVectorStore(
+            dimension=store.dimension,
+            index_path=str(store.index_path),
+            mmap=True,
+            lexical=store.lexical
+        )
+        if mapped.index.ntotal != store.index.ntotal:
+            logger.warning("Could not memory-map the saved index; serving the in-memory copy")
+            return store
+        return mapped
+    
+    def swap_vector_store(self, vector_store: FAISSVectorStore):
+        """Make a fully built store the live one for new queries.
+
+        Rebinding a reference is atomic, so each query sees either the old store or the
+        new one; queries already running finish against the store they started with.
+        """
+        self.vector_store = vector_store
+        if self.rag_agent is not None:
+            self.rag_agent.set_vector_store(vector_store)
+    
     def initialize_rag_agent(self):
         """Initialize the RAG agent"""
         if self.vector_store is None:
             raise ValueError("Vector store not initialized. Run ingest_documents() first.")
         
+        # Re-point an existing agent at the new store instead of reloading its models
+        if self.rag_agent is not None:
+            self.rag_agent.set_vector_store(self.vector_store)
+            return
+        
         logger.info("Initializing RAG agent...")
         self.rag_agent = RAGAgent(
             vector_store=self.vector_store,
@@ -120,7 +319,43 @@ class MLOpsPipeline:
                 result = self.rag_agent.query(question)
                 mlflow.log_metric("num_sources", len(result.get("sources", [])))
                 mlflow.log_metric("confidence", result.get("confidence", 0.0))
+                mlflow.log_metric("cache_hit", int(result.get("cached", False)))
                 return result
         else:
             return self.rag_agent.query(question)
+    
+    def query_stream(self, question: str, log_to_mlflow: bool = True,
+                     cancelled: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """Process a query through the RAG agent, yielding answer events as they are generated.
 
+        Setting ``cancelled`` stops generation and ends the stream early.
+        """
+        if self.rag_agent is None:
+            self.initialize_rag_agent()
+        
+        for event in self.rag_agent.query_stream(question, cancelled):
+            # Consumers may advance the stream from different threads, and MLflow's active
+            # run is per thread, so the run is logged in one go once the answer is complete
+            if log_to_mlflow and event["event"] == "done":
+                with mlflow.start_run(run_name="query_processing", nested=True):
+                    mlflow.log_param("query", question)
+                    mlflow.log_param("streaming", True)
+                    mlflow.log_metric("num_sources", len(event.get("sources", [])))
+                    mlflow.log_metric("confidence", event.get("confidence", 0.0))
+                    mlflow.log_metric("cache_hit", int(event.get("cached", False)))
+            yield event
+    
+    def query_batch(self, questions: List[str], log_to_mlflow: bool = True) -> List[Dict]:
+        """Process many queries through the RAG agent with batched retrieval"""
+        if self.rag_agent is None:
+            self.initialize_rag_agent()
+        
+        if log_to_mlflow:
+            with mlflow.start_run(run_name="batch_query_processing", nested=True):
+                mlflow.log_param("num_questions", len(questions))
+                results = self.rag_agent.query_batch(questions)
+                mlflow.log_metric("num_errors", sum(1 for result in results if result.get("error")))
+                mlflow.log_metric("cache_hits", sum(1 for result in results if result.get("cached")))
+                return results
+        else:
+            return self.rag_agent.query_batch(questions)
@@ -0,0 +1,94 @@
+"""Reusable KV cache for the fixed prefix that starts every prompt"""
+import logging
+from typing import List, Optional, Tuple
+import torch
+
+logger = logging.getLogger(__name__)
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # Older transformers only understand legacy tuple caches
+    DynamicCache = None
+
+
+class PrefixKVCache:
+    """Attention keys and values of a static prompt prefix, computed once per model.
+
+    A request whose tokens start with the prefix tokens takes a copy of the cached
+    keys/values for the shared part and only prefills the rest. Tokenizers can merge
+    tokens across the boundary between the prefix and what follows, so the shared part
+    is the longest common run of token ids rather than the whole prefix. Copies keep
+    requests from ever writing into the shared tensors.
+    """
+
+    def __init__(self, model, tokenizer, prefix: str, min_tokens: int = 8):
+        self.device = next(model.parameters()).device
+        # Models without cache-class support (e.g. GPT-2 in transformers 4.41) only accept tuples
+        self.supports_cache_class = getattr(model, "_supports_cache_class", False)
+        self.prefix_ids: List[int] = tokenizer(prefix, add_special_tokens=True)["input_ids"]
+        self.min_tokens = min_tokens
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+        input_ids = torch.tensor([self.prefix_ids], device=self.device)
+        with torch.no_grad():
+            outputs = model(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), use_cache=True)
+        past = outputs.past_key_values
+        if hasattr(past, "to_legacy_cache"):
+            past = past.to_legacy_cache()
+        self._past: Tuple = tuple((k.detach(), v.detach()) for k, v in past)
+        logger.info(f"Cached KV for a {len(self.prefix_ids)}-token prompt prefix")
+
+    def __len__(self) -> int:
+        return len(self.prefix_ids)
+
+    def match(self, prompt_ids: List[int]) -> int:
+        """Leading tokens of a prompt covered by the cache (0 if too few to be worth reusing).
+
+        At least one prompt token is always left uncovered, since prefilling it is what
+        produces the logits for the first generated token.
+        """
+        limit = min(len(self.prefix_ids), len(prompt_ids) - 1)
+        length = 0
+        while length < limit and prompt_ids[length] == self.prefix_ids[length]:
+            length += 1
+        if length < self.min_tokens:
+            self.misses += 1
+            return 0
+        self.hits += 1
+        self.reused_tokens += length
+        return length
+
+    def past(self, length: int) -> Tuple:
+        """Copy of the cached keys/values for the first ``length`` tokens, in legacy tuple format"""
+        return tuple(
+            (k[:, :, :length].clone(), v[:, :, :length].clone()) for k, v in self._past
+        )
+
+    def generate_cache(self, length: int):
+        """Copy of the first ``length`` cached positions in the form ``model.generate`` expects"""
+        past = self.past(length)
+        if DynamicCache is not None and self.supports_cache_class:
+            return DynamicCache.from_legacy_cache(past)
+        return past
+
+    def stats(self) -> dict:
+        """How often prompts reused the prefix and how many tokens that saved"""
+        return {
+            "prefix_tokens": len(self.prefix_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reused_tokens": self.reused_tokens
+        }
+
+
+def prompt_inputs(tokenizer, prompt: str, device, prefix_cache: Optional[PrefixKVCache] = None):
+    """Tokenized prompt for ``model.generate``, with a copy of the prefix cache when it applies"""
+    inputs = tokenizer(prompt, return_tensors="pt").to(device)
+    if prefix_cache is None:
+        return inputs
+    reused = prefix_cache.match(inputs["input_ids"][0].tolist())
+    if reused:
+        inputs["past_key_values"] = prefix_cache.generate_cache(reused)
+    return inputs
@@ -1,39 +1,147 @@
 """RAG (Retrieval Augmented Generation) agent using LangChain"""
 import logging
+import threading
 import numpy as np
-from typing import List, Dict, Optional
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Callable, List, Dict, Iterator, Optional
 from langchain.prompts import PromptTemplate
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline, BitsAndBytesConfig
+from transformers import (
+    AutoTokenizer, AutoModelForCausalLM, pipeline, BitsAndBytesConfig, TextIteratorStreamer,
+    StoppingCriteria, StoppingCriteriaList
+)
 import torch
 from src.config import settings
 from src.vector_store import FAISSVectorStore
-from src.embeddings import EmbeddingGenerator
-from src.guardrails import Guardrails
+from src.model_registry import model_registry, get_embedding_generator, get_guardrails, get_openai_client, get_reranker
+from src.answer_cache import AnswerCache
+from src.semantic_cache import SemanticAnswerCache
+from src.concurrency import stage
+from src.generation import GenerationScheduler
+from src.context_builder import ContextBuilder
+from src.chunking import count_tokens
+from src.prefix_cache import PrefixKVCache, prompt_inputs
+from src.speculative import load_draft_model
 
 logger = logging.getLogger(__name__)
 
+OPENAI_SYSTEM_PROMPT = "You are a helpful customer support assistant. Always provide complete, well-structured answers that fully address the user's question. Start your responses directly with the answer (don't repeat the question). Use clear paragraphs or bullet points when appropriate. Ensure your answers are never cut off mid-sentence."
+
+PROMPT_INTRO = "Based on the following context from company documents, please answer the question completely and clearly.\n\n"
+
+PROMPT_INSTRUCTIONS = """Instructions:
+- Provide a complete answer that fully addresses the question
+- Start your answer directly without repeating the question
+- Use clear, structured sentences
+- If the context doesn't contain sufficient information, clearly state that
+- Ensure your answer is complete and not cut off mid-sentence
+"""
+
+# Everything identical across questions, placed first so its KV cache can be reused
+PROMPT_PREFIX = f"{PROMPT_INTRO}{PROMPT_INSTRUCTIONS}\nContext:\n"
+
+
+class _CancelledCriteria(StoppingCriteria):
+    """Stops ``model.generate`` once a request's cancel flag is set"""
+
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.cancelled.is_set(), dtype=torch.bool, device=input_ids.device)
+
 
 class RAGAgent:
     """RAG agent for question answering using retrieved documents"""
     
     def __init__(self, vector_store: FAISSVectorStore, use_quantization: bool = True):
         self.vector_store = vector_store
-        self.guardrails = Guardrails(settings.ENABLE_GUARDRAILS)
-        self.embedding_generator = EmbeddingGenerator()
+        # Models come from the process-wide registry so they are loaded once and shared
+        self.guardrails = get_guardrails(settings.ENABLE_GUARDRAILS)
+        self.embedding_generator = get_embedding_generator()
         
         # Initialize LLM
+        self.openai_client = None
         if settings.USE_OPENAI:
             self.llm = None  # Will use OpenAI API directly
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY must be set when USE_OPENAI=true")
+            try:
+                self.openai_client = get_openai_client()
+            except ImportError:
+                raise ImportError("OpenAI package not installed. Install it with: pip install openai")
         else:
-            self.llm = self._load_local_llm(use_quantization)
+            self.llm = model_registry.get_or_load(
+                ("llm", settings.LLM_MODEL, use_quantization),
+                lambda: self._load_local_llm(use_quantization)
+            )
+        
+        # Optional draft model whose proposed tokens the LLM verifies several at a time
+        self.draft_model = None
+        if self.llm is not None and settings.SPECULATIVE_DECODING:
+            try:
+                self.draft_model = model_registry.get_or_load(
+                    ("draft_llm", settings.DRAFT_MODEL, settings.LLM_MODEL),
+                    self._load_draft_model
+                )
+            except Exception as e:
+                logger.warning(f"Could not load draft model {settings.DRAFT_MODEL}: {str(e)}. Using plain decoding")
+        
+        # Keys/values of the fixed prompt prefix are computed once per model. Assisted
+        # generation keeps its own caches for both models, so it doesn't use this one.
+        self.prefix_cache = None
+        if self.llm is not None and settings.PREFIX_KV_CACHE and self.draft_model is None:
+            self.prefix_cache = model_registry.get_or_load(
+                ("prefix_cache", settings.LLM_MODEL, use_quantization),
+                lambda: PrefixKVCache(self.llm.model, self.llm.tokenizer, PROMPT_PREFIX)
+            )
+        
+        # Concurrent local generations share one continuously batched decode loop.
+        # Assisted generation decodes one sequence at a time, so it runs without it.
+        self.generation_scheduler = None
+        if self.llm is not None and settings.CONTINUOUS_BATCHING and self.draft_model is None:
+            self.generation_scheduler = model_registry.get_or_load(
+                ("generation_scheduler", settings.LLM_MODEL, use_quantization),
+                lambda: GenerationScheduler(
+                    self.llm.model,
+                    self.llm.tokenizer,
+                    token_budget=settings.GENERATION_TOKEN_BUDGET,
+                    max_batch_size=settings.GENERATION_MAX_BATCH_SIZE,
+                    temperature=settings.TEMPERATURE,
+                    prefix_cache=self.prefix_cache
+                )
+            )
+        
+        # Optional cross-encoder pass that keeps only the most relevant candidates
+        self.reranker = get_reranker() if settings.RERANK else None
         
         # Create RAG chain
         self.qa_chain = self._create_qa_chain()
+        self.context_builder = ContextBuilder(self._prompt_token_counter(), settings.CONTEXT_MAX_TOKENS)
+        
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_SIZE > 0:
+            self.answer_cache = AnswerCache(
+                max_entries=settings.ANSWER_CACHE_SIZE,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+            )
+        
+        self.semantic_cache = None
+        if settings.SEMANTIC_CACHE_SIZE > 0:
+            self.semantic_cache = SemanticAnswerCache(
+                dimension=self.embedding_generator.dimension,
+                max_entries=settings.SEMANTIC_CACHE_SIZE,
+                similarity_threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+            )
         
         logger.info("RAG Agent initialized successfully")
     
+    def set_vector_store(self, vector_store: FAISSVectorStore):
+        """Swap in a different vector store without reloading any models"""
+        self.vector_store = vector_store
+        logger.info(f"RAG agent now using vector store with {vector_store.index.ntotal} vectors")
+    
     def _load_local_llm(self, use_quantization: bool = True):
         """Load local LLM with optional quantization"""
         model_name = settings.LLM_MODEL
@@ -78,6 +186,30 @@ class RAGAgent:
             logger.error(f"Error loading local LLM: {str(e)}")
             raise Exception("Could not load local LLM. Please verify model configuration or enable USE_OPENAI.")
     
+    def _load_draft_model(self):
+        """Load the draft model for speculative decoding on the LLM's device"""
+        if not settings.DRAFT_MODEL:
+            raise ValueError("DRAFT_MODEL must be set when SPECULATIVE_DECODING=true")
+        return load_draft_model(
+            settings.DRAFT_MODEL,
+            self.llm.tokenizer,
+            self.llm.model.device,
+            self.llm.model.dtype,
+            num_tokens=settings.SPECULATIVE_NUM_TOKENS,
+            schedule=settings.SPECULATIVE_SCHEDULE
+        )
+    
+    def _local_generate_kwargs(self) -> Dict:
+        """Sampling settings for ``model.generate``, plus the draft model when speculating"""
+        kwargs = {
+            "max_new_tokens": settings.MAX_TOKENS,
+            "temperature": settings.TEMPERATURE,
+            "do_sample": True
+        }
+        if self.draft_model is not None:
+            kwargs["assistant_model"] = self.draft_model
+        return kwargs
+    
     def _create_qa_chain(self):
         """Create the QA chain with custom prompt"""
         prompt_template = """Use the following pieces of context to answer the question. 
@@ -102,32 +234,38 @@ Answer:"""
             "top_k": settings.TOP_K_RETRIEVAL
         }
     
-    def _generate_openai_response(self, prompt: str) -> str:
-        """Generate a response using OpenAI API directly"""
+    def _prompt_token_counter(self) -> Callable[[List[str]], List[int]]:
+        """Token counter for the generation model, used to budget prompt context"""
+        if self.llm is not None:
+            tokenizer = self.llm.tokenizer
+            return lambda texts: count_tokens(tokenizer, texts)
         try:
-            import openai
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            
-            response = client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a helpful customer support assistant. Always provide complete, well-structured answers that fully address the user's question. Start your responses directly with the answer (don't repeat the question). Use clear paragraphs or bullet points when appropriate. Ensure your answers are never cut off mid-sentence."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=settings.TEMPERATURE,
-                max_tokens=settings.MAX_TOKENS
-            )
-            return response.choices[0].message.content.strip()
-        except ImportError:
-            raise ImportError("OpenAI package not installed. Install it with: pip install openai")
-        except Exception as e:
-            logger.error(f"OpenAI API error: {str(e)}")
-            raise
+            import tiktoken
+            encoding = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        except (ImportError, KeyError):
+            # Without tiktoken, estimate about four characters per token
+            return lambda texts: [len(text) // 4 + 1 for text in texts]
+        return lambda texts: [len(tokens) for tokens in encoding.encode_batch(texts)]
+    
+    def _openai_messages(self, prompt: str) -> List[Dict]:
+        """Chat messages for an OpenAI request"""
+        return [
+            {"role": "system", "content": OPENAI_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
     
     def _generate_response(self, llm, prompt: str) -> str:
         """Generate a response from HuggingFace pipeline"""
+        if self.generation_scheduler is not None:
+            return self.generation_scheduler.generate(prompt, settings.MAX_TOKENS)
+        
+        if self.prefix_cache is not None or self.draft_model is not None:
+            inputs = prompt_inputs(llm.tokenizer, prompt, llm.model.device, self.prefix_cache)
+            with torch.no_grad():
+                output_ids = llm.model.generate(**inputs, **self._local_generate_kwargs())
+            prompt_length = inputs["input_ids"].shape[1]
+            return llm.tokenizer.decode(output_ids[0][prompt_length:], skip_special_tokens=True).strip()
+        
         result = llm(
             prompt,
             max_new_tokens=settings.MAX_TOKENS,
@@ -140,119 +278,450 @@ Answer:"""
             return result.strip()
         return str(result)
     
+    def _stream_openai_response(self, prompt: str) -> Iterator[str]:
+        """Stream a response from the shared OpenAI client as text increments"""
+        yield from self.openai_client.stream(
+            self._openai_messages(prompt),
+            temperature=settings.TEMPERATURE,
+            max_tokens=settings.MAX_TOKENS
+        )
+    
+    def _stream_local_response(self, prompt: str, cancelled: Optional[threading.Event] = None) -> Iterator[str]:
+        """Stream a response from the local LLM as text increments, stopping early once ``cancelled`` is set"""
+        if self.generation_scheduler is not None:
+            yield from self.generation_scheduler.stream(prompt, settings.MAX_TOKENS, cancelled)
+            return
+        
+        tokenizer = self.llm.tokenizer
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        inputs = prompt_inputs(tokenizer, prompt, self.llm.model.device, self.prefix_cache)
+        kwargs = self._local_generate_kwargs()
+        if cancelled is not None:
+            kwargs["stopping_criteria"] = StoppingCriteriaList([_CancelledCriteria(cancelled)])
+        errors = []
+        
+        def generate():
+            try:
+                self.llm.model.generate(**inputs, streamer=streamer, **kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+        
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        yield from streamer
+        thread.join()
+        if errors:
+            raise errors[0]
+    
+    def _refusal(self) -> Dict:
+        """Response for a query that fails guardrails validation"""
+        return {
+            "answer": "I cannot process this query due to safety concerns.",
+            "sources": [],
+            "error": "Query failed guardrails validation"
+        }
+    
+    def _error_response(self, error: Exception) -> Dict:
+        """Response for a query that raised while being processed"""
+        logger.error(f"Error processing query: {str(error)}")
+        return {
+            "answer": "I encountered an error while processing your question.",
+            "sources": [],
+            "error": str(error)
+        }
+    
+    def _cache_settings_key(self) -> tuple:
+        """Retrieval and generation settings that a cached answer depends on"""
+        llm_model = settings.OPENAI_MODEL if settings.USE_OPENAI else settings.LLM_MODEL
+        return (
+            settings.EMBEDDING_MODEL,
+            settings.TOP_K_RETRIEVAL,
+            settings.HYBRID_SEARCH,
+            settings.RERANK_MODEL if self.reranker else None,
+            settings.RERANK_TOP_N if self.reranker else None,
+            llm_model,
+            settings.TEMPERATURE,
+            settings.MAX_TOKENS
+        )
+    
+    def _get_cached_answer(self, question: str, index_version: int) -> Optional[Dict]:
+        """Return a cached response marked as such, or None"""
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.get(question, self._cache_settings_key(), index_version)
+        if cached is not None:
+            cached["cached"] = True
+        return cached
+    
+    def _get_semantic_answer(self, query_embedding: np.ndarray, index_version: int) -> Optional[Dict]:
+        """Return the cached response for a near-duplicate question, or None"""
+        if self.semantic_cache is None:
+            return None
+        cached = self.semantic_cache.get(query_embedding, self._cache_settings_key(), index_version)
+        if cached is not None:
+            cached["cached"] = True
+        return cached
+    
+    def _cache_answer(self, question: str, index_version: int, response: Dict,
+                      query_embedding: Optional[np.ndarray] = None):
+        """Cache a successful response produced against the given index version"""
+        if response.get("error"):
+            return
+        # Skip answers whose index changed while they were being generated
+        if index_version != self.vector_store.version:
+            return
+        if self.answer_cache is not None:
+            self.answer_cache.put(question, self._cache_settings_key(), index_version, response)
+        if self.semantic_cache is not None and query_embedding is not None:
+            self.semantic_cache.put(query_embedding, question, self._cache_settings_key(), index_version, response)
+    
+    def _retrieval_k(self) -> int:
+        """Results to fetch from the store: a wider candidate pool when reranking"""
+        if self.reranker is not None:
+            return max(settings.RERANK_CANDIDATES, settings.RERANK_TOP_N)
+        return settings.TOP_K_RETRIEVAL
+    
+    def _rerank(self, question: str, results: List) -> List:
+        """Keep the candidates the cross-encoder ranks highest, or return results as they are"""
+        if self.reranker is None:
+            return results
+        return self.reranker.rerank(question, results, settings.RERANK_TOP_N)
+    
     def query(self, question: str) -> Dict:
         """Process a query and return answer with sources"""
         # Guardrails check
-        if self.guardrails.should_refuse_query(question):
-            return {
-                "answer": "I cannot process this query due to safety concerns.",
-                "sources": [],
-                "error": "Query failed guardrails validation"
-            }
+        with stage("guardrails"):
+            refused = self.guardrails.should_refuse_query(question)
+        if refused:
+            return self._refusal()
+        
+        # Pin the store for the whole query; ingestion may swap in a new one meanwhile
+        vector_store = self.vector_store
+        index_version = vector_store.version
+        cached = self._get_cached_answer(question, index_version)
+        if cached is not None:
+            return cached
         
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_generator.generate_embedding(question)
+            # Generate query embedding. With micro-batching the batcher thread already
+            # serializes model calls, and capping callers would only shrink its batches.
+            embedding_stage = nullcontext() if self.embedding_generator.batcher else stage("embedding")
+            with embedding_stage:
+                query_embedding = np.array(self.embedding_generator.generate_embedding(question))
+            
+            # Near-duplicate questions reuse an earlier answer without retrieval or generation
+            cached = self._get_semantic_answer(query_embedding, index_version)
+            if cached is not None:
+                return cached
             
             # Retrieve relevant documents
-            results = self.vector_store.search(
-                np.array(query_embedding),
-                k=settings.TOP_K_RETRIEVAL
-            )
+            with stage("search"):
+                results = vector_store.hybrid_search(
+                    question,
+                    query_embedding,
+                    k=self._retrieval_k()
+                )
+            results = self._rerank(question, results)
+        except Exception as e:
+            return self._error_response(e)
+        
+        response = self._answer(question, results)
+        self._cache_answer(question, index_version, response, query_embedding)
+        return response
+    
+    def query_batch(self, questions: List[str]) -> List[Dict]:
+        """Process many queries with one embedding pass and one index search"""
+        responses: List[Optional[Dict]] = [None] * len(questions)
+        # Pin the store for the whole query; ingestion may swap in a new one meanwhile
+        vector_store = self.vector_store
+        index_version = vector_store.version
+        allowed = []
+        for i, question in enumerate(questions):
+            with stage("guardrails"):
+                refused = self.guardrails.should_refuse_query(question)
+            if refused:
+                responses[i] = self._refusal()
+                continue
+            cached = self._get_cached_answer(question, index_version)
+            if cached is not None:
+                responses[i] = cached
+            else:
+                allowed.append(i)
+        
+        if allowed:
+            try:
+                with stage("embedding"):
+                    query_embeddings = self.embedding_generator.encode([questions[i] for i in allowed])
+                
+                # Only questions without a near-duplicate answer go on to retrieval
+                rows = []
+                for row, i in enumerate(allowed):
+                    cached = self._get_semantic_answer(query_embeddings[row], index_version)
+                    if cached is not None:
+                        responses[i] = cached
+                    else:
+                        rows.append(row)
+                
+                with stage("search"):
+                    batch_results = vector_store.hybrid_search_batch(
+                        [questions[allowed[row]] for row in rows],
+                        query_embeddings[rows],
+                        k=self._retrieval_k()
+                    )
+                batch_results = [
+                    self._rerank(questions[allowed[row]], results) for row, results in zip(rows, batch_results)
+                ]
+            except Exception as e:
+                error_response = self._error_response(e)
+                for i in allowed:
+                    if responses[i] is None:
+                        responses[i] = dict(error_response)
+                return responses
             
+            # Start every generation before waiting on any, so they run together
+            started = [
+                (row, results, *self._start_answer(questions[allowed[row]], results))
+                for row, results in zip(rows, batch_results)
+            ]
+            for row, results, response, generation in started:
+                i = allowed[row]
+                responses[i] = response if generation is None else self._finish_answer(results, generation)
+                self._cache_answer(questions[i], index_version, responses[i], query_embeddings[row])
+        
+        return responses
+    
+    def _build_prompt(self, question: str, results: List) -> Optional[str]:
+        """Build the LLM prompt from retrieved documents, or None if they carry no context"""
+        # Merge neighbouring chunks, drop repeated text and keep within the token budget
+        context = self.context_builder.build(results)
+        if not context:
+            return None
+        
+        # Generate answer using LLM with improved prompt. The prefix KV cache needs the
+        # instructions ahead of the context; otherwise they keep their place after the question.
+        if self.prefix_cache is not None:
+            return f"""{PROMPT_PREFIX}{context}
+
+Question: {question}
+
+Answer:"""
+        
+        return f"""{PROMPT_INTRO}Context:
+{context}
+
+Question: {question}
+
+{PROMPT_INSTRUCTIONS}
+Answer:"""
+    
+    def _fallback_answer(self, results: List) -> str:
+        """Answer from the top retrieved document when generation fails"""
+        if results and len(results) > 0 and isinstance(results[0], tuple) and len(results[0]) > 0:
+            doc = results[0][0]
+            if isinstance(doc, dict) and "content" in doc:
+                return doc["content"][:500] + "..."
+            return "I found relevant documents but couldn't generate an answer. Please try rephrasing your question."
+        return "I couldn't generate an answer. Please try again."
+    
+    def _sources(self, results: List) -> List[str]:
+        """Source names of retrieved documents"""
+        sources = []
+        for item in results:
+            if isinstance(item, tuple) and len(item) >= 1:
+                doc = item[0]
+                if isinstance(doc, dict) and "source" in doc:
+                    sources.append(doc["source"])
+        return sources
+    
+    def _confidence(self, results: List) -> float:
+        """Calculate confidence from distance (lower distance = higher confidence)"""
+        confidence = 0.0
+        if results and len(results) > 0:
+            try:
+                # Hits found only by BM25 carry a placeholder distance, so use the first
+                # hit the vector search actually scored when there is one
+                scored = [item for item in results if not item[0].get("lexical_only")]
+                # results[0] is (metadata_dict, distance)
+                distance = (scored or results)[0][1]
+                confidence = max(0.0, min(1.0, 1.0 - (distance / 10.0)))
+            except (IndexError, TypeError) as e:
+                logger.warning(f"Could not calculate confidence: {str(e)}")
+                confidence = 0.8  # Default confidence
+        return confidence
+    
+    def _generation_stage(self):
+        """Concurrency limiter for generation.
+
+        The scheduler bounds local generation by its token budget, and the OpenAI client
+        caps its own in-flight requests, so neither goes through the stage limiter.
+        """
+        if self.generation_scheduler or self.openai_client:
+            return nullcontext()
+        return stage("generation")
+    
+    def _submit_generation(self, prompt: str) -> Future:
+        """Start generating a response; the future resolves to its text.
+
+        The OpenAI client and the generation scheduler run many prompts at once, so
+        their futures are returned straight away. Other local backends generate on
+        the calling thread and return an already resolved future.
+        """
+        if settings.USE_OPENAI:
+            return self.openai_client.submit(
+                self._openai_messages(prompt),
+                temperature=settings.TEMPERATURE,
+                max_tokens=settings.MAX_TOKENS
+            )
+        if self.generation_scheduler is not None:
+            return self.generation_scheduler.submit(prompt, settings.MAX_TOKENS)
+        
+        future: Future = Future()
+        try:
+            with self._generation_stage():
+                future.set_result(self._generate_response(self.llm, prompt))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def _start_answer(self, question: str, results: List):
+        """Build the prompt and start generating.
+
+        Returns ``(response, None)`` when there is nothing to generate, otherwise
+        ``(None, future)`` for ``_finish_answer``.
+        """
+        try:
             if not results:
                 return {
                     "answer": "I couldn't find relevant information to answer your question.",
                     "sources": [],
                     "error": None
-                }
+                }, None
             
-            # Extract context from retrieved documents
-            context_parts = []
-            for item in results:
-                try:
-                    if isinstance(item, tuple) and len(item) >= 1:
-                        doc = item[0]
-                        if isinstance(doc, dict) and "content" in doc:
-                            context_parts.append(doc["content"])
-                except (IndexError, TypeError, AttributeError) as e:
-                    logger.warning(f"Error extracting context from result: {str(e)}")
-                    continue
-            
-            if not context_parts:
+            prompt = self._build_prompt(question, results)
+            if prompt is None:
                 return {
                     "answer": "I couldn't find relevant information to answer your question from the retrieved documents.",
                     "sources": [],
                     "error": None
-                }
-            
-            context = "\n\n".join(context_parts)
-            
-            # Generate answer using LLM with improved prompt
-            prompt = f"""Based on the following context from company documents, please answer the question completely and clearly.
-
-Context:
-{context}
-
-Question: {question}
-
-Instructions:
-- Provide a complete answer that fully addresses the question
-- Start your answer directly without repeating the question
-- Use clear, structured sentences
-- If the context doesn't contain sufficient information, clearly state that
-- Ensure your answer is complete and not cut off mid-sentence
-
-Answer:"""
-            
+                }, None
+        except Exception as e:
+            return self._error_response(e), None
+        
+        try:
+            return None, self._submit_generation(prompt)
+        except Exception as e:
+            future: Future = Future()
+            future.set_exception(e)
+            return None, future
+    
+    def _finish_answer(self, results: List, generation: Future) -> Dict:
+        """Wait for a started generation and attach sources"""
+        try:
             try:
-                if settings.USE_OPENAI:
-                    answer = self._generate_openai_response(prompt)
-                else:
-                    answer = self._generate_response(self.llm, prompt)
+                answer = generation.result()
             except Exception as e:
                 logger.error(f"LLM generation error: {str(e)}")
                 # Fallback: return top retrieved document
-                if results and len(results) > 0 and isinstance(results[0], tuple) and len(results[0]) > 0:
-                    doc = results[0][0]
-                    if isinstance(doc, dict) and "content" in doc:
-                        answer = doc["content"][:500] + "..."
-                    else:
-                        answer = "I found relevant documents but couldn't generate an answer. Please try rephrasing your question."
-                else:
-                    answer = "I couldn't generate an answer. Please try again."
-            
-            # Extract sources
-            sources = []
-            for item in results:
-                if isinstance(item, tuple) and len(item) >= 1:
-                    doc = item[0]
-                    if isinstance(doc, dict) and "source" in doc:
-                        sources.append(doc["source"])
-            
-            # Calculate confidence from distance (lower distance = higher confidence)
-            confidence = 0.0
-            if results and len(results) > 0:
-                try:
-                    # results[0] is (metadata_dict, distance)
-                    distance = results[0][1]
-                    confidence = max(0.0, min(1.0, 1.0 - (distance / 10.0)))
-                except (IndexError, TypeError) as e:
-                    logger.warning(f"Could not calculate confidence: {str(e)}")
-                    confidence = 0.8  # Default confidence
+                answer = self._fallback_answer(results)
             
             return {
                 "answer": answer.strip(),
-                "sources": sources,
-                "confidence": confidence,
+                "sources": self._sources(results),
+                "confidence": self._confidence(results),
                 "error": None
             }
-            
+        
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
-            return {
-                "answer": "I encountered an error while processing your question.",
-                "sources": [],
-                "error": str(e)
-            }
+            return self._error_response(e)
+    
+    def _answer(self, question: str, results: List) -> Dict:
+        """Generate an answer with sources from retrieved documents"""
+        response, generation = self._start_answer(question, results)
+        if generation is None:
+            return response
+        return self._finish_answer(results, generation)
+    
+    def query_stream(self, question: str, cancelled: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """Process a query, yielding a sources event, answer token events, then a done event.
 
+        Setting ``cancelled`` (for example when the client disconnects) stops generation
+        and ends the stream without a done event.
+        """
+        with stage("guardrails"):
+            refused = self.guardrails.should_refuse_query(question)
+        if refused:
+            yield {"event": "error", **self._refusal()}
+            return
+        
+        # Pin the store for the whole query; ingestion may swap in a new one meanwhile
+        vector_store = self.vector_store
+        index_version = vector_store.version
+        try:
+            cached = self._get_cached_answer(question, index_version)
+            query_embedding = None
+            if cached is None:
+                embedding_stage = nullcontext() if self.embedding_generator.batcher else stage("embedding")
+                with embedding_stage:
+                    query_embedding = np.array(self.embedding_generator.generate_embedding(question))
+                cached = self._get_semantic_answer(query_embedding, index_version)
+            
+            # Cached answers are replayed as a single token event
+            if cached is not None:
+                yield {"event": "sources", "sources": cached.get("sources", []), "confidence": cached.get("confidence", 0.0)}
+                yield {"event": "token", "text": cached["answer"]}
+                yield {"event": "done", **cached}
+                return
+            
+            with stage("search"):
+                results = vector_store.hybrid_search(question, query_embedding, k=self._retrieval_k())
+            results = self._rerank(question, results)
+        except Exception as e:
+            yield {"event": "error", **self._error_response(e)}
+            return
+        
+        prompt = self._build_prompt(question, results) if results else None
+        if prompt is None:
+            response = self._answer(question, results)
+            yield {"event": "sources", "sources": [], "confidence": 0.0}
+            yield {"event": "token", "text": response["answer"]}
+            yield {"event": "done", **response}
+            return
+        
+        sources = self._sources(results)
+        confidence = self._confidence(results)
+        yield {"event": "sources", "sources": sources, "confidence": confidence}
+        
+        parts = []
+        try:
+            with self._generation_stage():
+                if settings.USE_OPENAI:
+                    deltas = self._stream_openai_response(prompt)
+                else:
+                    deltas = self._stream_local_response(prompt, cancelled)
+                for delta in deltas:
+                    if cancelled is not None and cancelled.is_set():
+                        # Closing the stream stops the request and frees its slot
+                        deltas.close()
+                        break
+                    parts.append(delta)
+                    yield {"event": "token", "text": delta}
+        except Exception as e:
+            logger.error(f"LLM streaming error: {str(e)}")
+            if not parts:
+                fallback = self._fallback_answer(results)
+                parts.append(fallback)
+                yield {"event": "token", "text": fallback}
+        
+        # A cancelled answer is incomplete, so it is neither reported as done nor cached
+        if cancelled is not None and cancelled.is_set():
+            return
+        
+        response = {
+            "answer": "".join(parts).strip(),
+            "sources": sources,
+            "confidence": confidence,
+            "error": None
+        }
+        self._cache_answer(question, index_version, response, query_embedding)
+        yield {"event": "done", **response}
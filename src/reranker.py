@@ -0,0 +1,99 @@
+"""Cross-encoder reranking of retrieved chunks under a per-request time budget"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    """Reorders search results by cross-encoder relevance, falling back to vector order.
+
+    ``model`` is anything with a sentence-transformers ``CrossEncoder``-style
+    ``predict(pairs, batch_size=...)`` returning one score per (query, text) pair.
+    Candidates are scored in batches of ``batch_size`` on a small worker pool. The
+    caller waits at most ``budget_ms`` (including any wait for a free worker); past
+    that it gets the first ``top_n`` results in their original order, and the worker
+    stops after the batch it is on instead of scoring the rest.
+    """
+
+    def __init__(self, model, batch_size: int = 16, budget_ms: float = 150.0, max_workers: int = 2):
+        self.model = model
+        self.batch_size = batch_size
+        self.budget = budget_ms / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rerank")
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.fallbacks = 0
+
+    def _score(self, query: str, texts: List[str], cancelled: threading.Event) -> np.ndarray:
+        """Cross-encoder scores of each text against the query, batch by batch"""
+        scores = np.empty(len(texts), dtype='float32')
+        for start in range(0, len(texts), self.batch_size):
+            if cancelled.is_set():
+                raise TimeoutError("Rerank budget exceeded")
+            batch = texts[start:start + self.batch_size]
+            scores[start:start + len(batch)] = self.model.predict(
+                [(query, text) for text in batch], batch_size=len(batch)
+            )
+        return scores
+
+    def rerank(self, query: str, results: List[Tuple[Dict, float]], top_n: int) -> List[Tuple[Dict, float]]:
+        """The ``top_n`` results most relevant to the query, best first.
+
+        Results keep their vector distance, so confidence is computed as before.
+        """
+        if len(results) <= 1:
+            return results[:top_n]
+
+        texts = [doc.get("content", "") if isinstance(doc, dict) else "" for doc, _ in results]
+        start = time.perf_counter()
+        cancelled = threading.Event()
+        future = self._executor.submit(self._score, query, texts, cancelled)
+        try:
+            scores = future.result(timeout=self.budget)
+        except FutureTimeoutError:
+            cancelled.set()
+            future.cancel()
+            with self._lock:
+                self.fallbacks += 1
+            logger.warning(f"Reranking {len(results)} candidates exceeded {self.budget * 1000:.0f} ms; using vector order")
+            return results[:top_n]
+        except Exception as e:
+            with self._lock:
+                self.fallbacks += 1
+            logger.error(f"Error during reranking: {str(e)}")
+            return results[:top_n]
+
+        with self._lock:
+            self.reranked += 1
+        # Stable, so equal scores keep their retrieval order
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        logger.debug(f"Reranked {len(results)} candidates in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return [results[i] for i in order]
+
+    def stats(self) -> Dict:
+        """How often reranking finished within budget or fell back"""
+        return {
+            "reranked": self.reranked,
+            "fallbacks": self.fallbacks,
+            "budget_ms": self.budget * 1000,
+            "batch_size": self.batch_size
+        }
+
+    def close(self):
+        """Stop the worker pool"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def load_cross_encoder(model_name: str, max_length: int = 512):
+    """Load a sentence-transformers cross-encoder on the best available device"""
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Loading reranker model: {model_name} on {device}")
+    return CrossEncoder(model_name, max_length=max_length, device=device)
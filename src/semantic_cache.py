@@ -0,0 +1,118 @@
+"""Semantic answer cache matching near-duplicate questions by embedding similarity"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Answers to previously asked questions, looked up by cosine similarity.
+
+    Question embeddings live in a small inner-product FAISS index over L2-normalized
+    vectors. A lookup returns the nearest cached answer when its similarity is at least
+    ``similarity_threshold``. Entries expire after ``ttl_seconds``, the least recently used
+    are evicted beyond ``max_entries``, and everything is flushed when the vector store
+    version or the retrieval settings change.
+    """
+
+    def __init__(self, dimension: int, max_entries: int = 1000,
+                 similarity_threshold: float = 0.95, ttl_seconds: float = 3600):
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self._entries: "OrderedDict[int, Tuple[float, str, Dict]]" = OrderedDict()
+        self._next_id = 0
+        self._state: Optional[Tuple[int, Hashable]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        """Return the embedding as a unit-length float32 row"""
+        vector = np.array(embedding, dtype='float32').reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _sync(self, index_version: int, settings_key: Hashable):
+        """Flush the cache if the index or the settings have changed"""
+        state = (index_version, settings_key)
+        if state != self._state:
+            if self._entries:
+                logger.info(f"Vector index or settings changed; flushing {len(self._entries)} semantic cache entries")
+                self.invalidations += 1
+            self._clear()
+            self._state = state
+
+    def _clear(self):
+        """Drop all entries; the caller holds the lock"""
+        self.index.reset()
+        self._entries.clear()
+
+    def _remove(self, entry_id: int):
+        """Drop one entry; the caller holds the lock"""
+        self.index.remove_ids(np.array([entry_id], dtype='int64'))
+        del self._entries[entry_id]
+
+    def get(self, embedding: np.ndarray, settings_key: Hashable, index_version: int) -> Optional[Dict]:
+        """Return the cached response for the most similar question, or None on a miss"""
+        with self._lock:
+            self._sync(index_version, settings_key)
+            if self.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            similarities, ids = self.index.search(self._normalize(embedding), 1)
+            similarity, entry_id = float(similarities[0][0]), int(ids[0][0])
+            if entry_id == -1 or similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            created, question, response = self._entries[entry_id]
+            if time.monotonic() - created > self.ttl_seconds:
+                self._remove(entry_id)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            logger.info(f"Semantic cache hit (similarity {similarity:.3f}) for cached question: {question}")
+            return dict(response)
+
+    def put(self, embedding: np.ndarray, question: str, settings_key: Hashable,
+            index_version: int, response: Dict):
+        """Cache a response under its question embedding"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._sync(index_version, settings_key)
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(self._normalize(embedding), np.array([entry_id], dtype='int64'))
+            self._entries[entry_id] = (time.monotonic(), question, dict(response))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop all cached answers"""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "similarity_threshold": self.similarity_threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,31 @@
+"""Draft models for speculative (assisted) decoding of the local LLM"""
+import logging
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+SCHEDULES = ("constant", "heuristic")
+
+
+def load_draft_model(model_name: str, tokenizer, device, torch_dtype, num_tokens: int = 5,
+                     schedule: str = "constant"):
+    """Load a small model that proposes tokens for the main model to verify.
+
+    Proposals are exchanged as token ids, so the draft must use the main model's
+    vocabulary. ``num_tokens`` is how many tokens it proposes per verification step;
+    the ``heuristic`` schedule grows that number after fully accepted steps and shrinks
+    it after rejections, while ``constant`` keeps it fixed.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown speculative schedule: {schedule}. Options: {', '.join(SCHEDULES)}")
+
+    draft_tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if draft_tokenizer.get_vocab() != tokenizer.get_vocab():
+        raise ValueError(f"Draft model {model_name} must share the main model's tokenizer")
+
+    logger.info(f"Loading draft model: {model_name} on {device}")
+    model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch_dtype).to(device).eval()
+    model.generation_config.num_assistant_tokens = num_tokens
+    model.generation_config.num_assistant_tokens_schedule = schedule
+    return model
+
@@ -2,47 +2,357 @@
 import os
 import pickle
 import logging
-from typing import List, Dict, Tuple
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import faiss
 import numpy as np
 from pathlib import Path
 from src.config import settings
+from src.metadata_store import ColumnarMetadataStore
+from src.lexical_index import BM25Index, reciprocal_rank_fusion
 
 logger = logging.getLogger(__name__)
 
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+COMPRESSION_MODES = ("none", "sq8", "fp16", "pq")
+
+_SQ_TYPES = {"sq8": faiss.ScalarQuantizer.QT_8bit, "fp16": faiss.ScalarQuantizer.QT_fp16}
+
+# Versions are unique across store instances, so swapping in a different store also
+# looks like a content change to anything keyed on the version
+_versions = itertools.count(1)
+
+# FAISS recommends at least ~39 training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
+
+# An IVF index is retrained once its corpus would support this many times more clusters
+# than it was trained with; otherwise nprobe covers an ever larger share of the vectors
+NLIST_GROWTH_FACTOR = 4
+
+# Runs the lexical leg of hybrid searches while the calling thread searches FAISS; the
+# search stage limiter already caps concurrent searches at this size. Created on first
+# use, so processes that never run a hybrid search don't start its threads.
+_lexical_executor: Optional[ThreadPoolExecutor] = None
+_lexical_executor_lock = threading.Lock()
+
+
+def _get_lexical_executor() -> ThreadPoolExecutor:
+    """Thread pool for the lexical leg of hybrid searches, created on first use"""
+    global _lexical_executor
+    with _lexical_executor_lock:
+        if _lexical_executor is None:
+            _lexical_executor = ThreadPoolExecutor(
+                max_workers=settings.SEARCH_CONCURRENCY, thread_name_prefix="lexical"
+            )
+        return _lexical_executor
+
+
+def shutdown_lexical_executor():
+    """Wait for running lexical searches and stop their threads"""
+    global _lexical_executor
+    with _lexical_executor_lock:
+        executor, _lexical_executor = _lexical_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _pq_nbits(num_train: int) -> int:
+    """Bits per PQ code, lowered so each sub-quantizer has at least 2**nbits training points"""
+    nbits = settings.FAISS_PQ_NBITS
+    while nbits > 1 and num_train < (1 << nbits):
+        nbits -= 1
+    return nbits
+
+
+def _create_base_index(index_type: str, dimension: int, num_train: int, compression: str) -> faiss.Index:
+    """Create the index that holds the (possibly compressed) vector codes"""
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f"Unknown compression mode: {compression}. Options: {', '.join(COMPRESSION_MODES)}")
+    if compression == "pq" and dimension % settings.FAISS_PQ_M != 0:
+        raise ValueError(f"FAISS_PQ_M={settings.FAISS_PQ_M} must divide embedding dimension {dimension}")
+    
+    if index_type == "flat":
+        if compression in _SQ_TYPES:
+            return faiss.IndexScalarQuantizer(dimension, _SQ_TYPES[compression])
+        if compression == "pq":
+            return faiss.IndexPQ(dimension, settings.FAISS_PQ_M, _pq_nbits(num_train))
+        return faiss.IndexFlatL2(dimension)
+    
+    if index_type == "hnsw":
+        if compression in _SQ_TYPES:
+            index = faiss.IndexHNSWSQ(dimension, _SQ_TYPES[compression], settings.FAISS_HNSW_M)
+        elif compression == "pq":
+            index = faiss.IndexHNSWPQ(dimension, settings.FAISS_PQ_M, settings.FAISS_HNSW_M, _pq_nbits(num_train))
+        else:
+            index = faiss.IndexHNSWFlat(dimension, settings.FAISS_HNSW_M)
+        index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+        return index
+    
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}. Options: {', '.join(INDEX_TYPES)}")
+    if index_type == "ivf_pq" and compression != "none":
+        raise ValueError("ivf_pq already stores PQ codes; set FAISS_COMPRESSION=none")
+    if index_type == "ivf_flat" and compression == "pq":
+        raise ValueError("Use FAISS_INDEX_TYPE=ivf_pq for product-quantized IVF")
+    
+    nlist = max(1, min(settings.FAISS_NLIST, num_train // MIN_POINTS_PER_CENTROID))
+    quantizer = faiss.IndexFlatL2(dimension)
+    
+    if index_type == "ivf_flat":
+        if compression in _SQ_TYPES:
+            return faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, _SQ_TYPES[compression])
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    
+    if dimension % settings.FAISS_PQ_M != 0:
+        raise ValueError(f"FAISS_PQ_M={settings.FAISS_PQ_M} must divide embedding dimension {dimension}")
+    return faiss.IndexIVFPQ(quantizer, dimension, nlist, settings.FAISS_PQ_M, _pq_nbits(num_train))
+
+
+def create_index(index_type: str, dimension: int, num_train: int = 0, compression: str = "none",
+                 pca_dim: int = 0, exact_rescore: bool = False) -> faiss.Index:
+    """Create an empty FAISS index of the given type, sized for ``num_train`` training vectors.
+
+    ``compression`` selects how vectors are encoded: scalar-quantized to int8 (``sq8``)
+    or fp16, or product-quantized (``pq``). ``pca_dim`` first projects vectors onto that
+    many principal components, learned when the index is trained. With ``exact_rescore``
+    the full-precision vectors are kept as well and the compressed shortlist of
+    ``FAISS_RESCORE_K_FACTOR * k`` hits is re-ranked with exact distances.
+    """
+    if pca_dim and not 0 < pca_dim < dimension:
+        raise ValueError(f"FAISS_PCA_DIM={pca_dim} must be between 0 and embedding dimension {dimension}")
+    
+    index = _create_base_index(index_type, pca_dim or dimension, num_train, compression)
+    if pca_dim:
+        index = faiss.IndexPreTransform(faiss.PCAMatrix(dimension, pca_dim), index)
+    if exact_rescore:
+        index = faiss.IndexRefineFlat(index)
+    return index
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """The index holding the vector codes, beneath any rescoring or PCA wrappers"""
+    while True:
+        if isinstance(index, faiss.IndexRefine):
+            index = faiss.downcast_index(index.base_index)
+        elif isinstance(index, faiss.IndexPreTransform):
+            index = faiss.downcast_index(index.index)
+        else:
+            return index
+
+
+def detect_index_type(index: faiss.Index) -> str:
+    """Return the configured type name for a loaded FAISS index"""
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def detect_compression(index: faiss.Index) -> str:
+    """Return the compression mode of a loaded FAISS index (ivf_pq counts as uncompressed)"""
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        for mode, qtype in _SQ_TYPES.items():
+            if index.sq.qtype == qtype:
+                return mode
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    return "none"
+
+
+def index_layout(index: faiss.Index) -> Dict:
+    """Type, compression, PCA dimension and rescoring of a FAISS index, as configured"""
+    wrapped = faiss.downcast_index(index.base_index) if isinstance(index, faiss.IndexRefine) else index
+    return {
+        "index_type": detect_index_type(index),
+        "compression": detect_compression(index),
+        "pca_dim": base_index(index).d if isinstance(wrapped, faiss.IndexPreTransform) else 0,
+        "exact_rescore": isinstance(index, faiss.IndexRefine)
+    }
+
+
+def set_search_params(index: faiss.Index, nprobe: int = None, ef_search: int = None, k_factor: float = None):
+    """Apply query-time knobs (IVF ``nprobe``, HNSW ``efSearch``, rescoring ``k_factor``) to an index"""
+    if isinstance(index, faiss.IndexRefine):
+        index.k_factor = k_factor or settings.FAISS_RESCORE_K_FACTOR
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search or settings.FAISS_HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(nprobe or settings.FAISS_NPROBE, index.nlist)
+
 
 class FAISSVectorStore:
     """FAISS-based vector store for document embeddings"""
     
-    def __init__(self, dimension: int = 384, index_path: str = None):
+    def __init__(self, dimension: int = 384, index_path: str = None, index_type: str = None, mmap: bool = False,
+                 lexical: bool = None, compression: str = None, pca_dim: int = None, exact_rescore: bool = None):
         self.dimension = dimension
         self.index_path = Path(index_path or settings.FAISS_INDEX_PATH)
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_type = index_type or settings.FAISS_INDEX_TYPE
+        self.compression = compression or settings.FAISS_COMPRESSION
+        self.pca_dim = settings.FAISS_PCA_DIM if pca_dim is None else pca_dim
+        self.exact_rescore = settings.FAISS_EXACT_RESCORE if exact_rescore is None else exact_rescore
+        # Memory-mapped stores are read-only: pages are shared through the OS page cache
+        self.read_only = mmap
+        # Keep a BM25 index over chunk text, positionally aligned with the vectors
+        self.lexical = settings.HYBRID_SEARCH if lexical is None else lexical
         
         # Initialize FAISS index
-        self.index = faiss.IndexFlatL2(dimension)
-        self.metadata = []  # Store document metadata alongside vectors
+        self.index = self._create_index()
+        # Store document metadata alongside vectors
+        self.metadata = ColumnarMetadataStore(compress=settings.METADATA_COMPRESSION)
+        self.lexical_index = self._new_lexical_index()
         self._load_index()
+        set_search_params(self.index)
+        self.version = next(_versions)
+    
+    def _create_index(self, num_train: int = 0, pca_dim: int = None) -> faiss.Index:
+        """Empty index with the store's configured type and compression"""
+        return create_index(
+            self.index_type, self.dimension, num_train=num_train, compression=self.compression,
+            pca_dim=self.pca_dim if pca_dim is None else pca_dim, exact_rescore=self.exact_rescore
+        )
+    
+    @property
+    def loaded_index_type(self) -> str:
+        """Type of the index currently held, which may differ from the configured one after a load"""
+        return detect_index_type(self.index)
+    
+    @property
+    def loaded_layout(self) -> Dict:
+        """Type, compression, PCA dimension and rescoring of the index currently held"""
+        return index_layout(self.index)
+    
+    @property
+    def layout(self) -> Dict:
+        """Configured type, compression, PCA dimension and rescoring"""
+        return {
+            "index_type": self.index_type,
+            "compression": self.compression,
+            "pca_dim": self.pca_dim,
+            "exact_rescore": self.exact_rescore
+        }
+    
+    @property
+    def _pca_deferred(self) -> bool:
+        """Whether PCA is configured but the index was trained on too few vectors for it"""
+        return bool(self.pca_dim) and self.index.is_trained and self.loaded_layout["pca_dim"] == 0
+    
+    @property
+    def layout_changed(self) -> bool:
+        """Whether the index held was built with other settings than the configured ones.
+
+        An index trained on fewer than ``pca_dim`` vectors is built without PCA; it still
+        matches the configuration until it holds enough vectors (see ``needs_retraining``).
+        """
+        loaded = self.loaded_layout
+        if self._pca_deferred and self.index.ntotal < self.pca_dim:
+            loaded = {**loaded, "pca_dim": self.pca_dim}
+        return loaded != self.layout
+    
+    @property
+    def needs_retraining(self) -> bool:
+        """Whether the index has outgrown the vectors it was trained on.
+
+        True once a PCA-deferred index holds enough vectors for PCA, or once an IVF index
+        holds enough for ``NLIST_GROWTH_FACTOR`` times its clusters. A rebuild trains on
+        at most ``INGEST_TRAIN_SIZE`` vectors, which caps the clusters it can reach.
+        """
+        if self._pca_deferred and self.index.ntotal >= self.pca_dim:
+            return True
+        index = base_index(self.index)
+        if not isinstance(index, faiss.IndexIVF):
+            return False
+        num_train = min(self.index.ntotal, settings.INGEST_TRAIN_SIZE)
+        target_nlist = min(settings.FAISS_NLIST, num_train // MIN_POINTS_PER_CENTROID)
+        return index.nlist * NLIST_GROWTH_FACTOR < target_nlist
+    
+    @property
+    def has_lexical_index(self) -> bool:
+        """Whether a BM25 index covering every vector is available for hybrid search"""
+        return self.lexical_index is not None and len(self.lexical_index) == self.index.ntotal
+    
+    def _new_lexical_index(self) -> Optional[BM25Index]:
+        """Empty BM25 index, or None when lexical indexing is disabled"""
+        return BM25Index(k1=settings.BM25_K1, b=settings.BM25_B) if self.lexical else None
+    
+    @property
+    def is_trained(self) -> bool:
+        """Whether the index can accept vectors"""
+        return self.index.is_trained
+    
+    @property
+    def supports_removal(self) -> bool:
+        """Whether vectors can be removed while keeping positions contiguous"""
+        # Flat codes (raw, SQ or PQ) shift down on removal; rescoring and graph/IVF indexes don't
+        return not isinstance(self.index, faiss.IndexRefine) and isinstance(base_index(self.index), faiss.IndexFlatCodes)
     
     def _load_index(self):
         """Load existing index if available"""
         index_file = self.index_path / "index.faiss"
-        metadata_file = self.index_path / "metadata.pkl"
+        legacy_metadata_file = self.index_path / "metadata.pkl"
+        has_metadata = ColumnarMetadataStore.exists(self.index_path) or legacy_metadata_file.exists()
         
-        if index_file.exists() and metadata_file.exists():
+        if index_file.exists() and has_metadata:
             try:
-                self.index = faiss.read_index(str(index_file))
-                with open(metadata_file, 'rb') as f:
-                    self.metadata = pickle.load(f)
-                logger.info(f"Loaded existing index with {self.index.ntotal} vectors")
+                if self.read_only:
+                    # Map the index instead of copying it into RAM; IO_FLAG_MMAP_IFC maps flat
+                    # codes too on FAISS versions that support it (1.11+)
+                    io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+                    self.index = faiss.read_index(str(index_file), io_flags)
+                    if not hasattr(faiss, "IO_FLAG_MMAP_IFC") and not isinstance(base_index(self.index), faiss.IndexIVF):
+                        logger.warning(
+                            f"FAISS {faiss.__version__} only memory-maps IVF lists; this "
+                            f"{self.loaded_index_type} index was read into RAM (upgrade to faiss-cpu>=1.11)"
+                        )
+                else:
+                    self.index = faiss.read_index(str(index_file))
+                
+                if ColumnarMetadataStore.exists(self.index_path):
+                    self.metadata = ColumnarMetadataStore.load(self.index_path, mmap=self.read_only)
+                else:
+                    # Convert indexes saved before the columnar format; the next save() migrates them
+                    with open(legacy_metadata_file, 'rb') as f:
+                        self.metadata = ColumnarMetadataStore.from_dicts(
+                            pickle.load(f), compress=settings.METADATA_COMPRESSION
+                        )
+                if self.lexical and BM25Index.exists(self.index_path):
+                    self.lexical_index = BM25Index.load(
+                        self.index_path, mmap=self.read_only, k1=settings.BM25_K1, b=settings.BM25_B
+                    )
+                elif self.lexical and self.index.ntotal > 0:
+                    logger.warning("No lexical index saved with this index; searches are vector-only until the next ingestion")
+                logger.info(f"Loaded existing index with {self.index.ntotal} vectors (mmap={self.read_only})")
             except Exception as e:
                 logger.warning(f"Could not load existing index: {str(e)}")
-                self.index = faiss.IndexFlatL2(self.dimension)
+                self.index = self._create_index()
+                self.metadata = ColumnarMetadataStore(compress=settings.METADATA_COMPRESSION)
+                self.lexical_index = self._new_lexical_index()
         else:
             logger.info("Creating new FAISS index")
     
+    def _check_writable(self):
+        """Raise if the store was opened read-only"""
+        if self.read_only:
+            raise ValueError("Vector store was memory-mapped read-only and cannot be modified")
+    
+    def _bump_version(self):
+        """Mark the store's content as changed"""
+        self.version = next(_versions)
+    
     def add_documents(self, embeddings: np.ndarray, metadatas: List[Dict]):
         """Add document embeddings to the index"""
+        self._check_writable()
         if len(embeddings) != len(metadatas):
             raise ValueError("Number of embeddings must match number of metadatas")
         
@@ -54,16 +364,76 @@ class FAISSVectorStore:
         if embeddings.shape[1] != self.dimension:
             raise ValueError(f"Embedding dimension {embeddings.shape[1]} doesn't match index dimension {self.dimension}")
         
+        if not self.index.is_trained:
+            raise ValueError(f"{self.loaded_index_type} index must be trained before adding documents")
+        
         self.index.add(embeddings)
         self.metadata.extend(metadatas)
+        if self.lexical_index is not None:
+            self.lexical_index.add([meta.get("content", "") for meta in metadatas])
+        self._bump_version()
         logger.info(f"Added {len(embeddings)} documents to index. Total: {self.index.ntotal}")
     
+    def train(self, embeddings: np.ndarray):
+        """Build a fresh index of the configured type and train it on the given vectors"""
+        self._check_writable()
+        if self.index.ntotal > 0:
+            raise ValueError("Cannot retrain a non-empty index; call reset() first")
+        
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        pca_dim = self.pca_dim
+        if pca_dim and len(embeddings) < pca_dim:
+            # PCA can't learn more components than it has training vectors
+            logger.warning(
+                f"Only {len(embeddings)} vectors to train PCA to {pca_dim} dimensions; "
+                f"indexing without PCA until the index is rebuilt with at least {pca_dim} vectors"
+            )
+            pca_dim = 0
+        self.index = self._create_index(num_train=len(embeddings), pca_dim=pca_dim)
+        if not self.index.is_trained:
+            logger.info(f"Training {self.index_type} index ({self.compression}, pca_dim={pca_dim}) on {len(embeddings)} vectors")
+            self.index.train(embeddings)
+        set_search_params(self.index)
+    
+    def rebuild_lexical_index(self, batch_size: int = 10000):
+        """Rebuild the BM25 index from the chunk text held in the metadata store"""
+        self._check_writable()
+        index = BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+        for start in range(0, len(self.metadata), batch_size):
+            end = min(start + batch_size, len(self.metadata))
+            index.add([self.metadata.get_content(i) for i in range(start, end)])
+        self.lexical_index = index
+        self._bump_version()
+        logger.info(f"Rebuilt lexical index over {len(index)} chunks")
+    
+    def remove_ids(self, ids: List[int]):
+        """Remove vectors by position; later positions shift down to stay contiguous"""
+        self._check_writable()
+        if not ids:
+            return
+        if not self.supports_removal:
+            raise ValueError(f"{self.loaded_index_type} index does not support removal; rebuild it instead")
+        
+        ids_array = np.array(sorted(set(ids)), dtype='int64')
+        removed = self.index.remove_ids(ids_array)
+        self.metadata.remove(ids_array)
+        if self.lexical_index is not None:
+            self.lexical_index.remove(ids_array)
+        self._bump_version()
+        logger.info(f"Removed {removed} documents from index. Total: {self.index.ntotal}")
+    
+    def reset(self):
+        """Drop all vectors and metadata"""
+        self._check_writable()
+        self.index = self._create_index()
+        set_search_params(self.index)
+        self.metadata = ColumnarMetadataStore(compress=settings.METADATA_COMPRESSION)
+        self.lexical_index = self._new_lexical_index()
+        self._bump_version()
+        logger.info(f"Reset FAISS index ({self.index_type}, {self.compression})")
+    
     def search(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Dict, float]]:
         """Search for similar documents"""
-        if self.index.ntotal == 0:
-            logger.warning("Vector index is empty. Cannot perform search.")
-            return []
-        
         if not isinstance(query_embedding, np.ndarray):
             query_embedding = np.array([query_embedding]).astype('float32')
         
@@ -71,48 +441,114 @@ class FAISSVectorStore:
         if query_embedding.ndim == 1:
             query_embedding = query_embedding.reshape(1, -1)
         
-        if query_embedding.shape[1] != self.dimension:
-            raise ValueError(f"Query embedding dimension {query_embedding.shape[1]} doesn't match index dimension {self.dimension}")
-        
+        results = self.search_batch(query_embedding[:1], k=k)
+        return results[0] if results else []
+    
+    def _as_queries(self, queries: np.ndarray) -> np.ndarray:
+        """Validate a query matrix and convert it to contiguous float32 rows"""
+        if not isinstance(queries, np.ndarray):
+            queries = np.array(queries)
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if queries.shape[1] != self.dimension:
+            raise ValueError(f"Query embedding dimension {queries.shape[1]} doesn't match index dimension {self.dimension}")
+        return queries
+    
+    def _search_ids(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """(position, distance) of the nearest vectors for every query row, nearest first"""
         search_k = min(k, self.index.ntotal)
-        if search_k == 0:
-            return []
+        if search_k == 0 or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        
+        distances, indices = self.index.search(queries, search_k)
+        # Drop padding (-1) and positions without metadata
+        return [
+            [(int(idx), float(distance)) for distance, idx in zip(row_distances, row_indices) if 0 <= idx < len(self.metadata)]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
+    
+    def search_batch(self, queries: np.ndarray, k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """Search for similar documents for every row of a query matrix in one index call"""
+        if self.index.ntotal == 0:
+            logger.warning("Vector index is empty. Cannot perform search.")
+            return [[] for _ in range(len(np.atleast_2d(queries)))]
+        
+        queries = self._as_queries(queries)
+        try:
+            return [
+                [(self.metadata[idx], distance) for idx, distance in row]
+                for row in self._search_ids(queries, k)
+            ]
+        except Exception as e:
+            logger.error(f"Error during vector search: {str(e)}")
+            return [[] for _ in range(len(queries))]
+    
+    def hybrid_search(self, query_text: str, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Dict, float]]:
+        """Search with both the text and its embedding, fusing the two rankings"""
+        return self.hybrid_search_batch([query_text], np.atleast_2d(query_embedding)[:1], k=k)[0]
+    
+    def hybrid_search_batch(self, query_texts: List[str], queries: np.ndarray, k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """Fuse BM25 and vector results for each query with reciprocal-rank fusion.
+
+        Each leg returns ``HYBRID_CANDIDATES`` hits; the BM25 leg runs on a worker thread
+        while this one searches FAISS. Fused results keep their vector distance. Hits
+        found only lexically get the largest distance the vector leg returned (they are
+        at least that far) and are marked ``lexical_only`` in their metadata, so that
+        distance isn't mistaken for a measured one. Without a lexical index this is a
+        plain vector search.
+        """
+        if not self.has_lexical_index or self.index.ntotal == 0:
+            return self.search_batch(queries, k=k)
         
+        queries = self._as_queries(queries)
+        candidates = max(k, settings.HYBRID_CANDIDATES)
+        lexical = _get_lexical_executor().submit(
+            lambda: [self.lexical_index.search(text, candidates)[0].tolist() for text in query_texts]
+        )
         try:
-            distances, indices = self.index.search(query_embedding, search_k)
-            
-            # Check if results are valid
-            if distances.size == 0 or indices.size == 0:
-                logger.warning("FAISS search returned empty results")
-                return []
-            
-            # Ensure we have the right shape
-            if distances.ndim > 1:
-                distances = distances[0]
-            if indices.ndim > 1:
-                indices = indices[0]
-            
-            results = []
-            for distance, idx in zip(distances, indices):
-                # Check if index is valid and metadata exists
-                if 0 <= idx < len(self.metadata) and idx != -1:
-                    results.append((self.metadata[idx], float(distance)))
-            
-            return results
+            vector_rows = self._search_ids(queries, candidates)
         except Exception as e:
             logger.error(f"Error during vector search: {str(e)}")
-            return []
+            vector_rows = [[] for _ in range(len(queries))]
+        
+        try:
+            lexical_rows = lexical.result()
+        except Exception as e:
+            logger.error(f"Error during lexical search: {str(e)}")
+            lexical_rows = [[] for _ in range(len(queries))]
+        
+        results = []
+        for vector_row, lexical_row in zip(vector_rows, lexical_rows):
+            distances = dict(vector_row)
+            farthest = max(distances.values(), default=0.0)
+            fused = reciprocal_rank_fusion([[idx for idx, _ in vector_row], lexical_row], k=settings.RRF_K)[:k]
+            results.append([
+                (self.metadata[idx], distances[idx]) if idx in distances
+                else ({**self.metadata[idx], "lexical_only": True}, farthest)
+                for idx in fused
+            ])
+        return results
     
     def save(self):
         """Save index and metadata to disk"""
+        self._check_writable()
         self.index_path.mkdir(parents=True, exist_ok=True)
         
         index_file = self.index_path / "index.faiss"
-        metadata_file = self.index_path / "metadata.pkl"
+        legacy_metadata_file = self.index_path / "metadata.pkl"
         
-        faiss.write_index(self.index, str(index_file))
-        with open(metadata_file, 'wb') as f:
-            pickle.dump(self.metadata, f)
+        faiss.write_index(self.index, str(index_file) + ".tmp")
+        os.replace(str(index_file) + ".tmp", index_file)
+        self.metadata.save(self.index_path)
+        if self.lexical_index is not None:
+            self.lexical_index.save(self.index_path)
+        elif BM25Index.exists(self.index_path):
+            # A stale lexical index would no longer line up with the vectors
+            BM25Index.delete(self.index_path)
+        if legacy_metadata_file.exists():
+            legacy_metadata_file.unlink()
+        self._bump_version()
         
         logger.info(f"Saved index with {self.index.ntotal} vectors to {self.index_path}")
     
@@ -121,6 +557,12 @@ class FAISSVectorStore:
         return {
             "total_vectors": self.index.ntotal,
             "dimension": self.dimension,
+            **self.loaded_layout,
+            "version": self.version,
+            "mmap": self.read_only,
+            "metadata_bytes": self.metadata.nbytes,
+            "lexical_index": self.has_lexical_index,
+            "lexical_index_bytes": self.lexical_index.nbytes if self.lexical_index is not None else 0,
             "index_path": str(self.index_path)
         }
 
@@ -1,6 +1,7 @@
 """Streamlit UI for the LLM Customer Support Agent"""
 import streamlit as st
 import requests
+import json
 import logging
 from pathlib import Path
 import sys
@@ -24,6 +25,20 @@ st.set_page_config(
 # API endpoint
 API_URL = f"http://{settings.API_HOST}:{settings.API_PORT}"
 
+
+def read_events(response):
+    """Parse server-sent events from a streaming response into (event, data) pairs"""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if event is not None:
+                yield event, json.loads("\n".join(data))
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -135,23 +150,45 @@ if prompt := st.chat_input("Ask a question about your documentation..."):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Get response from API
+    # Stream response from API
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(
-                    f"{API_URL}/query",
-                    json={"question": prompt, "log_to_mlflow": True},
-                    timeout=60
-                )
+        try:
+            response = requests.post(
+                f"{API_URL}/query/stream",
+                json={"question": prompt, "log_to_mlflow": True},
+                stream=True,
+                timeout=60
+            )
+            
+            if response.status_code == 200:
+                placeholder = st.empty()
+                placeholder.markdown("_Thinking..._")
+                answer = ""
+                sources = []
+                confidence = 0.0
+                error_msg = None
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    answer = result["answer"]
-                    sources = result.get("sources", [])
-                    confidence = result.get("confidence", 0.0)
-                    
-                    st.markdown(answer)
+                for event, data in read_events(response):
+                    if event == "sources":
+                        sources = data.get("sources", [])
+                        confidence = data.get("confidence", 0.0)
+                    elif event == "token":
+                        answer += data["text"]
+                        placeholder.markdown(answer + "▌")
+                    elif event == "done":
+                        answer = data["answer"]
+                    elif event == "error":
+                        error_msg = f"Error: {data.get('error')}"
+                
+                if error_msg:
+                    placeholder.empty()
+                    st.error(error_msg)
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": error_msg
+                    })
+                else:
+                    placeholder.markdown(answer)
                     
                     # Display confidence
                     st.caption(f"Confidence: {confidence:.2%}")
@@ -169,20 +206,20 @@ if prompt := st.chat_input("Ask a question about your documentation..."):
                         "sources": sources,
                         "confidence": confidence
                     })
-                else:
-                    error_msg = f"Error: {response.text}"
-                    st.error(error_msg)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_msg
-                    })
-            except Exception as e:
-                error_msg = f"Error connecting to API: {str(e)}"
+            else:
+                error_msg = f"Error: {response.text}"
                 st.error(error_msg)
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": error_msg
                 })
+        except Exception as e:
+            error_msg = f"Error connecting to API: {str(e)}"
+            st.error(error_msg)
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": error_msg
+            })
 
 # Footer
 st.divider()
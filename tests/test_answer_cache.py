@@ -0,0 +1,35 @@
+"""Tests for answer cache"""
+import time
+from src.answer_cache import AnswerCache, normalize_question
+
+
+def test_normalized_questions_share_entries():
+    """Test that case and whitespace differences hit the same entry"""
+    assert normalize_question("  What is the   Return policy?") == normalize_question("what is the return policy?")
+    
+    cache = AnswerCache(max_entries=10)
+    cache.put("What is the return policy?", "settings", 1, {"answer": "30 days"})
+    assert cache.get("what is the  return policy?", "settings", 1) == {"answer": "30 days"}
+    assert cache.get("what is the return policy?", "other-settings", 1) is None
+
+
+def test_index_version_change_flushes():
+    """Test that a new index version invalidates cached answers"""
+    cache = AnswerCache(max_entries=10)
+    cache.put("q", "settings", 1, {"answer": "a"})
+    assert cache.get("q", "settings", 2) is None
+    assert cache.get("q", "settings", 1) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_ttl_and_lru_bounds():
+    """Test that entries expire and the cache stays bounded"""
+    cache = AnswerCache(max_entries=2, ttl_seconds=0.05)
+    cache.put("a", "s", 1, {"answer": "a"})
+    cache.put("b", "s", 1, {"answer": "b"})
+    cache.put("c", "s", 1, {"answer": "c"})
+    assert cache.get("a", "s", 1) is None
+    assert cache.get("c", "s", 1) == {"answer": "c"}
+    
+    time.sleep(0.1)
+    assert cache.get("c", "s", 1) is None
@@ -0,0 +1,117 @@
+"""Tests for the streaming query endpoint with a stubbed pipeline"""
+import sys
+import json
+import asyncio
+import importlib
+import threading
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+pytest.importorskip("mlflow")
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+
+from fastapi.testclient import TestClient
+
+
+class StubPipeline:
+    """Streams canned events; ``fail_after`` raises once that many events are sent"""
+
+    def __init__(self):
+        self.events = [
+            {"event": "sources", "sources": ["faq.pdf"], "confidence": 0.9},
+            {"event": "token", "text": "Within "},
+            {"event": "token", "text": "30 days."},
+            {"event": "done", "answer": "Within 30 days.", "sources": ["faq.pdf"], "confidence": 0.9, "error": None}
+        ]
+        self.fail_after = None
+        self.block = False
+        self.generating = threading.Event()
+        self.stopped = threading.Event()
+        self.closed = False
+
+    def query_stream(self, question, log_to_mlflow=True, cancelled=None):
+        try:
+            for i, event in enumerate(self.events):
+                if i == self.fail_after:
+                    raise RuntimeError("generation failed")
+                yield event
+                if self.block:
+                    # Decode until the request is cancelled
+                    self.generating.set()
+                    if cancelled.wait(5):
+                        self.stopped.set()
+                        return
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def api(monkeypatch):
+    import src.pipeline
+
+    # Importing the app builds its pipeline, so swap in the stub first
+    monkeypatch.setattr(src.pipeline, "MLOpsPipeline", StubPipeline)
+    sys.modules.pop("api.main", None)
+    module = importlib.import_module("api.main")
+    yield module
+    sys.modules.pop("api.main", None)
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_format_sse(api):
+    """Test that an event becomes a named SSE message with a JSON payload"""
+    message = api.format_sse({"event": "token", "text": "Hi"})
+    assert message == 'event: token\ndata: {"text": "Hi"}\n\n'
+
+
+def test_stream_sends_sources_tokens_then_done(api):
+    """Test that the endpoint relays the pipeline's events in order"""
+    client = TestClient(api.app)
+    response = client.post("/query/stream", json={"question": "How long do refunds take?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["sources", "token", "token", "done"]
+    assert "".join(data["text"] for name, data in events if name == "token") == events[-1][1]["answer"]
+    assert api.pipeline.closed
+
+
+def test_stream_failure_sends_error_event(api):
+    """Test that an exception mid-stream ends with an error event"""
+    api.pipeline.fail_after = 2
+    client = TestClient(api.app)
+    response = client.post("/query/stream", json={"question": "How long do refunds take?"})
+
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["sources", "token", "error"]
+    assert events[-1][1]["error"] == "generation failed"
+
+
+def test_disconnect_cancels_and_closes_the_stream(api):
+    """Test that a client leaving mid-generation stops generation and closes the generator"""
+    api.pipeline.block = True
+
+    async def disconnect():
+        response = await api.query_stream_endpoint(api.QueryRequest(question="How long do refunds take?"))
+        body = response.body_iterator
+        assert (await body.__anext__()).startswith("event: sources")
+        # The worker is now inside the pipeline's generator; the client goes away
+        pending = asyncio.ensure_future(body.__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, api.pipeline.generating.wait, 5)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(disconnect())
+    assert api.pipeline.stopped.is_set()
+    assert api.pipeline.closed
@@ -0,0 +1,43 @@
+"""Tests for micro-batching"""
+import threading
+import pytest
+from src.batching import MicroBatcher
+
+
+def test_concurrent_callers_are_coalesced():
+    """Test that concurrent submissions share batches and get their own results"""
+    batch_sizes = []
+    
+    def batch_fn(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+    
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    results = {}
+    barrier = threading.Barrier(8)
+    
+    def call(i):
+        barrier.wait()
+        results[i] = batcher(i)
+    
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+    
+    assert results == {i: i * 2 for i in range(8)}
+    assert len(batch_sizes) < 8
+    assert batcher.stats()["items"] == 8
+
+
+def test_errors_reach_every_caller():
+    """Test that a failing batch raises in each waiting caller"""
+    def batch_fn(items):
+        raise RuntimeError("model failed")
+    
+    batcher = MicroBatcher(batch_fn, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher("text")
+    batcher.close()
@@ -0,0 +1,97 @@
+"""Tests for chunking strategies"""
+import pytest
+
+pytest.importorskip("transformers")
+
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+from transformers import PreTrainedTokenizerFast
+from src.chunking import Chunker, ChunkStats, CharacterChunker, count_tokens, create_chunker
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    """Fast tokenizer with one token per word or punctuation mark"""
+    model = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    model.pre_tokenizer = Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=model, unk_token="[UNK]")
+
+
+TEXT = (
+    "Returns are accepted within thirty days. Items must be unused.\n\n"
+    "Refunds go to the original card.\n\n"
+    + " ".join(f"Clause {i} applies." for i in range(20))
+)
+
+
+@pytest.mark.parametrize("strategy", ["token", "sentence", "recursive"])
+def test_chunks_fit_the_token_budget(tokenizer, strategy):
+    """Test that token-aware chunkers never exceed the budget and drop no text"""
+    chunker = create_chunker(strategy, tokenizer, max_tokens=10)
+    chunks = chunker.chunk(TEXT)
+    
+    assert max(count_tokens(tokenizer, chunks)) <= 10
+    assert "".join("".join(chunks).split()) == "".join(TEXT.split())
+
+
+def test_token_overlap(tokenizer):
+    """Test that token windows share the configured overlap"""
+    chunker = create_chunker("token", tokenizer, max_tokens=4, overlap_tokens=2)
+    assert chunker.chunk("a b c d e f") == ["a b c d", "c d e f"]
+
+
+def test_sentence_chunker_keeps_paragraphs_together(tokenizer):
+    """Test that paragraphs within the budget are not split"""
+    chunker = create_chunker("sentence", tokenizer, max_tokens=20)
+    chunks = chunker.chunk("One two. Three four.\n\nFive six.")
+    assert chunks == ["One two. Three four.\n\nFive six."]
+
+
+def test_recursive_chunker_prefers_coarse_separators(tokenizer):
+    """Test that paragraph boundaries are used before sentence boundaries"""
+    chunker = create_chunker("recursive", tokenizer, max_tokens=6)
+    chunks = chunker.chunk("Alpha beta gamma.\n\nDelta epsilon zeta.")
+    assert chunks == ["Alpha beta gamma.", "Delta epsilon zeta."]
+
+
+def test_chunk_many_matches_chunk(tokenizer):
+    """Test that batched chunking gives the same result as one text at a time"""
+    chunker = create_chunker("recursive", tokenizer, max_tokens=10)
+    texts = [TEXT, "", "Short text."]
+    assert chunker.chunk_many(texts) == [chunker.chunk(text) for text in texts]
+
+
+def test_character_chunker_matches_original_windows():
+    """Test that the character strategy keeps the original fixed windows"""
+    chunks = CharacterChunker(chunk_size=1000, chunk_overlap=200).chunk("a" * 5000)
+    assert len(chunks) == 7
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+
+
+def test_chunker_requires_chunk_many_and_config():
+    """Test that a chunker missing its abstract methods can't be created"""
+    class Incomplete(Chunker):
+        def chunk_many(self, texts):
+            return [[text] for text in texts]
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_unknown_strategy():
+    """Test that an unknown strategy name is rejected"""
+    with pytest.raises(ValueError):
+        create_chunker("semantic")
+
+
+def test_chunk_stats():
+    """Test that chunks over the token limit are counted as truncated"""
+    stats = ChunkStats(token_limit=256)
+    stats.record([100, 300, 256])
+    metrics = stats.as_metrics()
+    
+    assert metrics["chunk_count"] == 3
+    assert metrics["truncated_chunks"] == 1
+    assert metrics["truncated_tokens"] == 44
+    assert metrics["max_chunk_tokens"] == 300
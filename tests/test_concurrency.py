@@ -0,0 +1,42 @@
+"""Tests for bounded query execution"""
+import asyncio
+import threading
+import time
+from src.concurrency import QueryExecutor, StageLimiter
+
+
+def test_stage_limiter_caps_concurrency():
+    """Test that no more than max_concurrency threads run a stage at once"""
+    limiter = StageLimiter("test", max_concurrency=2)
+    peak = []
+    
+    def work():
+        with limiter:
+            peak.append(limiter.running)
+            time.sleep(0.02)
+    
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert max(peak) <= 2
+    assert limiter.stats()["completed"] == 6
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_executor_keeps_event_loop_responsive():
+    """Test that blocking work on the executor doesn't stall other coroutines"""
+    executor = QueryExecutor(max_workers=2)
+    
+    async def scenario():
+        blocking = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        responsive = time.perf_counter() - start < 0.1
+        await blocking
+        return responsive
+    
+    assert asyncio.run(scenario())
+    executor.shutdown()
@@ -0,0 +1,64 @@
+"""Tests for prompt context assembly"""
+from src.context_builder import ContextBuilder, merge_overlapping
+
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+
+def result(source, chunk_index, content, distance=0.0):
+    return ({"content": content, "source": source, "chunk_index": chunk_index, "path": source}, distance)
+
+
+def test_merge_overlapping_writes_shared_text_once():
+    """Test that the overlap between neighbouring chunks appears once"""
+    first = "Returns are accepted within thirty days of purchase."
+    second = "within thirty days of purchase. Refunds go to the card."
+    assert merge_overlapping(first, second) == "Returns are accepted within thirty days of purchase. Refunds go to the card."
+
+
+def test_merge_ignores_short_coincidental_matches():
+    """Test that a few shared characters are not treated as overlap"""
+    assert merge_overlapping("the end", "end of story") == "the end\nend of story"
+
+
+def test_adjacent_chunks_from_one_source_are_merged():
+    """Test that neighbouring chunks become one block, ordered by best rank"""
+    builder = ContextBuilder(count_words, max_tokens=1000)
+    context = builder.build([
+        result("b.pdf", 4, "Shipping takes five business days."),
+        result("a.pdf", 1, "section two continues the refund policy text"),
+        result("a.pdf", 0, "Section one starts the policy. section two continues the refund policy text"),
+    ])
+    assert context == (
+        "Shipping takes five business days.\n\n"
+        "Section one starts the policy. section two continues the refund policy text"
+    )
+
+
+def test_duplicate_text_is_dropped():
+    """Test that a chunk repeated in another source is only included once"""
+    builder = ContextBuilder(count_words, max_tokens=1000)
+    context = builder.build([
+        result("a.pdf", 0, "Refunds go to the original card."),
+        result("copy.pdf", 7, "Refunds go to the original card."),
+    ])
+    assert context == "Refunds go to the original card."
+
+
+def test_context_is_packed_within_budget():
+    """Test that lower-ranked blocks are cut to the token budget"""
+    builder = ContextBuilder(count_words, max_tokens=8)
+    context = builder.build([
+        result("a.pdf", 0, "one two three four five"),
+        result("b.pdf", 0, "six seven eight nine ten eleven"),
+        result("c.pdf", 0, "twelve thirteen"),
+    ])
+    assert sum(count_words([context])) <= 8
+    assert context.startswith("one two three four five\n\nsix")
+    assert "twelve" not in context
+
+
+def test_empty_results():
+    """Test that results without content give no context"""
+    assert ContextBuilder(count_words, max_tokens=10).build([]) == ""
@@ -24,3 +24,68 @@ def test_load_all_documents_empty_dir():
         documents = processor.load_all_documents()
         assert len(documents) == 0
 
+
+
+def make_pdf(path, pages):
+    """Write a PDF with one line of text per page"""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in pages:
+        page = writer.add_blank_page(width=612, height=792)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_parallel_extraction_keeps_document_and_page_order():
+    """Test that pooled page-range extraction matches sequential extraction"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ["a", "b", "c"]:
+            make_pdf(os.path.join(tmpdir, f"{name}.pdf"), [f"{name} page {i}" for i in range(5)])
+        
+        sequential = DocumentProcessor(documents_path=tmpdir, workers=1).load_all_documents()
+        parallel = DocumentProcessor(documents_path=tmpdir, workers=3, pages_per_task=2).load_all_documents()
+        
+        assert parallel == sequential
+        assert [doc["source"] for doc in parallel] == ["a.pdf", "b.pdf", "c.pdf"]
+        assert parallel[1]["content"] == "".join(f"b page {i}\n" for i in range(5))
+
+
+def test_parallel_extraction_skips_unreadable_files():
+    """Test that a corrupt PDF is skipped without affecting the others"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_pdf(os.path.join(tmpdir, "a.pdf"), ["first"])
+        Path(tmpdir, "b.pdf").write_bytes(b"not a pdf")
+        make_pdf(os.path.join(tmpdir, "c.pdf"), ["last"])
+        
+        documents = DocumentProcessor(documents_path=tmpdir, workers=2).load_all_documents()
+        
+        assert [doc["source"] for doc in documents] == ["a.pdf", "c.pdf"]
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_timed_out_files_do_not_starve_later_files():
+    """Test that files after a hung one are still extracted once it times out"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Opening a pipe nobody writes to blocks the worker for good
+        os.mkfifo(os.path.join(tmpdir, "a_hung.pdf"))
+        os.mkfifo(os.path.join(tmpdir, "b_hung.pdf"))
+        for name in ["c", "d", "e"]:
+            make_pdf(os.path.join(tmpdir, f"{name}.pdf"), [f"{name} page"])
+        
+        processor = DocumentProcessor(documents_path=tmpdir, workers=2, timeout=1)
+        documents = processor.load_all_documents()
+        
+        assert [doc["source"] for doc in documents] == ["c.pdf", "d.pdf", "e.pdf"]
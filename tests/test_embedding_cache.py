@@ -0,0 +1,37 @@
+"""Tests for embedding cache"""
+import tempfile
+import numpy as np
+from src.embedding_cache import EmbeddingCache
+
+
+def test_memory_tier_lru_eviction():
+    """Test that the memory tier evicts least recently used entries"""
+    cache = EmbeddingCache("model", max_entries=2)
+    cache.put_many(["a", "b"], np.eye(2, dtype='float32'))
+    cache.get_many(["a"])
+    cache.put_many(["c"], np.ones((1, 2), dtype='float32'))
+    
+    found = cache.get_many(["a", "b", "c"])
+    assert sorted(found) == [0, 2]
+    assert cache.stats()["misses"] == 1
+
+
+def test_keys_depend_on_model():
+    """Test that the same text under different models doesn't collide"""
+    assert EmbeddingCache("model-a").key("hello") != EmbeddingCache("model-b").key("hello")
+
+
+def test_disk_tier_survives_restart_and_is_bounded():
+    """Test that the disk tier persists vectors and evicts beyond its bound"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = EmbeddingCache("model", max_entries=0, disk_path=tmpdir, disk_max_entries=2)
+        cache.put_many(["a", "b", "c"], np.arange(6, dtype='float32').reshape(3, 2))
+        assert cache.stats()["disk_entries"] == 2
+        
+        reopened = EmbeddingCache("model", max_entries=10, disk_path=tmpdir, disk_max_entries=2)
+        found = reopened.get_many(["c"])
+        np.testing.assert_array_equal(found[0], [4.0, 5.0])
+        assert reopened.stats()["disk_hits"] == 1
+        
+        reopened.get_many(["c"])
+        assert reopened.stats()["memory_hits"] == 1
@@ -0,0 +1,80 @@
+"""Tests for the continuous batching generation scheduler"""
+import time
+import threading
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.generation import GenerationScheduler
+from tests.tiny_models import greedy_reference, tiny_gpt2, tiny_llama, tiny_tokenizer
+
+PROMPTS = [
+    ("how long do i have to return an order ?", 6),
+    ("refunds", 9),
+    ("are shipping costs refunded when the item is used ?", 3),
+    ("can i return an item", 7),
+    ("the order", 5),
+]
+
+
+@pytest.mark.parametrize("make_model", [tiny_gpt2, tiny_llama])
+def test_greedy_output_matches_sequential_generate(make_model):
+    """Test that batched greedy decoding matches generating each prompt alone"""
+    model = make_model()
+    tokenizer = tiny_tokenizer()
+    expected = [greedy_reference(model, tokenizer, prompt, max_new_tokens) for prompt, max_new_tokens in PROMPTS]
+
+    # Room for two sequences at a time, so prompts join and leave a running batch
+    scheduler = GenerationScheduler(model, tokenizer, token_budget=40, max_batch_size=2, temperature=0)
+    try:
+        futures = [scheduler.submit(prompt, max_new_tokens) for prompt, max_new_tokens in PROMPTS[:3]]
+        time.sleep(0.05)
+        futures += [scheduler.submit(prompt, max_new_tokens) for prompt, max_new_tokens in PROMPTS[3:]]
+        assert [future.result(timeout=30) for future in futures] == expected
+    finally:
+        scheduler.close()
+
+
+def test_stream_increments_join_to_the_answer():
+    """Test that streamed increments add up to the generated text"""
+    model = tiny_llama()
+    tokenizer = tiny_tokenizer()
+    prompt, max_new_tokens = PROMPTS[0]
+
+    scheduler = GenerationScheduler(model, tokenizer, temperature=0)
+    try:
+        streamed = "".join(scheduler.stream(prompt, max_new_tokens))
+        assert streamed.strip() == greedy_reference(model, tokenizer, prompt, max_new_tokens)
+    finally:
+        scheduler.close()
+
+
+def test_cancelled_sequences_free_their_slot():
+    """Test that cancelling a future, dropping a stream or setting its flag leaves the batch"""
+    model = tiny_llama()
+    tokenizer = tiny_tokenizer()
+    # Without an EOS these would run until their token limit
+    tokenizer.eos_token = None
+
+    scheduler = GenerationScheduler(model, tokenizer, max_batch_size=1, temperature=1.0)
+    try:
+        long_running = scheduler.submit("refunds", 200)
+        stream = scheduler.stream("the order", 200)
+        time.sleep(0.05)
+        assert long_running.cancel()
+
+        next(stream)
+        stream.close()
+
+        flag = threading.Event()
+        flagged = scheduler.stream("returns", 200, cancelled=flag)
+        next(flagged)
+        flag.set()
+        assert len(list(flagged)) < 200
+
+        assert isinstance(scheduler.generate("returns", 3), str)
+        assert scheduler.stats()["cancelled"] == 3
+        assert scheduler.stats()["active"] == 0
+    finally:
+        scheduler.close()
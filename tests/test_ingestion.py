@@ -0,0 +1,63 @@
+"""Tests for streaming ingestion helpers"""
+import threading
+import pytest
+from src.ingestion import batched, prefetch
+
+
+def test_batched():
+    """Test that items are grouped into fixed-size batches"""
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
+
+
+def test_prefetch_preserves_order():
+    """Test that prefetched items arrive in order"""
+    assert list(prefetch(iter(range(100)), maxsize=4)) == list(range(100))
+
+
+def test_prefetch_is_bounded():
+    """Test that the producer runs at most maxsize items ahead of the consumer"""
+    produced = []
+    
+    def produce():
+        for i in range(50):
+            produced.append(i)
+            yield i
+    
+    items = prefetch(produce(), maxsize=3)
+    assert next(items) == 0
+    threading.Event().wait(0.2)
+    # One item consumed, up to three buffered, one blocked on a full queue
+    assert len(produced) <= 5
+    items.close()
+
+
+def test_prefetch_propagates_errors():
+    """Test that a producer exception is raised in the consumer after earlier items"""
+    def produce():
+        yield 1
+        raise RuntimeError("embedding failed")
+    
+    items = prefetch(produce(), maxsize=2)
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        next(items)
+
+
+def test_prefetch_close_stops_producer():
+    """Test that closing early stops and closes the upstream generator"""
+    closed = threading.Event()
+    
+    def produce():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+    
+    items = prefetch(produce(), maxsize=2)
+    assert next(items) == 0
+    items.close()
+    assert closed.is_set()
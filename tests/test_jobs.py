@@ -0,0 +1,59 @@
+"""Tests for the background job queue"""
+import threading
+from src.jobs import JobQueue, SUCCEEDED, FAILED, QUEUED
+
+
+def test_job_result_and_status():
+    """Test that a job records its result once it finishes"""
+    jobs = JobQueue()
+    job = jobs.submit("ingest", lambda x: {"doubled": x * 2}, 21)
+    job.future.result()
+    
+    assert jobs.get(job.id) is job
+    assert job.status == SUCCEEDED
+    assert job.to_dict()["result"] == {"doubled": 42}
+    assert job.started_at is not None and job.finished_at is not None
+    jobs.shutdown()
+
+
+def test_failed_job_records_error():
+    """Test that an exception marks the job failed instead of propagating"""
+    def fail():
+        raise RuntimeError("index build failed")
+    
+    jobs = JobQueue()
+    job = jobs.submit("ingest", fail)
+    job.future.result()
+    
+    assert job.status == FAILED
+    assert job.error == "index build failed"
+    assert jobs.stats()[FAILED] == 1
+    jobs.shutdown()
+
+
+def test_jobs_run_one_at_a_time():
+    """Test that a second job waits until the first one finishes"""
+    release = threading.Event()
+    jobs = JobQueue()
+    first = jobs.submit("ingest", release.wait)
+    second = jobs.submit("ingest", lambda: None)
+    
+    assert second.status == QUEUED
+    release.set()
+    second.future.result()
+    assert first.finished_at <= second.started_at
+    jobs.shutdown()
+
+
+def test_history_is_bounded():
+    """Test that the oldest finished jobs are forgotten beyond the history limit"""
+    jobs = JobQueue(max_history=2)
+    submitted = []
+    for _ in range(4):
+        job = jobs.submit("ingest", lambda: None)
+        job.future.result()
+        submitted.append(job)
+    
+    assert [job.id for job in jobs.list()] == [job.id for job in submitted[-2:]]
+    assert jobs.get(submitted[0].id) is None
+    jobs.shutdown()
@@ -0,0 +1,68 @@
+"""Tests for the BM25 lexical index and rank fusion"""
+import tempfile
+from src.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "Returns are accepted within 30 days of purchase.",
+    "Error ERR-4012 means the payment card was declined.",
+    "The SKU-1042-B charger ships with a USB-C cable.",
+    "Shipping takes 3 to 5 business days for most orders.",
+    "Refunds for declined payments are not charged.",
+]
+
+
+def _index():
+    index = BM25Index()
+    index.add(TEXTS[:3])
+    index.add(TEXTS[3:])
+    return index
+
+
+def test_tokenize_keeps_identifiers_whole():
+    """Test that codes are indexed whole and by their parts, without stopwords"""
+    assert tokenize("The SKU-1042-B is in stock") == ["sku-1042-b", "sku", "1042", "b", "stock"]
+
+
+def test_exact_code_ranks_first():
+    """Test that a product code or error code finds its chunk"""
+    index = _index()
+    ids, scores = index.search("what does err-4012 mean", k=3)
+    assert ids[0] == 1
+    assert list(scores) == sorted(scores, reverse=True)
+    assert index.search("sku-1042-b", k=1)[0].tolist() == [2]
+
+
+def test_unknown_terms_return_nothing():
+    """Test that a query sharing no terms with the corpus has no hits"""
+    ids, _ = _index().search("warranty extension", k=5)
+    assert len(ids) == 0
+
+
+def test_remove_renumbers_documents():
+    """Test that later documents shift down after a removal, as vectors do"""
+    index = _index()
+    index.remove([0, 1])
+    assert len(index) == 3
+    assert index.search("sku-1042-b", k=1)[0].tolist() == [0]
+    assert index.search("err-4012", k=1)[0].tolist() == []
+    assert index.search("declined", k=5)[0].tolist() == [2]
+
+
+def test_save_and_load():
+    """Test that a saved index searches the same after loading, mapped or not"""
+    index = _index()
+    expected = index.search("declined payment card", k=5)[0].tolist()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index.save(tmpdir)
+        assert BM25Index.exists(tmpdir)
+        for mmap in (False, True):
+            loaded = BM25Index.load(tmpdir, mmap=mmap)
+            assert len(loaded) == len(TEXTS)
+            assert loaded.search("declined payment card", k=5)[0].tolist() == expected
+        BM25Index.delete(tmpdir)
+        assert not BM25Index.exists(tmpdir)
+
+
+def test_reciprocal_rank_fusion():
+    """Test that ids ranked well by both lists beat ids ranked first by only one"""
+    assert reciprocal_rank_fusion([[1, 2, 3], [4, 2, 1]]) == [1, 2, 4, 3]
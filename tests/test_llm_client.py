@@ -0,0 +1,221 @@
+"""Tests for the pooled OpenAI client against a local OpenAI-compatible stub server"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+pytest.importorskip("openai")
+
+from src.llm_client import OpenAIClient
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients that time out leave broken pipes behind
+
+
+class StubServer:
+    """Minimal chat completions endpoint whose behaviour tests can script"""
+
+    def __init__(self):
+        self.failures = []  # Status codes to return before succeeding
+        self.delay = 0.0
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    status = stub.failures.pop(0) if stub.failures else 200
+                try:
+                    time.sleep(stub.delay)
+                    if status != 200:
+                        self.send_json(status, {"error": {"message": "stub failure", "type": "stub"}})
+                    elif body.get("stream"):
+                        self.send_stream(["Hello", ", ", "world"])
+                    else:
+                        self.send_json(200, completion("Hello, world"))
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+
+            def send_json(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_stream(self, parts):
+                events = [chunk(part) for part in parts] + ["[DONE]"]
+                data = "".join(f"data: {event}\n\n" for event in events).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = QuietServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def completion(text):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]
+    }
+
+
+def chunk(text):
+    return json.dumps({
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "stub",
+        "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+    })
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault("backoff_seconds", 0.01)
+    return OpenAIClient(api_key="test", model="stub", base_url=stub.url, **kwargs)
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_complete(stub):
+    """Test that a completion round-trips through the stub"""
+    client = make_client(stub)
+    try:
+        assert client.complete(MESSAGES) == "Hello, world"
+        assert client.stats()["requests"] == 1
+    finally:
+        client.close()
+
+
+def test_retries_rate_limits_and_server_errors(stub):
+    """Test that 429 and 5xx responses are retried until one succeeds"""
+    stub.failures = [429, 503]
+    client = make_client(stub, max_retries=3)
+    try:
+        assert client.complete(MESSAGES) == "Hello, world"
+        assert stub.requests == 3
+        assert client.stats()["retries"] == 2
+    finally:
+        client.close()
+
+
+def test_gives_up_after_max_retries(stub):
+    """Test that persistent failures surface after the retry budget"""
+    import openai
+
+    stub.failures = [500] * 5
+    client = make_client(stub, max_retries=2)
+    try:
+        with pytest.raises(openai.APIStatusError):
+            client.complete(MESSAGES)
+        assert stub.requests == 3
+        assert client.stats()["failures"] == 1
+    finally:
+        client.close()
+
+
+def test_client_errors_are_not_retried(stub):
+    """Test that 4xx responses other than 429 fail immediately"""
+    import openai
+
+    stub.failures = [400]
+    client = make_client(stub, max_retries=3)
+    try:
+        with pytest.raises(openai.BadRequestError):
+            client.complete(MESSAGES)
+        assert stub.requests == 1
+    finally:
+        client.close()
+
+
+def test_in_flight_requests_are_capped(stub):
+    """Test that concurrent callers never exceed max_in_flight requests"""
+    stub.delay = 0.05
+    client = make_client(stub, max_in_flight=2)
+    try:
+        threads = [threading.Thread(target=client.complete, args=(MESSAGES,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert stub.requests == 6
+        assert stub.max_active <= 2
+    finally:
+        client.close()
+
+
+def test_submitted_completions_run_concurrently(stub):
+    """Test that futures from submit are in flight together and resolve to their text"""
+    stub.delay = 0.05
+    client = make_client(stub, max_in_flight=4)
+    try:
+        futures = [client.submit(MESSAGES) for _ in range(4)]
+        assert [future.result() for future in futures] == ["Hello, world"] * 4
+        assert stub.max_active > 1
+    finally:
+        client.close()
+
+
+def test_timeout(stub):
+    """Test that a slow attempt times out and counts as a failure"""
+    import openai
+
+    stub.delay = 0.5
+    client = make_client(stub, max_retries=0, timeout=0.1)
+    try:
+        with pytest.raises((openai.APITimeoutError, TimeoutError)):
+            client.complete(MESSAGES)
+        assert client.stats()["failures"] == 1
+    finally:
+        client.close()
+
+
+def test_stream(stub):
+    """Test that streamed text arrives in increments and retries before the first one"""
+    stub.failures = [429]
+    client = make_client(stub)
+    try:
+        assert list(client.stream(MESSAGES)) == ["Hello", ", ", "world"]
+        assert client.stats()["in_flight"] == 0
+    finally:
+        client.close()
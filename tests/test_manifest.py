@@ -0,0 +1,37 @@
+"""Tests for ingestion manifest"""
+import tempfile
+from pathlib import Path
+from src.manifest import IngestionManifest, hash_file
+
+
+def test_hash_file_changes_with_content():
+    """Test that file hashes track content"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = Path(tmpdir) / "doc.pdf"
+        file_path.write_bytes(b"version one")
+        first = hash_file(str(file_path))
+        assert first == hash_file(str(file_path))
+        
+        file_path.write_bytes(b"version two")
+        assert hash_file(str(file_path)) != first
+
+
+def test_manifest_roundtrip_and_compact():
+    """Test saving, loading and compacting chunk ranges"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manifest = IngestionManifest(tmpdir)
+        manifest.add("a.pdf", "aaa", 0, 3)
+        manifest.add("b.pdf", "bbb", 3, 2)
+        manifest.add("c.pdf", "ccc", 5, 4)
+        assert manifest.total_chunks == 9
+        assert manifest.chunk_ids("b.pdf") == [3, 4]
+        
+        manifest.remove("b.pdf")
+        manifest.compact()
+        manifest.save()
+        
+        reloaded = IngestionManifest(tmpdir)
+        assert reloaded.get_hash("a.pdf") == "aaa"
+        assert reloaded.get_hash("b.pdf") is None
+        assert reloaded.chunk_ids("c.pdf") == [3, 4, 5, 6]
+        assert reloaded.total_chunks == 7
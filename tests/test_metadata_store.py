@@ -0,0 +1,74 @@
+"""Tests for columnar metadata store"""
+import pickle
+import tempfile
+from pathlib import Path
+import numpy as np
+from src.metadata_store import ColumnarMetadataStore
+from src.vector_store import FAISSVectorStore
+
+
+def _metadatas():
+    return [
+        {"content": "Returns are accepted within 30 days.", "source": "policy.pdf", "chunk_index": 0, "path": "docs/policy.pdf"},
+        {"content": "Shipping takes 3–5 days.", "source": "shipping.pdf", "chunk_index": 0, "path": "docs/shipping.pdf"},
+        {"content": "Refunds go to the original card.", "source": "policy.pdf", "chunk_index": 1, "path": "docs/policy.pdf"},
+    ]
+
+
+def test_interning_and_materialization():
+    """Test that sources are interned and entries round-trip"""
+    for compress in (False, True):
+        store = ColumnarMetadataStore.from_dicts(_metadatas(), compress=compress)
+        assert len(store) == 3
+        assert store.sources == ["policy.pdf", "shipping.pdf"]
+        assert list(store) == _metadatas()
+
+
+def test_remove_drops_unused_sources():
+    """Test that removal keeps order and prunes the source table"""
+    store = ColumnarMetadataStore.from_dicts(_metadatas())
+    store.remove([1])
+    assert [meta["content"] for meta in store] == ["Returns are accepted within 30 days.", "Refunds go to the original card."]
+    assert store.sources == ["policy.pdf"]
+
+
+def test_repeated_extend_after_remove():
+    """Test that batched appends stay correct across removals and reloads"""
+    store = ColumnarMetadataStore()
+    for _ in range(10):
+        store.extend(_metadatas())
+    store.remove([0, 1])
+    store.extend(_metadatas())
+    
+    assert len(store) == 31
+    assert store[0] == _metadatas()[2]
+    assert [store[i] for i in range(28, 31)] == _metadatas()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store.save(tmpdir)
+        assert list(ColumnarMetadataStore.load(tmpdir)) == list(store)
+
+
+def test_save_and_mmap_load():
+    """Test that a saved store can be memory-mapped"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ColumnarMetadataStore.from_dicts(_metadatas(), compress=True).save(tmpdir)
+        mapped = ColumnarMetadataStore.load(tmpdir, mmap=True)
+        assert mapped.is_mapped
+        assert mapped[1] == _metadatas()[1]
+
+
+def test_legacy_pickle_is_migrated():
+    """Test that indexes saved with pickled metadata still load"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=8, index_path=tmpdir)
+        store.add_documents(np.random.rand(3, 8).astype('float32'), _metadatas())
+        store.save()
+        for path in Path(tmpdir).glob("metadata_*"):
+            path.unlink()
+        with open(Path(tmpdir) / "metadata.pkl", "wb") as f:
+            pickle.dump(_metadatas(), f)
+        
+        reloaded = FAISSVectorStore(dimension=8, index_path=tmpdir)
+        assert reloaded.metadata[2] == _metadatas()[2]
+        reloaded.save()
+        assert not (Path(tmpdir) / "metadata.pkl").exists()
@@ -0,0 +1,31 @@
+"""Tests for model registry"""
+import threading
+import time
+from src.model_registry import ModelRegistry, get_guardrails
+
+
+def test_loader_runs_once_under_concurrency():
+    """Test that concurrent callers share one load"""
+    registry = ModelRegistry()
+    calls = []
+    
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_load("model", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_shared_guardrails():
+    """Test that guardrails are shared across callers"""
+    assert get_guardrails(True) is get_guardrails(True)
+    assert get_guardrails(True) is not get_guardrails(False)
@@ -0,0 +1,28 @@
+"""Tests for the ONNX embedding backend helpers"""
+import numpy as np
+from src.onnx_backend import artifact_dir, cosine_agreement, pool
+
+
+def test_mean_pooling_ignores_padding():
+    """Test that padded positions don't contribute to mean-pooled vectors"""
+    tokens = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]])
+    mask = np.array([[1, 1, 0]])
+    assert np.allclose(pool(tokens, mask, "mean", normalize=False), [[2.0, 0.0]])
+    assert np.allclose(pool(tokens, mask, "mean"), [[1.0, 0.0]])
+    assert np.allclose(pool(tokens, mask, "max", normalize=False), [[3.0, 0.0]])
+    assert np.allclose(pool(tokens, mask, "cls", normalize=False), [[1.0, 0.0]])
+
+
+def test_cosine_agreement():
+    """Test that agreement is scale-invariant and per row"""
+    reference = np.array([[1.0, 0.0], [0.0, 1.0]])
+    candidate = np.array([[2.0, 0.0], [1.0, 0.0]])
+    assert np.allclose(cosine_agreement(reference, candidate), [1.0, 0.0])
+
+
+def test_artifact_dir_separates_quantized_exports():
+    """Test that float and int8 exports of a model are cached apart"""
+    plain = artifact_dir("/cache", "sentence-transformers/all-MiniLM-L6-v2", quantize=False)
+    quantized = artifact_dir("/cache", "sentence-transformers/all-MiniLM-L6-v2", quantize=True)
+    assert plain.name == "sentence-transformers--all-MiniLM-L6-v2"
+    assert quantized != plain
@@ -0,0 +1,223 @@
+"""Tests for incremental ingestion in the MLOps pipeline"""
+import os
+import hashlib
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+import faiss
+import numpy as np
+import pytest
+
+pytest.importorskip("mlflow")
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+
+from src import pipeline as pipeline_module
+from src.config import settings
+from src.pipeline import MLOpsPipeline
+from src.vector_store import FAISSVectorStore
+
+
+def _embed(text: str) -> np.ndarray:
+    """Deterministic vector for a text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.default_rng(seed).random(8).astype('float32')
+
+
+class StubEmbeddingGenerator:
+    """Records which texts were embedded"""
+
+    dimension = 8
+    max_tokens = 512
+
+    def __init__(self):
+        self.encoded = []
+
+    def count_tokens(self, texts):
+        return [len(text.split()) for text in texts]
+
+    def encode(self, texts, show_progress_bar=False):
+        self.encoded.extend(texts)
+        return np.stack([_embed(text) for text in texts])
+
+
+class StubChunker:
+    def config(self):
+        return {"strategy": "lines"}
+
+
+class StubDocumentProcessor:
+    """Treats every line of a text file in ``documents_path`` as one chunk"""
+
+    def __init__(self, documents_path: Path):
+        self.documents_path = documents_path
+
+    def list_documents(self):
+        return sorted(self.documents_path.glob("*.pdf"))
+
+    def iter_documents(self, pdf_files):
+        for pdf_file in pdf_files:
+            yield {"content": pdf_file.read_text(), "source": pdf_file.name, "path": str(pdf_file)}
+
+    def chunk(self, text):
+        return [line for line in text.splitlines() if line]
+
+
+class StubMlflow:
+    def start_run(self, *args, **kwargs):
+        return nullcontext()
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "mlflow", StubMlflow())
+    monkeypatch.setattr(settings, "FAISS_INDEX_PATH", str(tmp_path / "index"))
+    documents_path = tmp_path / "documents"
+    documents_path.mkdir()
+
+    pipeline = MLOpsPipeline.__new__(MLOpsPipeline)
+    pipeline.embedding_generator = StubEmbeddingGenerator()
+    pipeline.chunker = StubChunker()
+    pipeline.document_processor = StubDocumentProcessor(documents_path)
+    pipeline.vector_store = None
+    pipeline.rag_agent = None
+    pipeline._ingest_lock = threading.Lock()
+    return pipeline
+
+
+def _contents(store: FAISSVectorStore):
+    return [meta["content"] for meta in store.metadata]
+
+
+def _is_mapped(path) -> bool:
+    """Whether this process has memory-mapped the file"""
+    with open("/proc/self/maps") as maps:
+        return any(line.rstrip().endswith(str(path)) for line in maps)
+
+
+def _assert_aligned(store: FAISSVectorStore):
+    """Every vector still belongs to the chunk stored at its position"""
+    for i, content in enumerate(_contents(store)):
+        assert np.allclose(store.index.reconstruct(i), _embed(content))
+
+
+def test_incremental_ingestion(pipeline):
+    """Test that only new or changed files are embedded and stale vectors are removed"""
+    documents = pipeline.document_processor.documents_path
+    (documents / "a.pdf").write_text("alpha one\nalpha two")
+    (documents / "b.pdf").write_text("beta one")
+    (documents / "c.pdf").write_text("gamma one\ngamma two")
+
+    result = pipeline.ingest_documents()
+    assert result["documents_processed"] == 3
+    assert result["vectors_stored"] == 5
+
+    pipeline.embedding_generator.encoded = []
+    (documents / "b.pdf").write_text("beta changed\nbeta added")
+    (documents / "c.pdf").unlink()
+    (documents / "d.pdf").write_text("delta one")
+
+    result = pipeline.ingest_documents()
+    assert sorted(pipeline.embedding_generator.encoded) == ["beta added", "beta changed", "delta one"]
+    assert result["documents_processed"] == 2
+    assert result["documents_unchanged"] == 1
+    assert result["documents_removed"] == 1
+
+    store = pipeline.vector_store
+    assert sorted(_contents(store)) == ["alpha one", "alpha two", "beta added", "beta changed", "delta one"]
+    _assert_aligned(store)
+
+    # Nothing changed: nothing is embedded
+    pipeline.embedding_generator.encoded = []
+    result = pipeline.ingest_documents()
+    assert pipeline.embedding_generator.encoded == []
+    assert result["documents_unchanged"] == 3
+
+
+def test_manifest_mismatch_forces_rebuild(pipeline):
+    """Test that an index that doesn't match its manifest is rebuilt from every file"""
+    documents = pipeline.document_processor.documents_path
+    (documents / "a.pdf").write_text("alpha one\nalpha two")
+    pipeline.ingest_documents()
+
+    # A vector the manifest doesn't know about
+    store = FAISSVectorStore(dimension=8, index_path=settings.FAISS_INDEX_PATH)
+    store.add_documents(_embed("stray")[None, :], [{"content": "stray"}])
+    store.save()
+
+    pipeline.embedding_generator.encoded = []
+    result = pipeline.ingest_documents()
+    assert sorted(pipeline.embedding_generator.encoded) == ["alpha one", "alpha two"]
+    assert result["vectors_stored"] == 2
+    assert "stray" not in _contents(pipeline.vector_store)
+    _assert_aligned(pipeline.vector_store)
+
+
+def test_small_first_upload_defers_pca(pipeline, monkeypatch):
+    """Test that a corpus smaller than FAISS_PCA_DIM ingests without PCA and is rebuilt with it once large enough"""
+    monkeypatch.setattr(settings, "FAISS_PCA_DIM", 6)
+    documents = pipeline.document_processor.documents_path
+    (documents / "a.pdf").write_text("alpha one\nalpha two\nalpha three")
+
+    result = pipeline.ingest_documents()
+    assert result["status"] == "success"
+    assert pipeline.vector_store.loaded_layout["pca_dim"] == 0
+
+    # The second upload takes the corpus past FAISS_PCA_DIM, so the index is retrained with PCA
+    pipeline.embedding_generator.encoded = []
+    (documents / "b.pdf").write_text("beta one\nbeta two\nbeta three\nbeta four")
+    result = pipeline.ingest_documents()
+    assert len(pipeline.embedding_generator.encoded) == 4 + 7
+    assert pipeline.vector_store.loaded_layout["pca_dim"] == 6
+    assert not pipeline.vector_store.needs_retraining
+    assert result["vectors_stored"] == 7
+
+    # The next ingestion appends to it again
+    pipeline.embedding_generator.encoded = []
+    assert pipeline.ingest_documents()["documents_unchanged"] == 2
+    assert pipeline.embedding_generator.encoded == []
+
+
+def test_corpus_growth_retrains_ivf_index(pipeline, monkeypatch):
+    """Test that an IVF index trained on a small first upload is retrained once the corpus outgrows its clusters"""
+    monkeypatch.setattr(settings, "FAISS_INDEX_TYPE", "ivf_flat")
+    documents = pipeline.document_processor.documents_path
+    (documents / "a.pdf").write_text("\n".join(f"alpha {i}" for i in range(100)))
+
+    pipeline.ingest_documents()
+    assert pipeline.vector_store.index.nlist == 2
+
+    (documents / "b.pdf").write_text("\n".join(f"beta {i}" for i in range(400)))
+    pipeline.embedding_generator.encoded = []
+    result = pipeline.ingest_documents()
+
+    store = pipeline.vector_store
+    assert len(pipeline.embedding_generator.encoded) == 400 + 500
+    assert result["vectors_stored"] == 500
+    assert store.index.nlist == 500 // 39
+    assert store.index.nprobe == min(settings.FAISS_NPROBE, store.index.nlist)
+    assert not store.needs_retraining
+    assert store.search(_embed("beta 7"), k=1)[0][0]["content"] == "beta 7"
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+def test_ingested_store_is_served_memory_mapped(pipeline, monkeypatch):
+    """Test that with FAISS_MMAP the store swapped in after ingestion is the mapped saved index"""
+    monkeypatch.setattr(settings, "FAISS_MMAP", True)
+    documents = pipeline.document_processor.documents_path
+    (documents / "a.pdf").write_text("alpha one\nalpha two")
+
+    pipeline.ingest_documents()
+    store = pipeline.vector_store
+    assert store.read_only
+    assert store.search(_embed("alpha two"), k=1)[0][0]["content"] == "alpha two"
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        assert _is_mapped(Path(settings.FAISS_INDEX_PATH).resolve() / "index.faiss")
+
+    # Later ingestions still build a writable store of their own
+    (documents / "b.pdf").write_text("beta one")
+    assert pipeline.ingest_documents()["vectors_stored"] == 3
+    assert pipeline.vector_store.read_only
@@ -0,0 +1,54 @@
+"""Tests for the prompt prefix KV cache"""
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.prefix_cache import PrefixKVCache, prompt_inputs
+from tests.tiny_models import tiny_gpt2, tiny_llama, tiny_tokenizer
+
+PREFIX = "based on the following context please answer the question clearly instructions : - answer clearly - be used context :"
+PROMPTS = [
+    f"{PREFIX} refunds are refunded within days of delivery question : when will i get my refund ? answer :",
+    f"{PREFIX} items must be unused question : can i return an item ? answer :",
+]
+
+
+@pytest.mark.parametrize("make_model", [tiny_gpt2, tiny_llama])
+def test_generate_with_prefix_cache_matches_without(make_model):
+    """Test that greedy output is the same whether or not the prefix is taken from the cache"""
+    model = make_model()
+    tokenizer = tiny_tokenizer()
+    cache = PrefixKVCache(model, tokenizer, PREFIX)
+
+    for prompt in PROMPTS:
+        outputs = []
+        for prefix_cache in (None, cache):
+            inputs = prompt_inputs(tokenizer, prompt, "cpu", prefix_cache)
+            with torch.no_grad():
+                outputs.append(model.generate(**inputs, max_new_tokens=8, do_sample=False).tolist())
+        assert outputs[0] == outputs[1]
+
+    assert cache.stats()["hits"] == len(PROMPTS)
+
+
+def test_legacy_cache_for_models_without_cache_classes():
+    """Test that models that only take tuples get the legacy format from generate_cache"""
+    model = tiny_gpt2()
+    model._supports_cache_class = False
+    cache = PrefixKVCache(model, tiny_tokenizer(), PREFIX)
+    past = cache.generate_cache(len(cache) - 1)
+    assert isinstance(past, tuple)
+    assert past[0][0].shape[2] == len(cache) - 1
+
+
+def test_short_matches_are_not_reused():
+    """Test that prompts sharing too few tokens with the prefix are prefilled in full"""
+    model = tiny_llama()
+    tokenizer = tiny_tokenizer()
+    cache = PrefixKVCache(model, tokenizer, PREFIX)
+
+    inputs = prompt_inputs(tokenizer, "based on the order question : how long ?", "cpu", cache)
+
+    assert "past_key_values" not in inputs
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,221 @@
+"""Tests for the RAG agent's query paths with stubbed models"""
+import threading
+from concurrent.futures import Future
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.config import settings
+from src.context_builder import ContextBuilder
+from src.rag_agent import RAGAgent
+
+
+class StubGuardrails:
+    def should_refuse_query(self, question):
+        return "forbidden" in question
+
+
+class StubEmbeddingGenerator:
+    batcher = None
+
+    def generate_embedding(self, text):
+        return np.ones(4, dtype='float32')
+
+    def encode(self, texts, show_progress_bar=False):
+        return np.ones((len(texts), 4), dtype='float32')
+
+
+class StubVectorStore:
+    version = 1
+
+    def _results(self, question):
+        return [({"content": f"About {question}", "source": "faq.pdf", "chunk_index": 0}, 0.5)]
+
+    def hybrid_search(self, question, query_embedding, k=5):
+        return self._results(question)
+
+    def hybrid_search_batch(self, questions, query_embeddings, k=5):
+        return [self._results(question) for question in questions]
+
+
+class StubScheduler:
+    """Resolves futures only once ``expected`` prompts have been submitted"""
+
+    def __init__(self, expected: int = 1):
+        self.expected = expected
+        self.futures = []
+        self._lock = threading.Lock()
+
+    def submit(self, prompt, max_new_tokens, deltas=None):
+        future = Future()
+        with self._lock:
+            self.futures.append((prompt, future))
+            if len(self.futures) == self.expected:
+                for i, (_, pending) in enumerate(self.futures):
+                    pending.set_result(f"Answer {i}")
+        return future
+
+
+def make_agent(monkeypatch, scheduler=None) -> RAGAgent:
+    monkeypatch.setattr(settings, "USE_OPENAI", False)
+    agent = RAGAgent.__new__(RAGAgent)
+    agent.vector_store = StubVectorStore()
+    agent.guardrails = StubGuardrails()
+    agent.embedding_generator = StubEmbeddingGenerator()
+    agent.openai_client = None
+    agent.llm = None
+    agent.draft_model = None
+    agent.prefix_cache = None
+    agent.generation_scheduler = scheduler
+    agent.reranker = None
+    agent.context_builder = ContextBuilder(lambda texts: [len(text.split()) for text in texts], 1000)
+    agent.answer_cache = None
+    agent.semantic_cache = None
+    return agent
+
+
+def test_query_batch_generates_concurrently(monkeypatch):
+    """Test that every prompt of a batch is submitted before any answer is awaited"""
+    scheduler = StubScheduler(expected=3)
+    agent = make_agent(monkeypatch, scheduler)
+
+    responses = agent.query_batch(["refunds", "forbidden topic", "shipping", "returns"])
+
+    assert ["Question: shipping" in prompt for prompt, _ in scheduler.futures] == [False, True, False]
+    assert [response["answer"] for response in responses] == [
+        "Answer 0",
+        "I cannot process this query due to safety concerns.",
+        "Answer 1",
+        "Answer 2"
+    ]
+    assert responses[0]["sources"] == ["faq.pdf"]
+
+
+def test_query_batch_falls_back_when_generation_fails(monkeypatch):
+    """Test that a failed generation answers from the top document"""
+    class FailingScheduler:
+        def submit(self, prompt, max_new_tokens, deltas=None):
+            future = Future()
+            future.set_exception(RuntimeError("out of memory"))
+            return future
+
+    agent = make_agent(monkeypatch, FailingScheduler())
+
+    responses = agent.query_batch(["refunds"])
+
+    assert responses[0]["answer"] == "About refunds..."
+    assert responses[0]["error"] is None
+
+
+class StreamingScheduler:
+    """Streams a fixed answer word by word, stopping once the request is cancelled"""
+
+    def __init__(self, words):
+        self.words = words
+
+    def stream(self, prompt, max_new_tokens, cancelled=None):
+        for word in self.words:
+            if cancelled is not None and cancelled.is_set():
+                return
+            yield word
+
+
+def test_query_stream_sends_sources_tokens_then_done(monkeypatch):
+    """Test that a streamed answer is a sources event, token events and a done event"""
+    agent = make_agent(monkeypatch, StreamingScheduler(["Within ", "30 ", "days."]))
+
+    events = list(agent.query_stream("refunds"))
+
+    assert [event["event"] for event in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0]["sources"] == ["faq.pdf"]
+    assert events[-1]["answer"] == "Within 30 days."
+    assert events[-1]["sources"] == ["faq.pdf"]
+
+
+def test_query_stream_reports_errors(monkeypatch):
+    """Test that refused queries and failed retrieval produce a single error event"""
+    agent = make_agent(monkeypatch, StreamingScheduler(["unused"]))
+    assert [event["event"] for event in agent.query_stream("forbidden topic")] == ["error"]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(agent.vector_store, "hybrid_search", fail)
+    events = list(agent.query_stream("refunds"))
+    assert [event["event"] for event in events] == ["error"]
+    assert events[0]["error"] == "index unavailable"
+
+
+def test_query_stream_stops_when_cancelled(monkeypatch):
+    """Test that a cancelled stream ends without a done event"""
+    agent = make_agent(monkeypatch, StreamingScheduler(["Within ", "30 ", "days."]))
+    cancelled = threading.Event()
+
+    events = []
+    for event in agent.query_stream("refunds", cancelled):
+        events.append(event)
+        if event["event"] == "token":
+            cancelled.set()
+
+    assert [event["event"] for event in events] == ["sources", "token"]
+
+
+def test_confidence_ignores_lexical_only_hits(monkeypatch):
+    """Test that a top hit found only by BM25 doesn't set confidence from its placeholder distance"""
+    agent = make_agent(monkeypatch)
+    results = [
+        ({"content": "SKU-77", "lexical_only": True}, 9.0),
+        ({"content": "close match"}, 1.0)
+    ]
+    assert agent._confidence(results) == pytest.approx(0.9)
+    assert agent._confidence(results[:1]) == pytest.approx(0.1)
+
+
+def test_draft_model_is_passed_to_generate(monkeypatch):
+    """Test that local generation hands the draft model to generate as its assistant"""
+    from types import SimpleNamespace
+    from tests.tiny_models import tiny_llama, tiny_tokenizer
+
+    agent = make_agent(monkeypatch)
+    agent.llm = SimpleNamespace(model=tiny_llama(), tokenizer=tiny_tokenizer())
+    assert "assistant_model" not in agent._local_generate_kwargs()
+
+    agent.draft_model = tiny_llama(seed=1)
+    assert agent._local_generate_kwargs()["assistant_model"] is agent.draft_model
+
+    draft_calls = []
+    agent.draft_model.register_forward_hook(lambda *args: draft_calls.append(1))
+    monkeypatch.setattr(settings, "MAX_TOKENS", 8)
+    answer = agent._generate_response(agent.llm, "how long do i have to return an order ?")
+    assert isinstance(answer, str)
+    assert draft_calls
+
+
+def test_missing_draft_model_falls_back_to_plain_decoding(monkeypatch, caplog):
+    """Test that an unloadable draft model logs a warning and keeps the other speedups"""
+    from types import SimpleNamespace
+    from src import rag_agent
+    from src.model_registry import ModelRegistry
+    from tests.tiny_models import tiny_llama, tiny_tokenizer
+
+    monkeypatch.setattr(rag_agent, "model_registry", ModelRegistry())
+    monkeypatch.setattr(rag_agent, "get_guardrails", lambda *args: StubGuardrails())
+    monkeypatch.setattr(rag_agent, "get_embedding_generator", StubEmbeddingGenerator)
+    monkeypatch.setattr(
+        RAGAgent, "_load_local_llm",
+        lambda self, use_quantization: SimpleNamespace(model=tiny_llama(), tokenizer=tiny_tokenizer())
+    )
+    for name, value in [("USE_OPENAI", False), ("SPECULATIVE_DECODING", True), ("DRAFT_MODEL", "/nonexistent/draft"),
+                        ("PREFIX_KV_CACHE", True), ("CONTINUOUS_BATCHING", False), ("RERANK", False),
+                        ("ANSWER_CACHE_SIZE", 0), ("SEMANTIC_CACHE_SIZE", 0)]:
+        monkeypatch.setattr(settings, name, value)
+
+    with caplog.at_level("WARNING"):
+        agent = RAGAgent(StubVectorStore(), use_quantization=False)
+
+    assert agent.draft_model is None
+    assert agent.prefix_cache is not None
+    assert "Using plain decoding" in caplog.text
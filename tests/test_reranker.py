@@ -0,0 +1,52 @@
+"""Tests for cross-encoder reranking"""
+import time
+from src.reranker import Reranker
+
+
+class KeywordModel:
+    """Scores a pair by how often the query's words appear in the text"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(len(pairs))
+        time.sleep(self.delay)
+        return [sum(text.count(word) for word in query.split()) for query, text in pairs]
+
+
+def _results(texts):
+    return [({"content": text, "source": f"{i}.pdf"}, float(i)) for i, text in enumerate(texts)]
+
+
+def test_rerank_keeps_most_relevant():
+    """Test that the best-scored candidates come first and keep their distances"""
+    model = KeywordModel()
+    reranker = Reranker(model, batch_size=2)
+    results = _results(["shipping times", "refund policy", "refund refund window", "returns"])
+
+    reranked = reranker.rerank("refund", results, top_n=2)
+
+    assert reranked == [results[2], results[1]]
+    assert model.calls == [2, 2]
+    assert reranker.stats()["reranked"] == 1
+    reranker.close()
+
+
+def test_budget_exceeded_falls_back_to_vector_order():
+    """Test that a slow model yields the original order within the budget"""
+    model = KeywordModel(delay=0.2)
+    reranker = Reranker(model, batch_size=1, budget_ms=20)
+    results = _results(["a", "b", "refund", "c"])
+
+    start = time.perf_counter()
+    reranked = reranker.rerank("refund", results, top_n=2)
+
+    assert time.perf_counter() - start < 0.15
+    assert reranked == results[:2]
+    assert reranker.stats()["fallbacks"] == 1
+    # The worker stops after its current batch instead of scoring every candidate
+    time.sleep(0.3)
+    assert len(model.calls) < len(results)
+    reranker.close()
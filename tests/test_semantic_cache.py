@@ -0,0 +1,32 @@
+"""Tests for semantic answer cache"""
+import numpy as np
+from src.semantic_cache import SemanticAnswerCache
+
+
+def test_near_duplicate_hits_and_distant_misses():
+    """Test that similar embeddings hit and dissimilar ones miss"""
+    cache = SemanticAnswerCache(dimension=4, similarity_threshold=0.9)
+    cache.put(np.array([1.0, 0.0, 0.0, 0.0]), "return policy?", "s", 1, {"answer": "30 days"})
+    
+    assert cache.get(np.array([0.98, 0.05, 0.0, 0.0]), "s", 1) == {"answer": "30 days"}
+    assert cache.get(np.array([0.0, 1.0, 0.0, 0.0]), "s", 1) is None
+
+
+def test_flush_on_index_version_change():
+    """Test that a new index version empties the cache"""
+    cache = SemanticAnswerCache(dimension=4)
+    cache.put(np.array([1.0, 0.0, 0.0, 0.0]), "q", "s", 1, {"answer": "a"})
+    assert cache.get(np.array([1.0, 0.0, 0.0, 0.0]), "s", 2) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_keeps_cache_bounded():
+    """Test that the least recently used entry is evicted"""
+    cache = SemanticAnswerCache(dimension=4, max_entries=2, similarity_threshold=0.99)
+    basis = np.eye(4, dtype='float32')
+    for i in range(3):
+        cache.put(basis[i], f"q{i}", "s", 1, {"answer": str(i)})
+    
+    assert cache.stats()["entries"] == 2
+    assert cache.get(basis[0], "s", 1) is None
+    assert cache.get(basis[2], "s", 1) == {"answer": "2"}
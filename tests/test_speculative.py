@@ -0,0 +1,42 @@
+"""Tests for loading draft models for speculative decoding"""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import torch
+from src.speculative import load_draft_model
+from tests.tiny_models import WORDS, tiny_llama, tiny_tokenizer
+
+
+def save_model(path, model, tokenizer):
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return str(path)
+
+
+def test_load_draft_model(tmp_path):
+    """Test that a draft sharing the main tokenizer loads with its lookahead settings"""
+    tokenizer = tiny_tokenizer()
+    path = save_model(tmp_path, tiny_llama(seed=1), tokenizer)
+
+    draft = load_draft_model(path, tokenizer, "cpu", torch.float32, num_tokens=3, schedule="heuristic")
+
+    assert not draft.training
+    assert draft.generation_config.num_assistant_tokens == 3
+    assert draft.generation_config.num_assistant_tokens_schedule == "heuristic"
+
+
+def test_draft_with_a_different_vocabulary_is_rejected(tmp_path):
+    """Test that a draft whose token ids mean something else can't be used"""
+    other = tiny_tokenizer(WORDS[:2] + list(reversed(WORDS[2:])))
+    path = save_model(tmp_path, tiny_llama(seed=1), other)
+
+    with pytest.raises(ValueError, match="tokenizer"):
+        load_draft_model(path, tiny_tokenizer(), "cpu", torch.float32)
+
+
+def test_unknown_schedule_is_rejected(tmp_path):
+    """Test that only the schedules transformers understands are accepted"""
+    with pytest.raises(ValueError, match="schedule"):
+        load_draft_model(str(tmp_path), tiny_tokenizer(), "cpu", torch.float32, schedule="adaptive")
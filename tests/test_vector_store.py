@@ -0,0 +1,274 @@
+"""Tests for FAISS vector store"""
+import os
+import pytest
+import tempfile
+import faiss
+import numpy as np
+from pathlib import Path
+from unittest import mock
+from src import vector_store
+from src.config import settings
+from src.vector_store import FAISSVectorStore, shutdown_lexical_executor
+
+
+def _make_store(tmpdir, count=5, dimension=8, **kwargs):
+    store = FAISSVectorStore(dimension=dimension, index_path=tmpdir, **kwargs)
+    embeddings = np.random.rand(count, dimension).astype('float32')
+    metadatas = [{"content": f"chunk {i}", "source": "doc.pdf", "chunk_index": i, "path": "doc.pdf"} for i in range(count)]
+    store.add_documents(embeddings, metadatas)
+    return store, embeddings
+
+
+def test_remove_ids_keeps_metadata_aligned():
+    """Test that removing vectors keeps metadata in step with the index"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, embeddings = _make_store(tmpdir)
+        store.remove_ids([1, 2])
+        
+        assert store.index.ntotal == 3
+        assert [meta["content"] for meta in store.metadata] == ["chunk 0", "chunk 3", "chunk 4"]
+        
+        results = store.search(embeddings[3], k=1)
+        assert results[0][0]["content"] == "chunk 3"
+
+
+def test_save_and_reload():
+    """Test that a saved index is loaded back"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, _ = _make_store(tmpdir)
+        store.save()
+        
+        reloaded = FAISSVectorStore(dimension=8, index_path=tmpdir)
+        assert reloaded.index.ntotal == 5
+        assert len(reloaded.metadata) == 5
+
+
+def test_ivf_index_requires_training():
+    """Test that IVF indexes are trained before vectors are added"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=8, index_path=tmpdir, index_type="ivf_flat")
+        embeddings = np.random.rand(200, 8).astype('float32')
+        metadatas = [{"content": f"chunk {i}"} for i in range(200)]
+        assert not store.is_trained
+        assert not store.supports_removal
+        
+        store.train(embeddings)
+        store.add_documents(embeddings, metadatas)
+        assert store.loaded_index_type == "ivf_flat"
+        
+        results = store.search(embeddings[7], k=1)
+        assert results[0][0]["content"] == "chunk 7"
+
+
+def _is_mapped(path) -> bool:
+    """Whether this process has memory-mapped the file"""
+    with open("/proc/self/maps") as maps:
+        return any(line.rstrip().endswith(str(path)) for line in maps)
+
+
+@pytest.mark.skipif(not hasattr(faiss, "IO_FLAG_MMAP_IFC"), reason="FAISS can't memory-map flat codes")
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+def test_mmap_load_is_read_only():
+    """Test that a memory-mapped store searches from the mapped file but rejects writes"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, embeddings = _make_store(tmpdir)
+        store.save()
+        
+        mapped = FAISSVectorStore(dimension=8, index_path=tmpdir, mmap=True)
+        assert _is_mapped(Path(tmpdir).resolve() / "index.faiss")
+        assert mapped.index.ntotal == 5
+        assert mapped.search(embeddings[2], k=1)[0][0]["content"] == "chunk 2"
+        with pytest.raises(ValueError):
+            mapped.add_documents(embeddings[:1], [{"content": "new"}])
+
+
+def test_search_batch_matches_single_search():
+    """Test that batched search returns the same hits as per-query search"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, embeddings = _make_store(tmpdir, count=20)
+        batch = store.search_batch(embeddings[:4], k=3)
+        
+        assert len(batch) == 4
+        for query, results in zip(embeddings[:4], batch):
+            assert results == store.search(query, k=3)
+
+
+def test_version_changes_on_mutation():
+    """Test that adding, removing and saving bump the store version"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, _ = _make_store(tmpdir)
+        versions = [store.version]
+        store.remove_ids([0])
+        versions.append(store.version)
+        store.save()
+        versions.append(store.version)
+        
+        assert len(set(versions)) == 3
+        assert FAISSVectorStore(dimension=8, index_path=tmpdir).version not in versions
+
+
+def test_hybrid_search_finds_lexical_matches():
+    """Test that fusion surfaces a chunk matched by its code even when vectors miss it"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, embeddings = _make_store(tmpdir, count=20, lexical=True)
+        store.add_documents(
+            np.random.rand(1, 8).astype('float32'),
+            [{"content": "Error ERR-4012: card declined", "source": "errors.pdf", "chunk_index": 0, "path": "errors.pdf"}]
+        )
+        assert store.has_lexical_index
+        
+        results = store.hybrid_search("what is ERR-4012", embeddings[3], k=2)
+        contents = [meta["content"] for meta, _ in results]
+        assert set(contents) == {"chunk 3", "Error ERR-4012: card declined"}
+        
+        store.save()
+        reloaded = FAISSVectorStore(dimension=8, index_path=tmpdir, lexical=True)
+        assert reloaded.has_lexical_index
+        assert reloaded.hybrid_search("ERR-4012", embeddings[3], k=2) == results
+
+
+def test_lexical_only_hits_are_marked():
+    """Test that hits the vector leg didn't return are flagged as lexical-only"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=4, index_path=tmpdir, lexical=True)
+        embeddings = np.array([[1, 0, 0, 0], [0.9, 0.1, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]], dtype='float32')
+        store.add_documents(embeddings, [{"content": text} for text in ("alpha", "beta", "SKU-77 gamma", "delta")])
+        with mock.patch.object(settings, "HYBRID_CANDIDATES", 2):
+            results = store.hybrid_search("SKU-77", embeddings[0], k=2)
+        
+        assert [meta["content"] for meta, _ in results] == ["alpha", "SKU-77 gamma"]
+        assert "lexical_only" not in results[0][0]
+        assert results[1][0]["lexical_only"]
+        # It gets the farthest distance the vector leg returned
+        assert results[1][1] == pytest.approx(0.02)
+
+
+def test_hybrid_search_is_off_by_default():
+    """Test that stores only build a BM25 index when hybrid search is enabled"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, _ = _make_store(tmpdir)
+        assert settings.HYBRID_SEARCH is False
+        assert not store.has_lexical_index
+
+
+def test_lexical_executor_is_created_lazily_and_shut_down():
+    """Test that the lexical thread pool starts on first use and stops on shutdown"""
+    shutdown_lexical_executor()
+    assert vector_store._lexical_executor is None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, embeddings = _make_store(tmpdir, lexical=True)
+        store.hybrid_search("chunk 1", embeddings[1], k=1)
+    assert vector_store._lexical_executor is not None
+    shutdown_lexical_executor()
+    assert vector_store._lexical_executor is None
+
+
+def test_rebuild_lexical_index_from_metadata():
+    """Test that an index saved without BM25 gets one built from its chunk text"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=8, index_path=tmpdir, lexical=False)
+        store.add_documents(
+            np.random.rand(3, 8).astype('float32'),
+            [{"content": text} for text in ("alpha beta", "gamma SKU-77", "delta")]
+        )
+        store.save()
+        
+        reloaded = FAISSVectorStore(dimension=8, index_path=tmpdir, lexical=True)
+        assert not reloaded.has_lexical_index
+        reloaded.rebuild_lexical_index()
+        assert reloaded.has_lexical_index
+        assert reloaded.lexical_index.search("sku-77", k=1)[0].tolist() == [1]
+
+
+def test_compressed_index_round_trip():
+    """Test that SQ8 + PCA with exact rescoring trains, searches and reloads with its layout"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=16, index_path=tmpdir, compression="sq8", pca_dim=8, exact_rescore=True)
+        embeddings = np.random.rand(300, 16).astype('float32')
+        assert not store.is_trained
+        
+        store.train(embeddings)
+        store.add_documents(embeddings, [{"content": f"chunk {i}"} for i in range(300)])
+        assert store.loaded_layout == store.layout == {
+            "index_type": "flat", "compression": "sq8", "pca_dim": 8, "exact_rescore": True
+        }
+        assert not store.supports_removal
+        assert store.search(embeddings[42], k=1)[0][0]["content"] == "chunk 42"
+        
+        store.save()
+        reloaded = FAISSVectorStore(dimension=16, index_path=tmpdir, compression="none", pca_dim=0, exact_rescore=False)
+        assert reloaded.loaded_layout == store.layout
+        assert reloaded.loaded_layout != reloaded.layout
+
+
+def test_compressed_flat_index_supports_removal():
+    """Test that flat SQ and PQ codes shift down on removal like raw vectors"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=8, index_path=tmpdir, compression="fp16")
+        embeddings = np.random.rand(5, 8).astype('float32')
+        store.add_documents(embeddings, [{"content": f"chunk {i}"} for i in range(5)])
+        assert store.supports_removal
+        
+        store.remove_ids([1, 2])
+        assert store.search(embeddings[3], k=1)[0][0]["content"] == "chunk 3"
+
+
+def test_pca_is_deferred_on_a_small_training_set():
+    """Test that fewer training vectors than pca_dim builds the index without PCA until it has grown"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=16, index_path=tmpdir, pca_dim=12)
+        embeddings = np.random.rand(20, 16).astype('float32')
+        
+        store.train(embeddings[:10])
+        store.add_documents(embeddings[:10], [{"content": f"chunk {i}"} for i in range(10)])
+        assert store.loaded_layout["pca_dim"] == 0
+        assert store.search(embeddings[4], k=1)[0][0]["content"] == "chunk 4"
+        assert not store.layout_changed
+        assert not store.needs_retraining
+        
+        store.add_documents(embeddings[10:], [{"content": f"chunk {i}"} for i in range(10, 20)])
+        assert store.needs_retraining
+
+
+def test_hnsw_pq_trains_on_a_small_training_set():
+    """Test that HNSW with PQ codes lowers its code size to fit fewer than 256 training vectors"""
+    with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(settings, "FAISS_PQ_M", 4):
+        store = FAISSVectorStore(dimension=16, index_path=tmpdir, index_type="hnsw", compression="pq")
+        embeddings = np.random.rand(120, 16).astype('float32')
+        
+        store.train(embeddings)
+        store.add_documents(embeddings, [{"content": f"chunk {i}"} for i in range(120)])
+        assert store.loaded_layout == store.layout
+        assert faiss.downcast_index(store.index.storage).pq.nbits < 8
+        assert len(store.search(embeddings[5], k=3)) == 3
+
+
+def test_ivf_index_needs_retraining_once_outgrown():
+    """Test that an IVF index trained on few vectors asks for retraining as the corpus grows"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = FAISSVectorStore(dimension=8, index_path=tmpdir, index_type="ivf_flat")
+        embeddings = np.random.rand(400, 8).astype('float32')
+        store.train(embeddings[:100])
+        store.add_documents(embeddings[:100], [{"content": f"chunk {i}"} for i in range(100)])
+        assert store.index.nlist == 2
+        assert not store.needs_retraining
+        
+        store.add_documents(embeddings[100:], [{"content": f"chunk {i}"} for i in range(100, 400)])
+        assert store.needs_retraining
+        
+        # Retraining can't use more vectors than INGEST_TRAIN_SIZE, so it isn't asked for beyond that
+        with mock.patch.object(settings, "INGEST_TRAIN_SIZE", 100):
+            assert not store.needs_retraining
+
+
+def test_mmap_warns_when_faiss_cannot_map_flat_codes(monkeypatch, caplog):
+    """Test that FAISS versions without IO_FLAG_MMAP_IFC log that a flat index was read into RAM"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, embeddings = _make_store(tmpdir)
+        store.save()
+        monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC", raising=False)
+        
+        with caplog.at_level("WARNING"):
+            mapped = FAISSVectorStore(dimension=8, index_path=tmpdir, mmap=True)
+        assert mapped.search(embeddings[2], k=1)[0][0]["content"] == "chunk 2"
+        assert "was read into RAM" in caplog.text
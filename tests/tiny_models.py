@@ -0,0 +1,50 @@
+"""Randomly initialized tiny causal LMs and a word-level tokenizer, built offline for tests"""
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import GPT2Config, GPT2LMHeadModel, LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+WORDS = [
+    "<unk>", "<eos>", "based", "on", "the", "following", "context", "answer", "question", "refund",
+    "refunds", "return", "returns", "order", "orders", "within", "days", "of", "delivery", "shipping",
+    "costs", "are", "not", "refunded", "items", "must", "be", "unused", "how", "long", "do", "i",
+    "have", "to", "when", "will", "get", "my", "can", "an", "item", "already", "used", "and", "is",
+    "a", "in", "for", "it", "yes", "no", "please", "clearly", "instructions", ":", "?", ".", "-"
+]
+
+
+def tiny_tokenizer(words=WORDS) -> PreTrainedTokenizerFast:
+    """Word-level tokenizer over ``words``; unknown words map to ``<unk>``"""
+    backend = Tokenizer(models.WordLevel({word: i for i, word in enumerate(words)}, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(
+        tokenizer_object=backend, unk_token="<unk>", eos_token="<eos>", pad_token="<eos>"
+    )
+
+
+def tiny_gpt2(vocab_size: int = len(WORDS), seed: int = 0) -> GPT2LMHeadModel:
+    """Two-layer GPT-2, which only understands legacy tuple caches in older transformers"""
+    torch.manual_seed(seed)
+    config = GPT2Config(
+        vocab_size=vocab_size, n_positions=256, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=1, eos_token_id=1, pad_token_id=1
+    )
+    return GPT2LMHeadModel(config).eval()
+
+
+def tiny_llama(vocab_size: int = len(WORDS), seed: int = 0) -> LlamaForCausalLM:
+    """Two-layer Llama, which accepts cache objects"""
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=vocab_size, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=2, num_key_value_heads=2, max_position_embeddings=256,
+        bos_token_id=1, eos_token_id=1, pad_token_id=1
+    )
+    return LlamaForCausalLM(config).eval()
+
+
+def greedy_reference(model, tokenizer, prompt: str, max_new_tokens: int) -> str:
+    """Text ``model.generate`` decodes greedily for one prompt on its own"""
+    inputs = tokenizer(prompt, return_tensors="pt")
+    with torch.no_grad():
+        output_ids = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+    return tokenizer.decode(output_ids[0][inputs["input_ids"].shape[1]:], skip_special_tokens=True).strip()